@@ -1,10 +1,29 @@
-from pymongo import MongoClient
-from decouple import config
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT, UpdateOne, DeleteMany, ReturnDocument
+from bson import ObjectId
+from bson.errors import InvalidId
+from decouple import config, Csv
 from helpers.crypt import CryptoHelper
-from interface.access_key import AccessKey
-from helpers.crypt import SECRET, CLIENT_SECRET
-from pymongo.errors import ConnectionFailure, OperationFailure
+from helpers.crypt import SECRET
+from pymongo import monitoring
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from pymongo.errors import ConnectionFailure, OperationFailure, DuplicateKeyError, BulkWriteError
 from helpers.list_helper import ListHelper
+from helpers.date_helper import DateHelper
+from helpers.cursor_helper import CursorHelper
+from helpers.record_codec import RecordCodec
+from helpers.deadline import Deadline
+from helpers.circuit_breaker import CLOSED
+from helpers.journal import WriteJournal
+from helpers.archive import MonthArchive, ArchiveCache
+from helpers.tracing import current_span
+from contextlib import contextmanager
+from db.Storage import StorageAPI, WRITE_OPS, sync_interval, changes_ttl, idempotency_ttl, idempotency_pending
 
 # logging and internal error messages
 import logging
@@ -18,6 +37,55 @@ db_pass = config("PASS")
 db_name = config("DB")
 coll_task = config("COLL_TASK")
 coll_keys = config("COLL_KEYS")
+coll_feed = config("COLL_FEED", default=f"{coll_task}_feed")
+coll_task_items = config("COLL_TASK_ITEMS", default=f"{coll_task}_items")
+coll_task_series = config("COLL_TASK_SERIES", default=f"{coll_task}_series")
+coll_changes = config("COLL_CHANGES", default=f"{coll_task}_changes")
+coll_idempotency = config("COLL_IDEMPOTENCY", default=f"{coll_task}_idempotency")
+coll_archive = config("COLL_ARCHIVE", default=f"{coll_task}_archive")
+# days older than this are moved to the archive by `scripts.archive_days`, unpacked months cached per worker
+archive_after_days = config("ARCHIVE_AFTER_DAYS", default=365, cast=int)
+archive_cache_months = config("ARCHIVE_CACHE_MONTHS", default=12, cast=int)
+# `day` stores the day with array of records, `task` stores every task as document, `series` stores every task as
+# measurement of a time-series collection, needs mongo 7.0
+task_layout = config("TASK_LAYOUT", default="day")
+# seconds a write holds a day of the `task` and `series` layouts before another write may take it over, and seconds
+# another write of the day waits for it. The workers wait as long for a change of the days missing in the log
+write_hold_seconds = config("WRITE_HOLD_SECONDS", default=30, cast=int)
+write_wait_seconds = config("WRITE_WAIT_SECONDS", default=2, cast=float)
+# `string` stores start and end as sent, `datetime` stores them as datetime of the day
+time_storage = config("TIME_STORAGE", default="string")
+# `mongo` for the text index of the feed or `memory` for the in-process inverted index
+search_backend = config("SEARCH_BACKEND", default="mongo")
+# milliseconds to find a server or open a connection before the call fails, instead of the 30 s of pymongo
+mongo_timeout_ms = config("MONGO_TIMEOUT_MS", default=5000, cast=int)
+# members the reads of the days are sent to, e.g. `secondaryPreferred`, and how far behind the primary a secondary
+# may be in seconds, at least 90, or -1 for no bound. The writes and their checks always go to the primary
+read_preference = config("READ_PREFERENCE", default="primary")
+max_staleness = config("MAX_STALENESS_SECONDS", default=-1, cast=int)
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# write concern with journaling and read concern of the operations on the days: `uri` keeps the concerns of the URI,
+# `durable` waits for the majority and the journal and reads majority committed data, `fast` waits for the primary
+# only and reads its local data
+PROFILES = {
+    "uri": (None, None),
+    "durable": (WriteConcern(w="majority", j=True), ReadConcern("majority")),
+    "fast": (WriteConcern(w=1, j=False), ReadConcern("local")),
+}
+# operations of the routes on the days, the reads and the keys of WRITE_OPS
+READ_OPERATIONS = ("all", "day", "latest")
+OPERATIONS = READ_OPERATIONS + tuple(WRITE_OPS)
+# profile of all operations, overridden per operation of a route as `operation=profile`, e.g. `update=durable`
+consistency_profile = config("CONSISTENCY_PROFILE", default="uri")
+consistency_routes = config("CONSISTENCY_ROUTES", default="", cast=Csv())
+# SQLite file of the writes accepted while mongo is unavailable, no journal when empty
+journal_path = config("JOURNAL_PATH", default="")
 db_host = config("HOST")
 URI = f"mongodb+srv://{db_user}:{db_pass}{db_host}/{db_name}?retryWrites=true&w=majority"
 
@@ -31,6 +99,43 @@ def set_record_to_active(record_day):
         # self.active_record = last if is_active is True else None
 
 
+class CommandSpans(monitoring.CommandListener):
+    """
+    pymongo command listener timing every command sent to mongo as child span of the storage call.
+
+    The events are published by the thread running the command, the span of the storage call is in its context
+    """
+
+    def __init__(self):
+        self.spans = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        parent = current_span.get()
+        if parent is not None:
+            child = parent.child(f"mongo.{event.command_name}", database=event.database_name)
+            with self.lock:
+                self.spans[(event.connection_id, event.request_id)] = child
+
+    def finished(self, event, error=None):
+        if not self.spans:
+            return
+        with self.lock:
+            child = self.spans.pop((event.connection_id, event.request_id), None)
+        if child is not None:
+            child.finish(error)
+
+    def succeeded(self, event):
+        self.finished(event)
+
+    def failed(self, event):
+        self.finished(event, RuntimeError(event.failure))
+
+
+# commands of the traced requests, the listener does nothing for the others
+command_spans = CommandSpans()
+
+
 class MongoConnection(object):
 
     @staticmethod
@@ -53,7 +158,8 @@ class MongoConnection(object):
         :return: MongoClient or none if connection error
         """
         # see https://stackoverflow.com/a/49381588 for initiation of mongoclient
-        client = MongoClient(URI)
+        client = MongoClient(URI, serverSelectionTimeoutMS=mongo_timeout_ms, connectTimeoutMS=mongo_timeout_ms,
+                             event_listeners=[command_spans])
         try:
             # check connection with ismaster command
             client.admin.command("ismaster")
@@ -95,6 +201,90 @@ class MongoConnection(object):
         collection = client[db_name][coll_keys]
         return collection
 
+    @staticmethod
+    def get_task_items_collection(client: MongoClient):
+        """
+        Get the task items, the tasks stored as documents in the `task` layout
+
+        :param client: MongoClient or None if not connected
+        :return: collection of task items
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_task_items]
+        return collection
+
+    @staticmethod
+    def get_task_series_collection(client: MongoClient):
+        """
+        Get the task series, the time-series collection of the tasks in the `series` layout
+
+        :param client: MongoClient or None if not connected
+        :return: collection of task measurements
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_task_series]
+        return collection
+
+    @staticmethod
+    def get_changes_collection(client: MongoClient):
+        """
+        Get the changes, the log of the changed days that the workers follow
+
+        :param client: MongoClient or None if not connected
+        :return: collection of changes
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_changes]
+        return collection
+
+    @staticmethod
+    def get_idempotency_collection(client: MongoClient):
+        """
+        Get the idempotency, the responses of the writes made with an idempotency key
+
+        :param client: MongoClient or None if not connected
+        :return: collection of idempotency
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_idempotency]
+        return collection
+
+    @staticmethod
+    def get_archive_collection(client: MongoClient):
+        """
+        Get the archive, the old days packed per month
+
+        :param client: MongoClient or None if not connected
+        :return: collection of archived months
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_archive]
+        return collection
+
+    @staticmethod
+    def get_feed_collection(client: MongoClient):
+        """
+        Get the feed, the per task projection of the tasks collection
+
+        :param client: MongoClient or None if not connected
+        :return: collection of feed
+        """
+        # check the client
+        MongoConnection.handle_not_connected(client)
+        # else assigned collection
+        collection = client[db_name][coll_feed]
+        return collection
+
 
 class MongoError(BaseException):
     """
@@ -114,39 +304,595 @@ class MongoPost:
         self.mongo_rep = {"_id": _id, "records": records}
 
 
-class MongoAPI:
-    # based check on connection
-    isConnected = False
+class MongoFeedPost:
+    """
+    Single task of the day projected to the feed at its position in the day, sorted by the start of the task
+    """
+
+    def __init__(self, day, seq, record):
+        self.mongo_rep = {"day": day, "seq": seq, "at": DateHelper.task_datetime(day, record.get("start")),
+                          "record": record}
+
+
+class MongoDayLayout:
+    """
+    Storage layout of the day as single document with array of records
+    """
+
+    def __init__(self, tasks, codec: RecordCodec):
+        self.tasks = tasks
+        self.codec = codec
+
+    def ensure_indexes(self):
+        """
+        Create the indexes of the layout, the day is the `_id` of the document so nothing else is indexed
+
+        :return: None
+        """
+        pass
+
+    def day_ids(self) -> list:
+        """
+        Get all stored days
+
+        :return: list of days in format of `dd/mm/yyyy`
+        """
+        return [item["_id"] for item in self.tasks.find({}, {"_id": 1})]
+
+    def find_all(self, session=None):
+        """
+        Find all days
+
+        :param session: causally consistent session of the read or None
+        :return: iterable of day documents with records
+        """
+        return (self.decode_day(record_day)
+                for record_day in self.tasks.find(max_time_ms=Deadline.remaining_ms(), session=session))
+
+    def find_day(self, day, session=None):
+        """
+        Find the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param session: causally consistent session of the read or None
+        :return: day document with records or None if not found
+        """
+        return self.decode_day(self.tasks.find_one({"_id": day}, max_time_ms=Deadline.remaining_ms(), session=session))
+
+    def find_days(self, days, session=None):
+        """
+        Find the days in a single query
+
+        :param days: list of days in format of `dd/mm/yyyy`
+        :param session: causally consistent session of the read or None
+        :return: iterable of day documents with records, the days not found are left out
+        """
+        return (self.decode_day(record_day) for record_day in
+                self.tasks.find({"_id": {"$in": days}}, max_time_ms=Deadline.remaining_ms(), session=session))
+
+    def find_latest(self, day, session=None):
+        """
+        Find the day with only its last record
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param session: causally consistent session of the read or None
+        :return: day document with the last record or None if not found
+        """
+        projection = {"records": {"$slice": -1}}
+        return self.decode_day(self.tasks.find_one({"_id": day}, projection, max_time_ms=Deadline.remaining_ms(),
+                                                   session=session))
+
+    def insert_day(self, day, records):
+        """
+        Insert new day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record
+        :return: None
+        """
+        post = MongoPost(day, self.codec.encode_records(day, records))
+        self.tasks.insert_one(post.mongo_rep)
+
+    def replace_records(self, day, old_records, records):
+        """
+        Replace the records of existing day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param old_records: array of record, the stored state of the day
+        :param records: array of record, the new state of the day
+        :return: None
+        """
+        self.tasks.update_one({"_id": day}, {"$set": {"records": self.codec.encode_records(day, records)}})
+
+    @contextmanager
+    def writing(self, day):
+        """
+        Hold the day while its records are read and written again, nothing to hold as the day is a single document
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: None
+        """
+        yield
+
+    def delete_day(self, day):
+        """
+        Delete the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: None
+        """
+        self.tasks.delete_one({"_id": day})
+
+    def save_day(self, day, records):
+        """
+        Overwrite the day whatever layout it is stored in, used by the migration
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record
+        :return: None
+        """
+        post = MongoPost(day, self.codec.encode_records(day, records))
+        self.tasks.replace_one({"_id": day}, post.mongo_rep, upsert=True)
+
+    def cleanup(self, day):
+        """
+        Remove what the layout stores outside of the day document after migrating away, nothing for this layout
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: None
+        """
+        pass
+
+    @staticmethod
+    def decode_day(record_day):
+        """
+        Convert the records of the stored day to the API form
+
+        :param record_day: day document or None
+        :return: day document with records in API form or None
+        """
+        if record_day is not None and "records" in record_day:
+            record_day["records"] = RecordCodec.decode_records(record_day["records"])
+        return record_day
+
+
+class MongoTaskLayout(MongoDayLayout):
+    """
+    Storage layout of every task as document, ordered by its position in the day.
+
+    The tasks collection keeps only the header of the day, so the day document does not grow with the tasks
+    and an update writes only the tasks that changed
+    """
+
+    def __init__(self, tasks, items, codec: RecordCodec):
+        super().__init__(tasks, codec)
+        self.items = items
+
+    def ensure_indexes(self):
+        self.items.create_index([("day", ASCENDING), ("seq", ASCENDING)], unique=True)
+
+    def find_all(self, session=None):
+        return self.find_grouped({}, {}, session)
+
+    def find_days(self, days, session=None):
+        return self.find_grouped({"_id": {"$in": days}}, {"day": {"$in": days}}, session)
+
+    def find_grouped(self, headers, items, session=None):
+        """
+        Find the days of the headers with their tasks
+
+        :param headers: query of the day documents
+        :param items: query of the task documents of the same days
+        :param session: causally consistent session of the read or None
+        :return: iterable of day documents with records
+        """
+        # group the tasks to their day in a single pass over the index
+        grouped = {}
+        found = self.items.find(items, max_time_ms=Deadline.remaining_ms(), session=session)
+        for item in found.sort([("day", ASCENDING), ("seq", ASCENDING)]):
+            grouped.setdefault(item["day"], []).append(RecordCodec.decode(item["record"]))
+        for header in self.tasks.find(headers, max_time_ms=Deadline.remaining_ms(), session=session):
+            yield MongoPost(header["_id"], grouped.get(header["_id"], [])).mongo_rep
+
+    def find_day(self, day, session=None):
+        if self.tasks.find_one({"_id": day}, max_time_ms=Deadline.remaining_ms(), session=session) is None:
+            return None
+        found = self.items.find({"day": day}, max_time_ms=Deadline.remaining_ms(), session=session).sort("seq", ASCENDING)
+        records = [RecordCodec.decode(item["record"]) for item in found]
+        return MongoPost(day, records).mongo_rep
+
+    def find_latest(self, day, session=None):
+        if self.tasks.find_one({"_id": day}, max_time_ms=Deadline.remaining_ms(), session=session) is None:
+            return None
+        found = self.items.find({"day": day}, max_time_ms=Deadline.remaining_ms(), session=session)
+        found = found.sort("seq", DESCENDING).limit(1)
+        records = [RecordCodec.decode(item["record"]) for item in found]
+        return MongoPost(day, records).mongo_rep
+
+    def insert_day(self, day, records):
+        # the header is inserted held by this write, the other writes of the day wait until its tasks are inserted
+        holder = ObjectId()
+        self.tasks.insert_one(dict(self.header(day, len(records)), writing=holder))
+        try:
+            if len(records) > 0:
+                self.items.insert_many([self.item(day, seq, record) for seq, record in enumerate(records)])
+        finally:
+            self.tasks.update_one({"_id": day, "writing": holder}, {"$unset": {"writing": ""}})
+
+    def replace_records(self, day, old_records, records):
+        # write only the positions that changed and drop the positions past the end
+        operations = []
+        for seq, record in enumerate(records):
+            if seq >= len(old_records) or old_records[seq] != record:
+                stored = self.codec.encode(day, record)
+                operations.append(UpdateOne({"day": day, "seq": seq}, {"$set": {"record": stored}}, upsert=True))
+        if len(records) < len(old_records):
+            operations.append(DeleteMany({"day": day, "seq": {"$gte": len(records)}}))
+        if len(operations) > 0:
+            self.items.bulk_write(operations, ordered=False)
+        if len(records) != len(old_records):
+            self.tasks.update_one({"_id": day}, {"$set": {"count": len(records)}})
+
+    @contextmanager
+    def writing(self, day):
+        # the tasks of a day are written one by one, two writes of the day interleaved would mix their records, so
+        # the header is held until the write is done and the other writes of the day wait for it
+        holder = self.hold(day)
+        try:
+            yield
+        finally:
+            if holder is not None:
+                self.tasks.update_one({"_id": day, "writing": holder}, {"$unset": {"writing": ""}})
+
+    def hold(self, day):
+        """
+        Mark the header of the day as written by this write, waiting while another write holds it
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: ObjectId of the holder or None if the day does not exist
+        :raises MongoError: if the day is still held after `WRITE_WAIT_SECONDS`
+        """
+        waited = 0.0
+        while True:
+            # the ObjectId orders by its creation time, a holder older than the hold time is taken over
+            holder = ObjectId()
+            stale = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=write_hold_seconds))
+            held = self.tasks.find_one_and_update({"_id": day, "$or": [{"writing": None}, {"writing": {"$lt": stale}}]},
+                                                  {"$set": {"writing": holder}}, projection={"_id": 1})
+            if held is not None:
+                return holder
+            if self.tasks.find_one({"_id": day}, {"_id": 1}) is None:
+                return None
+            if waited >= write_wait_seconds:
+                raise MongoError("Record is being written - update cancelled")
+            time.sleep(0.05)
+            waited += 0.05
+
+    def delete_day(self, day):
+        self.tasks.delete_one({"_id": day})
+        self.items.delete_many({"day": day})
+
+    def save_day(self, day, records):
+        self.items.delete_many({"day": day})
+        self.tasks.replace_one({"_id": day}, self.header(day, len(records)), upsert=True)
+        if len(records) > 0:
+            self.items.insert_many([self.item(day, seq, record) for seq, record in enumerate(records)])
+
+    def cleanup(self, day):
+        self.items.delete_many({"day": day})
+
+    def header(self, day, count) -> dict:
+        """
+        Day document of the layout
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param count: number of tasks of the day
+        :return: day document
+        """
+        return {"_id": day, "count": count}
+
+    def item(self, day, seq, record) -> dict:
+        """
+        Task document of the layout
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param seq: position of the task in the day
+        :param record: the task record in API form
+        :return: task document
+        """
+        return {"day": day, "seq": seq, "record": self.codec.encode(day, record)}
+
+
+class MongoSeriesLayout(MongoTaskLayout):
+    """
+    Storage layout of every task as measurement of a time-series collection, at the start of the task with the
+    platform and task as metadata and the day and position as fields, needs mongo 7.0.
+
+    Mongo groups the measurements to buckets per metadata, the day is not part of it so the tasks of the same
+    platform and task share the buckets across the days. The measurements cannot be upserted nor written in a
+    transaction, so a changed day is inserted again as a whole as a new version next to the current one, the header
+    moves to the new version and only then the other versions are deleted. The tasks of a day are ordered by their
+    position in process, a day is small while sorting all days in mongo would not use an index
+    """
+
+    def ensure_indexes(self):
+        database = self.items.database
+        if self.items.name not in database.list_collection_names():
+            database.create_collection(self.items.name, timeseries={"timeField": "at", "metaField": "meta",
+                                                                    "granularity": "hours"})
+        self.items.create_index([("day", ASCENDING), ("at", ASCENDING)])
+
+    def find_days(self, days, session=None):
+        return self.find_grouped({"_id": {"$in": days}}, {"day": {"$in": days}}, session)
+
+    def find_grouped(self, headers, items, session=None):
+        # the headers are read first, the versions they name are still there or replaced by a whole newer one
+        headers = list(self.tasks.find(headers, max_time_ms=Deadline.remaining_ms(), session=session))
+        grouped = {}
+        for item in self.items.find(items, max_time_ms=Deadline.remaining_ms(), session=session):
+            grouped.setdefault(item["day"], []).append(item)
+        for header in headers:
+            current = self.current_items(header, grouped.get(header["_id"], []))
+            yield MongoPost(header["_id"], self.ordered_records(current)).mongo_rep
+
+    def find_day(self, day, session=None):
+        header = self.tasks.find_one({"_id": day}, max_time_ms=Deadline.remaining_ms(), session=session)
+        if header is None:
+            return None
+        found = self.items.find({"day": day}, max_time_ms=Deadline.remaining_ms(), session=session)
+        return MongoPost(day, self.ordered_records(self.current_items(header, found))).mongo_rep
+
+    def find_latest(self, day, session=None):
+        header = self.tasks.find_one({"_id": day}, max_time_ms=Deadline.remaining_ms(), session=session)
+        if header is None:
+            return None
+        found = self.items.find({"day": day}, max_time_ms=Deadline.remaining_ms(), session=session)
+        return MongoPost(day, self.ordered_records(self.current_items(header, found))[-1:]).mongo_rep
+
+    def replace_records(self, day, old_records, records):
+        # the reads keep finding the current version until the header moves to the new one
+        version = ObjectId()
+        if len(records) > 0:
+            self.items.insert_many([self.item(day, seq, record, version) for seq, record in enumerate(records)])
+        self.tasks.update_one({"_id": day}, {"$set": {"count": len(records), "version": version}})
+        self.items.delete_many({"day": day, "version": {"$ne": version}})
+
+    def delete_day(self, day):
+        self.tasks.delete_one({"_id": day})
+        self.items.delete_many({"day": day})
+
+    def save_day(self, day, records):
+        self.items.delete_many({"day": day})
+        self.tasks.replace_one({"_id": day}, self.header(day, len(records)), upsert=True)
+        if len(records) > 0:
+            self.items.insert_many([self.item(day, seq, record) for seq, record in enumerate(records)])
+
+    def cleanup(self, day):
+        self.items.delete_many({"day": day})
+
+    def header(self, day, count) -> dict:
+        # tells the migration the tasks of the day are in the series, the header is the same as of the task layout
+        return {"_id": day, "count": count, "series": True}
+
+    def item(self, day, seq, record, version=None) -> dict:
+        meta = {"platform": record.get("platform"), "task": record.get("task")}
+        return {"at": DateHelper.task_datetime(day, record.get("start")), "meta": meta, "day": day, "seq": seq,
+                "version": version, "record": self.codec.encode(day, record)}
+
+    @staticmethod
+    def current_items(header, items) -> list:
+        """
+        :param header: day document of the layout, read before the measurements
+        :param items: measurements of a single day, of the current version and of the versions being replaced
+        :return: measurements of the version of the header or of the newest version if the day was written again
+                 since the header was read
+        """
+        versions = {}
+        for item in items:
+            versions.setdefault(item.get("version"), []).append(item)
+        version = header.get("version")
+        if version not in versions and header.get("count", 0) > 0 and len(versions) > 0:
+            # the days written before the versions have none
+            version = max(versions, key=lambda found: (found is not None, found))
+        return versions.get(version, [])
+
+    @staticmethod
+    def ordered_records(items) -> list:
+        """
+        :param items: measurements of a single day
+        :return: array of record in API form ordered by the position in the day
+        """
+        return [RecordCodec.decode(item["record"]) for item in sorted(items, key=lambda item: item["seq"])]
+
+
+class MongoAPI(StorageAPI):
+    client = None
     tasks = None
     keys = None
+    feed = None
+    changes = None
+    layout = None
+    # operation -> layout with the concerns of its profile, the reads on the members of `READ_PREFERENCE`
+    layouts = {}
+    secondary_reads = False
+    # cluster and operation time of the last write seen by this worker, the reads on the secondaries wait for them
+    causal_token = None
+    # process the client belongs to, MongoClient is not fork safe so every worker connects on its own
+    pid = None
+    ready_pid = None
+    # last change of the days applied to the in-process indexes and when the changes were checked
+    revision = 0
+    synced_at = 0.0
 
     def __init__(self):
-        try:
-            self.client = MongoConnection.get_database()
-            # set is connected to this instance if it is not None
-            if self.client is None:
-                self.isConnected = False
-            else:
-                self.isConnected = True
+        # the connection is made on first use in the process, after the fork of the workers
+        super().__init__()
+        self.journal = WriteJournal(journal_path) if journal_path else None
+        self.archive_cache = ArchiveCache(archive_cache_months)
+        self.profiles = MongoAPI.get_profiles(consistency_profile, consistency_routes)
 
-            if self.isConnected:
+    def connect(self):
+        """
+        Connect to mongo and build the in-process indexes, once per process. The client, collections and layouts are
+        made first and published together, the tasks collection last, so the threads reading while a reconnect runs
+        never see half of them
+
+        :return: None
+        """
+        self.pid = os.getpid()
+        self.isConnected = False
+        self.api_key = None
+        self.causal_token = None
+        self.search_index = self.suggest_index = None
+        client = tasks = keys = feed = changes = layout = idempotency = archive = None
+        layouts = {}
+        secondary_reads = False
+        try:
+            client = MongoConnection.get_database()
+            if client is not None:
                 # get the tasks collection
-                self.tasks = MongoConnection.get_tasks_collection(self.client)
+                tasks = MongoConnection.get_tasks_collection(client)
+
+                # select the storage layout of the tasks
+                layout = MongoAPI.get_layout(client, task_layout)
+                try:
+                    layout.ensure_indexes()
+                except OperationFailure as e:
+                    logging.error(e)
+                preference = MongoAPI.get_read_preference(read_preference, max_staleness)
+                secondary_reads = preference is not None
+                for operation, profile in self.profiles.items():
+                    layouts[operation] = MongoAPI.get_layout(
+                        client, task_layout, preference=preference if operation in READ_OPERATIONS else None,
+                        profile=profile)
+
+                # get the keys and the feed collection
+                keys = MongoConnection.get_keys_collection(client)
+                feed = MongoConnection.get_feed_collection(client)
 
-                # get the keys collection
-                self.keys = MongoConnection.get_keys_collection(self.client)
+                # the log of the changed days, responses of the writes with an idempotency key, expired by mongo, and
+                # old days moved out of the tasks collection, read when a day is not found there
+                changes = MongoConnection.get_changes_collection(client)
+                idempotency = MongoConnection.get_idempotency_collection(client)
+                archive = MongoConnection.get_archive_collection(client)
 
-                # check if the tasks has error
-                if self.tasks is MongoError:
-                    self.tasks = None
+                # check if the tasks or the keys has error
+                if tasks is MongoError:
+                    tasks = None
+                if keys is MongoError:
+                    keys = None
 
-                # check if the keys has error
-                if self.keys is MongoError:
-                    self.keys = None
+        except ConnectionFailure:
+            # all of the handling has been done in the try block
+            pass
+        finally:
+            self.client, self.layout, self.layouts, self.secondary_reads = client, layout, layouts, secondary_reads
+            self.keys, self.feed, self.changes, self.idempotency, self.archive = keys, feed, changes, idempotency, archive
+            self.tasks = tasks
+        self.prepare()
+
+    def prepare(self):
+        """
+        Index and fill the collections of the connection just published, then build the in-process indexes
 
+        :return: None
+        """
+        try:
+            # set is connected to this instance if it is not None
+            self.isConnected = self.client is not None
+            if self.isConnected:
+                self.breaker.success()
+
+                # make sure the feed is indexed and filled
+                self.ensure_feed()
+
+                # follow the changes of the other workers from now on, then build the in-process indexes
+                self.ensure_changes()
+                self.build_memory_indexes()
+                self.ensure_idempotency()
+            else:
+                self.breaker.trip()
         except ConnectionFailure:
             # all of the handling has been done in the try block
             pass
+        finally:
+            if self.journal is not None:
+                # writes journaled before the start of the worker
+                self.journal.count()
+            self.ready_pid = self.pid
+
+    def ensure_connected(self):
+        """
+        Connect if this process is not connected yet, also in a forked worker of a process that was
+
+        :return: None
+        """
+        if self.ready_pid != os.getpid():
+            with self.lock:
+                # the thread connecting passes through, the others wait until it is done
+                if self.ready_pid != os.getpid() and self.pid != os.getpid():
+                    self.connect()
+
+    @staticmethod
+    def get_layout(client: MongoClient, name: str, storage: str = time_storage, preference=None, profile=None):
+        """
+        Get the storage layout of the tasks
+
+        :param client: MongoClient
+        :param name: `day`, `task` or `series`
+        :param storage: `string` or `datetime` storage of start and end
+        :param preference: read preference of the collections of the layout or None for the primary
+        :param profile: key of PROFILES or None for the concerns of the URI
+        :return: the layout
+        """
+        tasks = MongoConnection.get_tasks_collection(client)
+        if name == "series":
+            items = MongoConnection.get_task_series_collection(client)
+        else:
+            items = MongoConnection.get_task_items_collection(client)
+        if preference is not None or profile is not None:
+            write_concern, read_concern = PROFILES[profile] if profile is not None else (None, None)
+            options = {"read_preference": preference, "write_concern": write_concern, "read_concern": read_concern}
+            tasks = tasks.with_options(**options)
+            items = items.with_options(**options)
+        codec = RecordCodec(storage == "datetime")
+        if name == "task":
+            return MongoTaskLayout(tasks, items, codec)
+        elif name == "series":
+            return MongoSeriesLayout(tasks, items, codec)
+        else:
+            return MongoDayLayout(tasks, codec)
+
+    @staticmethod
+    def get_profiles(default: str, routes: list) -> dict:
+        """
+        Consistency profile of every operation
+
+        :param default: profile of the operations not overridden
+        :param routes: list of `operation=profile`
+        :return: dict of operation to key of PROFILES
+        """
+        profiles = {operation: default for operation in OPERATIONS}
+        for route in routes:
+            operation, profile = route.split("=")
+            profiles[operation.strip()] = profile.strip()
+        unknown = set(profiles) - set(OPERATIONS) | set(profiles.values()) - set(PROFILES)
+        if unknown:
+            raise ValueError(f"unknown consistency operations or profiles: {', '.join(sorted(unknown))}")
+        return profiles
+
+    @staticmethod
+    def get_read_preference(mode: str, staleness: int):
+        """
+        Read preference of the reads of the days
+
+        :param mode: name of the mode, key of READ_PREFERENCES
+        :param staleness: seconds a secondary may be behind the primary or -1 for no bound
+        :return: the read preference or None for the primary
+        """
+        if mode == "primary":
+            return None
+        return READ_PREFERENCES[mode](max_staleness=staleness)
 
     def check_tasks_exist(self) -> bool:
         """
@@ -154,6 +900,7 @@ class MongoAPI:
 
         :return: None if tasks is not exist
         """
+        self.ensure_connected()
         return self.tasks is not None
 
     def check_keys_exist(self) -> bool:
@@ -162,14 +909,585 @@ class MongoAPI:
 
         :return: None if keys does not exists
         """
+        self.ensure_connected()
         return self.keys is not None
 
-    def get_connection(self):
+    def check_feed_exist(self) -> bool:
+        """
+        Check if feed exists
+
+        :return: None if feed does not exists
+        """
+        self.ensure_connected()
+        return self.feed is not None
+
+    def ensure_feed(self):
+        """
+        Create the index of the feed and fill the feed from the tasks when it is still empty
+
+        :return: None
+        """
+        if self.check_feed_exist() and self.check_tasks_exist():
+            try:
+                self.feed.create_index([("at", DESCENDING), ("_id", DESCENDING)])
+                # the tasks of the feed before they were kept by position cannot be indexed unique
+                if self.feed.find_one({"seq": {"$exists": False}}, {"_id": 1}) is not None:
+                    self.rebuild_feed()
+                self.feed.create_index([("day", ASCENDING), ("seq", ASCENDING)], unique=True)
+                self.feed.create_index([("record.task", TEXT), ("record.notes", TEXT)],
+                                       weights={"record.task": 2, "record.notes": 1}, name="feed_text")
+                if self.feed.estimated_document_count() == 0 and self.tasks.estimated_document_count() > 0:
+                    self.rebuild_feed()
+            except OperationFailure as e:
+                logging.error(e)
+
+    def rebuild_feed(self):
+        """
+        Rebuild the whole feed from the tasks collection and the archive, day by day.
+
+        The workers starting on an empty feed all rebuild it at once, every day is written by position so they end
+        up with the same feed
+
+        :return: number of tasks in the feed or None if collection cannot be found
+        """
+        if self.check_feed_exist() and self.check_tasks_exist():
+            self.feed.delete_many({"seq": {"$exists": False}})
+            count = 0
+            days = []
+            for record_day in self.find_every_day():
+                days.append(record_day["_id"])
+                count += self.sync_feed(record_day["_id"], record_day["records"])
+            self.feed.delete_many({"day": {"$nin": days}})
+            return count
+        else:
+            return None
+
+    def sync_feed(self, day, records, write_concern=None, old_records=None) -> int:
+        """
+        Write the tasks of the day to the feed by position, only the positions that changed since the previous state
+        of the day are upserted and the positions past the end are deleted, so concurrent writes of the day never
+        leave a task twice. Without the previous state every position is written
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record, the current state of the day
+        :param write_concern: WriteConcern of the write of the day or None for the one of the URI
+        :param old_records: array of record, the state of the day before the write or None if unknown
+        :return: number of tasks of the day in the feed
+        """
+        feed = self.feed.with_options(write_concern=write_concern)
+        operations = [UpdateOne({"day": day, "seq": seq}, {"$set": MongoFeedPost(day, seq, record).mongo_rep},
+                                upsert=True) for seq, record in enumerate(records)
+                      if old_records is None or seq >= len(old_records) or old_records[seq] != record]
+        if old_records is None or len(records) < len(old_records):
+            operations.append(DeleteMany({"day": day, "seq": {"$gte": len(records)}}))
+        if len(operations) == 0:
+            return len(records)
+        try:
+            feed.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            if any(write_error["code"] != 11000 for write_error in e.details["writeErrors"]):
+                raise
+            # two upserts of a new position at once, one of them inserted it and the other one updates it now
+            feed.bulk_write(operations, ordered=False)
+        return len(records)
+
+    def ensure_changes(self):
+        """
+        Expire the old changes and start following the changes from the current revision
+
+        :return: None
+        """
+        try:
+            self.changes.create_index("at", expireAfterSeconds=changes_ttl)
+            counter = self.changes.find_one({"_id": "revision"})
+            self.revision = counter["value"] if counter is not None else 0
+            self.synced_at = time.monotonic()
+        except OperationFailure as e:
+            logging.error(e)
+
+    def ensure_idempotency(self):
+        """
+        Expire the responses of the idempotency keys
+
+        :return: None
+        """
+        try:
+            self.idempotency.create_index("at", expireAfterSeconds=idempotency_ttl)
+        except OperationFailure as e:
+            logging.error(e)
+
+    def build_memory_indexes(self):
+        """
+        Build the in-process indexes from the tasks collection and the archive in a single pass
+
+        :return: None
+        """
+        if self.check_tasks_exist():
+            # the in-process search index is only build if it is selected
+            self.reset_memory_indexes(search_backend == "memory")
+            for record_day in self.find_every_day():
+                self.update_memory_indexes(record_day["_id"], record_day["records"])
+            for field, index in self.suggest_index.items():
+                logging.info(f"suggest index {field}: {len(index.entries)} entries, {index.memory_usage()} bytes")
+
+    def record_change(self, day, write_concern=None):
+        """
+        Log the change of the day so the other workers update their in-process indexes
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param write_concern: WriteConcern of the write of the day or None for the one of the URI
+        :return: None
+        """
+        changes = self.changes.with_options(write_concern=write_concern)
+        # after the write of the day on the primary, the reads of this worker wait for it on the secondaries
+        with self.primary_session() as session:
+            counter = changes.find_one_and_update({"_id": "revision"}, {"$inc": {"value": 1}}, upsert=True,
+                                                  return_document=ReturnDocument.AFTER, session=session)
+            changes.insert_one({"_id": counter["value"], "day": day, "at": datetime.utcnow()}, session=session)
+        with self.lock:
+            self.written = max(self.written, counter["value"])
+            if counter["value"] == self.revision + 1:
+                # nobody else wrote in between, this worker is up to date
+                self.revision = counter["value"]
+
+    def sync_changes(self, revision=0):
+        """
+        Apply the changes of the other workers to the in-process indexes, at most once per `SYNC_INTERVAL` unless a
+        client has written a revision this worker has not seen yet. The changes are read on the primary, so the
+        reads of the days after the sync see them on the secondaries as well
+
+        :param revision: revision a client has written up to, synced at once when this worker is behind it
+        :return: None
+        """
+        if revision <= self.revision and time.monotonic() - self.synced_at < sync_interval:
+            return
+        self.synced_at = time.monotonic()
+        if self.journal is not None:
+            # the writes journaled by the other workers stop the caching of the responses as well
+            self.journal.count()
+        if self.changes is None:
+            return
+        with self.lock:
+            try:
+                # the writes of the other workers are read on the secondaries too, once seen here
+                with self.primary_session() as session:
+                    found = list(self.changes.find({"_id": {"$gt": self.revision}}, session=session).sort("_id", ASCENDING))
+                self.apply_changes(found)
+            except OperationFailure as e:
+                logging.error(e)
+
+    def apply_changes(self, found):
+        """
+        Apply the changes that follow the revision of this worker without a gap. The counter moves before the change
+        is inserted, so a missing revision may still be written by another worker and the changes after it wait for
+        it. A revision missing for longer than `WRITE_HOLD_SECONDS` expired or its write failed, the in-process indexes
+        are built again
+
+        :param found: changes after the revision of this worker in the order of their revision
+        :return: None
+        """
+        contiguous = []
+        for change in found:
+            if change["_id"] != self.revision + len(contiguous) + 1:
+                break
+            contiguous.append(change)
+        if len(contiguous) < len(found):
+            missing_for = (datetime.utcnow() - found[len(contiguous)]["at"]).total_seconds()
+            if missing_for > write_hold_seconds:
+                self.build_memory_indexes()
+                self.revision = found[-1]["_id"]
+                return
+        for day in {change["day"] for change in contiguous}:
+            record_day = self.layout.find_day(day)
+            self.update_memory_indexes(day, record_day["records"] if record_day is not None else [])
+        if len(contiguous) > 0:
+            self.revision = contiguous[-1]["_id"]
+
+    @contextmanager
+    def primary_session(self):
+        """
+        Session of commands on the primary, the causal token moves forward to their cluster and operation time when
+        they are done. No session when the reads stay on the primary
+
+        :return: context manager of the ClientSession or None
+        """
+        if not self.secondary_reads:
+            yield None
+            return
+        with self.client.start_session(causal_consistency=True) as session:
+            yield session
+            if session.cluster_time is None or session.operation_time is None:
+                # standalone server, no causal consistency and no secondaries either
+                return
+            with self.lock:
+                token = self.causal_token
+                if token is None or session.operation_time > token[1]:
+                    self.causal_token = (session.cluster_time, session.operation_time)
+
+    @contextmanager
+    def read_session(self):
+        """
+        Causally consistent session of a read of the days, a secondary answers once it applied the last write seen by
+        this worker, reads on the primary need no session
+
+        :return: context manager of the ClientSession or None
+        """
+        if not self.secondary_reads:
+            yield None
+            return
+        with self.client.start_session(causal_consistency=True) as session:
+            token = self.causal_token
+            if token is not None:
+                session.advance_cluster_time(token[0])
+                session.advance_operation_time(token[1])
+            yield session
+
+    def on_day_changed(self, day, records, layout=None, old_records=None):
+        """
+        Keep the projections of the tasks collection up to date after a write
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record, the current state of the day - empty if the day is deleted
+        :param layout: layout of the write, the projections are written with its write concern
+        :param old_records: array of record, the state of the day before the write or None if unknown
+        :return: None
+        """
+        write_concern = layout.tasks.write_concern if layout is not None else None
+        if self.check_feed_exist():
+            try:
+                self.sync_feed(day, records, write_concern, old_records)
+            except OperationFailure as e:
+                # the day itself is written, the feed can be rebuild later
+                logging.error(e)
+
+        with self.lock:
+            self.update_memory_indexes(day, records)
+
+        if self.changes is not None:
+            try:
+                self.record_change(day, write_concern)
+            except OperationFailure as e:
+                logging.error(e)
+
+    def write(self, op, day, *args):
+        """
+        Write to mongo or to the journal while mongo is unavailable or the journal is not replayed yet, so the
+        writes reach mongo in order
+
+        :param op: name of the write, key of WRITE_OPS
+        :param day: day in format of `dd/mm/yyyy`
+        :param args: arguments of the write after the day
+        :return: response of the write or dict with message journaled
+        """
+        if self.journal is not None and (self.breaker.state != CLOSED or self.journal.count() > 0):
+            self.journal.append(op, day, list(args))
+            self.changed()
+            return http_res.JOURNALED
+        try:
+            return getattr(self, WRITE_OPS[op])(day, *args)
+        except ConnectionFailure as e:
+            if self.journal is None:
+                raise
+            # the write may have reached mongo before the failure, it is applied again by the replay
+            logging.error(e)
+            self.breaker.failure()
+            self.journal.append(op, day, list(args))
+            self.changed()
+            return http_res.JOURNALED
+
+    def replay_journal(self) -> int:
+        """
+        Apply the journaled writes to mongo in order
+
+        :return: number of writes applied
+        """
+        if self.journal is None or self.journal.count() == 0 or not self.check_tasks_exist():
+            return 0
+
+        def apply(op, day, args):
+            # a write that fails against the stored state, e.g. creating a day created meanwhile, is dropped
+            response = getattr(self, WRITE_OPS[op])(day, *args)
+            if response is None:
+                raise ConnectionFailure(error.MONGO_CONNECTION)
+            logging.info(f"journal {op} {day}: {response}")
+
+        return self.journal.replay(apply)
+
+    @staticmethod
+    def apply_pending(record_day, day, op, args):
+        """
+        Apply a journaled write to the stored day, the same way the write is applied to mongo
+
+        :param record_day: day document with records or None if not stored
+        :param day: day in format of `dd/mm/yyyy`
+        :param op: name of the write
+        :param args: arguments of the write after the day
+        :return: day document with records or None if the day does not exist after the write
+        """
+        if op == "create":
+            return record_day if record_day else {"_id": day, "records": args[0]}
+        elif op == "update":
+            return {"_id": day, "records": args[0]} if record_day is not None else None
+        elif op == "delete_day":
+            return None
+        elif op == "delete_task" and record_day is not None:
+            records = ListHelper.delete_element(list(record_day["records"]), args[0])
+            return {"_id": day, "records": records}
+        return record_day
+
+    def merge_pending(self, day, record_day):
+        """
+        Merge the journaled writes of the day not replayed yet into the stored day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param record_day: day document with records or None if not stored
+        :return: day document with records or None
+        """
+        if self.journal is not None:
+            for _, op, _, args in self.journal.pending(day):
+                record_day = MongoAPI.apply_pending(record_day, day, op, args)
+        return record_day
+
+    def find_every_day(self):
         """
-        GET the connection status of the database connection
+        Find all days of the tasks collection and then the archived ones, for the projections of all days
 
-        :return: True if mongo is connected, False otherwise
+        :return: iterable of day documents with records
         """
+        days = set()
+        for record_day in self.layout.find_all():
+            days.add(record_day["_id"])
+            yield record_day
+        yield from self.find_all_archived(days)
+
+    def find_archived(self, day):
+        """
+        Find the day in the archive
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: day document with records or None if not archived
+        """
+        month = MonthArchive.month_of(day)
+        if self.archive is None or month is None:
+            return None
+        stored = self.archive.find_one({"_id": month, "days": day}, {"version": 1}, max_time_ms=Deadline.remaining_ms())
+        if stored is None:
+            return None
+        records = self.archived_month(month, stored["version"]).get(day)
+        return MongoAPI.archived_day(day, records) if records is not None else None
+
+    def find_archived_days(self, days) -> dict:
+        """
+        Find the days in the archive in a single query
+
+        :param days: list of days in format of `dd/mm/yyyy`
+        :return: dict of day to day document with records, the days not archived are left out
+        """
+        months = {MonthArchive.month_of(day) for day in days} - {None}
+        if self.archive is None or len(months) == 0:
+            return {}
+        found = {}
+        query = {"_id": {"$in": sorted(months)}, "days": {"$in": list(days)}}
+        for stored in self.archive.find(query, {"version": 1}, max_time_ms=Deadline.remaining_ms()):
+            archived = self.archived_month(stored["_id"], stored["version"])
+            for day in days:
+                if day in archived:
+                    found[day] = MongoAPI.archived_day(day, archived[day])
+        return found
+
+    def find_all_archived(self, skip) -> list:
+        """
+        Find all archived days
+
+        :param skip: set of days not to return, the ones still in the tasks collection
+        :return: list of day documents with records
+        """
+        if self.archive is None:
+            return []
+        found = []
+        for stored in self.archive.find({}, {"version": 1}, max_time_ms=Deadline.remaining_ms()).sort("_id", ASCENDING):
+            for day, records in self.archived_month(stored["_id"], stored["version"]).items():
+                if day not in skip:
+                    found.append(MongoAPI.archived_day(day, records))
+        return found
+
+    def archived_month(self, month, version) -> dict:
+        """
+        Unpacked days of the archived month, from the cache of the worker if unpacked from the same version
+
+        :param month: month in format of `yyyy-mm`
+        :param version: current version of the month
+        :return: dict of day to array of record
+        """
+        with self.lock:
+            days = self.archive_cache.get(month, version)
+        if days is None:
+            stored = self.archive.find_one({"_id": month}, max_time_ms=Deadline.remaining_ms())
+            if stored is None:
+                # restored meanwhile
+                return {}
+            days = MonthArchive.unpack(stored["blob"])
+            with self.lock:
+                self.archive_cache.put(month, stored["version"], days)
+        return days
+
+    @staticmethod
+    def archived_day(day, records) -> dict:
+        # a copy, the cached month is shared by the reads and the records are changed by some of them
+        return MongoPost(day, [dict(record) for record in records]).mongo_rep
+
+    def save_month(self, month, days, version) -> bool:
+        """
+        Write the packed days of the month to the archive if it is still at the version, durable whatever the
+        profiles of the routes
+
+        :param month: month in format of `yyyy-mm`
+        :param days: dict of day to array of record, the month is dropped when it has no days
+        :param version: version of the stored month, 0 if it is not stored
+        :return: True if written, False if the month was changed meanwhile
+        """
+        archive = self.archive.with_options(write_concern=PROFILES["durable"][0])
+        if len(days) == 0:
+            return version == 0 or archive.delete_one({"_id": month, "version": version}).deleted_count == 1
+        document = {"_id": month, "version": version + 1, "days": sorted(days), "blob": MonthArchive.pack(days),
+                    "at": datetime.utcnow()}
+        try:
+            if version == 0:
+                archive.insert_one(document)
+                return True
+            return archive.replace_one({"_id": month, "version": version}, document).matched_count == 1
+        except DuplicateKeyError:
+            return False
+
+    def update_month(self, month, change):
+        """
+        Change the packed days of the archived month, applied again to the stored month if it changed meanwhile
+
+        :param month: month in format of `yyyy-mm`
+        :param change: function changing the dict of day to array of record in place
+        :return: None
+        """
+        while True:
+            stored = self.archive.find_one({"_id": month})
+            packed = MonthArchive.unpack(stored["blob"]) if stored is not None else {}
+            change(packed)
+            if self.save_month(month, packed, stored["version"] if stored is not None else 0):
+                return
+
+    def archive_days(self, before: datetime) -> dict:
+        """
+        Move the days before the date from the tasks collection to the archive, month by month
+
+        :param before: datetime of the first day kept
+        :return: dict of month to number of days moved
+        """
+        grouped = {}
+        for day in self.layout.day_ids():
+            midnight = DateHelper.parse_day(day)
+            if midnight is not None and midnight < before:
+                grouped.setdefault(MonthArchive.month_of(day), []).append(day)
+        return {month: self.archive_month(month, days) for month, days in sorted(grouped.items())}
+
+    def archive_month(self, month, days) -> int:
+        """
+        Move the days of the month to the archive. The month is written before the days are deleted, a day written
+        meanwhile stays and is archived by the next run.
+
+        The feed and the in-process indexes keep the archived days, the API still serves them
+
+        :param month: month in format of `yyyy-mm`
+        :param days: list of days of the month in format of `dd/mm/yyyy`
+        :return: number of days moved
+        """
+        found = {}
+        for day in days:
+            record_day = self.layout.find_day(day)
+            if record_day is not None:
+                found[day] = record_day["records"]
+        self.update_month(month, lambda packed: packed.update(found))
+
+        moved = 0
+        deleted = []
+        for day, records in found.items():
+            current = self.layout.find_day(day)
+            if current is None:
+                # deleted by a client meanwhile, it must not come back from the archive
+                deleted.append(day)
+            elif current["records"] == records:
+                self.layout.delete_day(day)
+                moved += 1
+
+        def drop_deleted(packed):
+            for day in deleted:
+                packed.pop(day, None)
+
+        if len(deleted) > 0:
+            self.update_month(month, drop_deleted)
+        return moved
+
+    def restore_archived(self, layout, day):
+        """
+        Move the archived day back to the tasks collection before it is written, so the write applies to it
+
+        :param layout: layout of the write
+        :param day: day in format of `dd/mm/yyyy`
+        :return: None
+        """
+        archived = self.find_archived(day)
+        if archived is None:
+            return
+        try:
+            layout.insert_day(day, archived["records"])
+        except DuplicateKeyError:
+            # restored by another write of the day
+            pass
+        self.update_month(MonthArchive.month_of(day), lambda packed: packed.pop(day, None))
+
+    def restore_month(self, month) -> int:
+        """
+        Move the days of the month from the archive back to the tasks collection
+
+        :param month: month in format of `yyyy-mm`
+        :return: number of days restored
+        """
+        stored = self.archive.find_one({"_id": month})
+        if stored is None:
+            return 0
+        restored = 0
+        for day, records in MonthArchive.unpack(stored["blob"]).items():
+            # a day created again since it was archived is newer
+            if self.layout.find_day(day) is None:
+                self.layout.save_day(day, records)
+                self.on_day_changed(day, records)
+                restored += 1
+        self.archive.delete_one({"_id": month})
+        return restored
+
+    def ping(self) -> bool:
+        """
+        Probe mongo, reconnecting when the connection could not be made before
+
+        :return: True if mongo answers, False otherwise
+        """
+        self.ensure_connected()
+        started = time.monotonic()
+        try:
+            if self.client is None:
+                with self.lock:
+                    if self.client is None:
+                        self.connect()
+            else:
+                self.client.admin.command("ping")
+                self.isConnected = True
+        except (ConnectionFailure, OperationFailure) as e:
+            logging.error(e)
+            self.isConnected = False
+        if self.isConnected:
+            self.breaker.success()
+        else:
+            self.breaker.failure()
+        self.checked_at = time.monotonic()
+        self.latency_ms = round((self.checked_at - started) * 1000, 3) if self.isConnected else None
         return self.isConnected
 
     def get_key(self):
@@ -188,11 +1506,90 @@ class MongoAPI:
         else:
             return None
 
-    def get_client_key(self, body: AccessKey):
-        client_token = body.access_token
-        if CryptoHelper.verify_token(client_token, CLIENT_SECRET):
-            # if it is verified get the key from the database
-            return self.get_key()
+    def claim_idempotent(self, key, fingerprint):
+        """
+        Claim the idempotency key before the write is made, so a retry running at the same time does not write again,
+        nothing is claimed while mongo is unavailable so the write can still be journaled
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :return: None if the key is claimed for this write, else dict with fingerprint of the request, status and
+                 body of the response of the key, status None while the write of the key is running
+        """
+        self.ensure_connected()
+        if self.idempotency is None or self.breaker.state != CLOSED:
+            return None
+        now = datetime.utcnow()
+        claim = {"_id": key, "fingerprint": fingerprint, "status": None, "body": None, "at": now}
+        # the expired documents are removed by mongo once a minute, the claim of a write that never ended is taken
+        # over once it is older than `IDEMPOTENCY_PENDING`, a key in use fails the upsert on its `_id`
+        stale = {"_id": key, "$or": [{"at": {"$lt": now - timedelta(seconds=idempotency_ttl)}},
+                                     {"status": None, "at": {"$lt": now - timedelta(seconds=idempotency_pending)}}]}
+        try:
+            self.idempotency.replace_one(stale, claim, upsert=True)
+            return None
+        except DuplicateKeyError:
+            pass
+        except ConnectionFailure as e:
+            logging.error(e)
+            return None
+        try:
+            return self.idempotency.find_one({"_id": key}, max_time_ms=Deadline.remaining_ms())
+        except ConnectionFailure as e:
+            logging.error(e)
+            return None
+
+    def release_idempotent(self, key):
+        """
+        Drop the claim of the key when its write failed, so the retry writes again
+
+        :param key: the idempotency key of the client
+        :return: None
+        """
+        if self.idempotency is None:
+            return
+        try:
+            self.idempotency.delete_one({"_id": key, "status": None})
+        except ConnectionFailure as e:
+            logging.error(e)
+
+    def save_idempotent(self, key, fingerprint, status, body):
+        """
+        Save the response of the write made with the idempotency key, the first response of the key is kept
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :param status: status code of the response
+        :param body: body of the response
+        :return: None
+        """
+        self.ensure_connected()
+        if self.idempotency is None or self.breaker.state != CLOSED:
+            return
+        try:
+            # completes the claim of the write, or inserts the response if the key was not claimed
+            self.idempotency.update_one({"_id": key, "status": None},
+                                        {"$set": {"fingerprint": fingerprint, "status": status, "body": body,
+                                                  "at": datetime.utcnow()}}, upsert=True)
+        except DuplicateKeyError:
+            pass
+        except ConnectionFailure as e:
+            logging.error(e)
+
+    def day_ids(self) -> list:
+        """
+        Get all stored days
+
+        :return: list of days in format of `dd/mm/yyyy` or None if collection cannot be found
+        """
+        if not self.check_tasks_exist():
+            return None
+        days = self.layout.day_ids()
+        if self.archive is not None:
+            hot = set(days)
+            for stored in self.archive.find({}, {"days": 1}):
+                days.extend(day for day in stored["days"] if day not in hot)
+        return days
 
     def get_all_records(self):
         """
@@ -204,9 +1601,15 @@ class MongoAPI:
         if self.check_tasks_exist():
             # return all data
             data = []
-            records = self.tasks.find()
-            for item in records:
-                data.append(item)
+            with self.read_session() as session:
+                for item in self.layouts["all"].find_all(session):
+                    data.append(item)
+            data.extend(self.find_all_archived({item["_id"] for item in data}))
+            if self.journal is not None and self.journal.count() > 0:
+                days = {item["_id"]: item for item in data}
+                for _, op, day, args in self.journal.pending():
+                    days[day] = MongoAPI.apply_pending(days.get(day), day, op, args)
+                data = [item for item in days.values() if item is not None]
             return data
         else:
             return None
@@ -221,8 +1624,11 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             # return day data
-            this = {"_id": day}
-            record_day = self.tasks.find_one(this)
+            with self.read_session() as session:
+                record_day = self.layouts["day"].find_day(day, session)
+            if record_day is None:
+                record_day = self.find_archived(day)
+            record_day = self.merge_pending(day, record_day)
             if record_day is None:
                 return None
             else:
@@ -231,6 +1637,27 @@ class MongoAPI:
         else:
             return None
 
+    def get_records_for_days(self, days):
+        """
+        GET records of the days in a single query
+
+        :param days: list of days in format of `dd/mm/yyyy`
+        :return: dict of day to array of record or None if the day is not found, None if collection cannot be found
+        """
+        if not self.check_tasks_exist():
+            return None
+        days = list(days)
+        with self.read_session() as session:
+            found = {item["_id"]: item for item in self.layouts["day"].find_days(days, session)}
+        missing = [day for day in days if day not in found]
+        if len(missing) > 0:
+            found.update(self.find_archived_days(missing))
+        records = {}
+        for day in days:
+            record_day = self.merge_pending(day, found.get(day))
+            records[day] = record_day["records"] if record_day is not None else None
+        return records
+
     def get_most_recent_record(self, day):
         """
         GET the latest record
@@ -242,8 +1669,13 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             # return most recent record
-            this = {"_id": day}
-            record_day = self.tasks.find_one(this)
+            with self.read_session() as session:
+                if self.journal is not None and len(self.journal.pending(day)) > 0:
+                    record_day = self.merge_pending(day, self.layouts["latest"].find_day(day, session))
+                else:
+                    record_day = self.layouts["latest"].find_latest(day, session)
+            if record_day is None:
+                record_day = self.merge_pending(day, self.find_archived(day))
             if record_day is None:
                 return None
             else:
@@ -253,6 +1685,65 @@ class MongoAPI:
         else:
             return None
 
+    def get_recent_tasks(self, limit, cursor=None):
+        """
+        GET the most recent tasks across all days, paginated by cursor
+
+        :param limit: maximum number of tasks in the page
+        :param cursor: cursor of the last task of the previous page or None for the first page
+        :return: dict with tasks and cursor of the next page, dict with message failed or None if collection cannot be
+        found
+        """
+
+        # check if feed collection exists
+        if self.check_feed_exist():
+            query = {}
+            if cursor is not None:
+                values = CursorHelper.decode(cursor)
+                try:
+                    at = datetime.fromisoformat(values[0])
+                    last = ObjectId(values[1])
+                except (TypeError, ValueError, IndexError, InvalidId):
+                    return http_res.FAILED_CURSOR
+                # keyset pagination on the index, everything strictly after the last task
+                query = {"$or": [{"at": {"$lt": at}}, {"at": at, "_id": {"$lt": last}}]}
+
+            # fetch one more to know if there is a next page
+            found = list(self.feed.find(query, max_time_ms=Deadline.remaining_ms())
+                         .sort([("at", DESCENDING), ("_id", DESCENDING)]).limit(limit + 1))
+            page = found[:limit]
+            next_cursor = None
+            if len(found) > limit:
+                last_item = page[-1]
+                next_cursor = CursorHelper.encode(last_item["at"].isoformat(), str(last_item["_id"]))
+
+            data = [http_res.set_object(day=item["day"], record=item["record"]) for item in page]
+            return http_res.set_object(data=data, next=next_cursor)
+        else:
+            return None
+
+    def search_tasks(self, query, offset, limit):
+        """
+        GET the tasks matching the query in the task name or notes, ranked by relevance
+
+        :param query: the search query
+        :param offset: number of tasks to skip
+        :param limit: maximum number of tasks in the page
+        :return: dict with tasks and offset of the next page or None if collection cannot be found
+        """
+        if search_backend == "memory":
+            return super().search_tasks(query, offset, limit)
+        elif self.check_feed_exist():
+            # fetch one more to know if there is a next page
+            found = list(self.feed.find({"$text": {"$search": query}}, {"score": {"$meta": "textScore"}},
+                                        max_time_ms=Deadline.remaining_ms())
+                         .sort([("score", {"$meta": "textScore"}), ("at", DESCENDING)])
+                         .skip(offset).limit(limit + 1))
+            page = [(item["score"], item["day"], item["record"]) for item in found[:limit]]
+            return StorageAPI.search_page(query, page, offset, limit, len(found) > limit)
+        else:
+            return None
+
     def create_record_for_day(self, day, records):
         """
         POST create record for the day
@@ -265,13 +1756,18 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             try:
-                existing = self.get_record_for_day(day)
+                layout = self.layouts["create"]
+                existing = layout.find_day(day) or self.find_archived(day)
                 if existing:
                     raise MongoError("Record already exists - creation aborted")
                 else:
                     # create the post
-                    post = MongoPost(day, records)
-                    self.tasks.insert_one(post.mongo_rep)
+                    try:
+                        layout.insert_day(day, records)
+                    except DuplicateKeyError:
+                        # another write created the day since it was looked up
+                        raise MongoError("Record already exists - creation aborted")
+                    self.on_day_changed(day, records, layout)
                     return http_res.SUCCESS_CREATE_UPDATE
             except MongoError as e:
                 logging.error(e)
@@ -291,14 +1787,18 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             try:
-                existing = self.get_record_for_day(day)
-                if existing is None:
-                    # if not exists escape the function
-                    raise MongoError("Record not found - update cancelled")
-                else:
-                    # update
-                    self.tasks.update_one({"_id": day}, {"$set": {"records": records}})
-                    return http_res.SUCCESS_CREATE_UPDATE
+                layout = self.layouts["update"]
+                self.restore_archived(layout, day)
+                with layout.writing(day):
+                    existing = layout.find_day(day)
+                    if existing is None:
+                        # if not exists escape the function
+                        raise MongoError("Record not found - update cancelled")
+                    else:
+                        # update
+                        layout.replace_records(day, existing["records"], records)
+                        self.on_day_changed(day, records, layout, existing["records"])
+                        return http_res.SUCCESS_CREATE_UPDATE
             except MongoError as e:
                 logging.error(e)
                 return http_res.FAILED_CREATE_UPDATE
@@ -316,13 +1816,17 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             try:
-                existing = self.get_record_for_day(day)
-                if existing is None:
-                    raise MongoError("Record not found - delete cancelled")
-                else:
-                    # delete
-                    self.tasks.delete_one({"_id": day})
-                    return http_res.SUCCESS_DELETED_DAY
+                layout = self.layouts["delete_day"]
+                self.restore_archived(layout, day)
+                with layout.writing(day):
+                    existing = layout.find_day(day)
+                    if existing is None:
+                        raise MongoError("Record not found - delete cancelled")
+                    else:
+                        # delete
+                        layout.delete_day(day)
+                        self.on_day_changed(day, [], layout, existing["records"])
+                        return http_res.SUCCESS_DELETED_DAY
             except MongoError as e:
                 logging.error(e)
                 return http_res.FAILED_DELETED_DAY
@@ -342,24 +1846,28 @@ class MongoAPI:
         # check if tasks collection exists
         if self.check_tasks_exist():
             try:
-                existing = self.get_record_for_day(day)
-                if existing is None:
-                    raise MongoError("Record not found - delete cancelled")
-                else:
+                layout = self.layouts["delete_task"]
+                self.restore_archived(layout, day)
+                with layout.writing(day):
+                    existing = layout.find_day(day)
+                    if existing is None:
+                        raise MongoError("Record not found - delete cancelled")
+                    else:
 
-                    # copy to new list here
-                    new_records = existing["records"].copy()
+                        # copy to new list here
+                        new_records = existing["records"].copy()
 
-                    # to delete task
-                    new_records = ListHelper.delete_element(new_records, task)
+                        # to delete task
+                        new_records = ListHelper.delete_element(new_records, task)
 
-                    # if records is equal to existing records
-                    # nothing has change message
-                    if new_records == existing["records"]:
-                        return http_res.FAILED_DELETED_TASK_NON
+                        # if records is equal to existing records
+                        # nothing has change message
+                        if new_records == existing["records"]:
+                            return http_res.FAILED_DELETED_TASK_NON
 
-                    self.tasks.update_one({"_id": day}, {"$set": {"records": new_records}})
-                    return http_res.SUCCESS_DELETED_TASK
+                        layout.replace_records(day, existing["records"], new_records)
+                        self.on_day_changed(day, new_records, layout, existing["records"])
+                        return http_res.SUCCESS_DELETED_TASK
             except MongoError as e:
                 logging.error(e)
                 return http_res.FAILED_DELETED_TASK
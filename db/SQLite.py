@@ -0,0 +1,569 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from decouple import config
+from helpers.crypt import CryptoHelper
+from helpers.crypt import SECRET
+from helpers.list_helper import ListHelper
+from helpers.date_helper import DateHelper
+from helpers.cursor_helper import CursorHelper
+from db.Storage import StorageAPI, sync_interval, changes_ttl, idempotency_ttl, idempotency_pending
+
+# import response
+import src.http_response as http_res
+
+# file of the embedded database, shared by the workers
+sqlite_path = config("SQLITE_PATH", default="taskmaster.db")
+# `NORMAL` loses the last commits on power loss but never on a crash of the process in WAL mode, `FULL` loses none
+sqlite_synchronous = config("SQLITE_SYNCHRONOUS", default="NORMAL")
+# seconds a write waits for the write lock of another worker
+sqlite_busy_timeout = config("SQLITE_BUSY_TIMEOUT", default=5.0, cast=float)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS days (
+    day TEXT PRIMARY KEY,
+    records TEXT NOT NULL CHECK (json_valid(records))
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    at TEXT NOT NULL,
+    record TEXT NOT NULL CHECK (json_valid(record))
+);
+CREATE UNIQUE INDEX IF NOT EXISTS tasks_day ON tasks (day, seq);
+CREATE INDEX IF NOT EXISTS tasks_at ON tasks (at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS tasks_task ON tasks (json_extract(record, '$.task'));
+CREATE TABLE IF NOT EXISTS keys (
+    type TEXT PRIMARY KEY,
+    key TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    rev INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS changes_at ON changes (at);
+CREATE TABLE IF NOT EXISTS idempotency (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_at ON idempotency (at);
+"""
+
+
+class SQLiteAPI(StorageAPI):
+    """
+    Embedded storage in a SQLite file in WAL mode, the records of the day are a JSON array and every task is
+    projected to a row for the feed.
+
+    Every thread of every worker has its own connection, the workers see the writes of the others through the
+    changes table. The reads and writes raise sqlite3.OperationalError when the file is locked or cannot be read,
+    which the server answers as an unavailable storage
+    """
+    # process the database was opened by, the connections are not fork safe
+    pid = None
+    ready_pid = None
+    # last change of the days applied to the in-process indexes and when the changes were checked
+    revision = 0
+    synced_at = 0.0
+
+    def __init__(self, path: str = sqlite_path):
+        super().__init__()
+        self.path = path
+        self.local = threading.local()
+
+    def open(self) -> sqlite3.Connection:
+        """
+        Open a connection to the database
+
+        :return: the connection, in autocommit mode as the transactions are explicit
+        """
+        connection = sqlite3.connect(self.path, timeout=sqlite_busy_timeout, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"PRAGMA synchronous={sqlite_synchronous}")
+        return connection
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        Connection of the current thread
+
+        :return: the connection
+        """
+        if getattr(self.local, "pid", None) != os.getpid():
+            self.local.connection = self.open()
+            self.local.pid = os.getpid()
+        return self.local.connection
+
+    @contextmanager
+    def transaction(self):
+        """
+        Write transaction, holding the write lock of the file from the start so the reads in it are current
+
+        :return: the connection
+        """
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def connect(self):
+        """
+        Create the schema and build the in-process indexes, once per process
+
+        :return: None
+        """
+        self.pid = os.getpid()
+        self.isConnected = False
+        self.api_key = None
+        try:
+            connection = self.connection()
+            connection.executescript(SCHEMA)
+            # follow the changes of the other workers from now on, then build the in-process indexes
+            self.revision = connection.execute("SELECT COALESCE(MAX(rev), 0) FROM changes").fetchone()[0]
+            self.synced_at = time.monotonic()
+            self.build_memory_indexes()
+            self.isConnected = True
+            self.breaker.success()
+        except sqlite3.Error as e:
+            logging.error(e)
+            self.breaker.trip()
+        finally:
+            self.ready_pid = self.pid
+
+    def ensure_connected(self):
+        """
+        Open the database if this process has not opened it yet, also in a forked worker of a process that has
+
+        :return: None
+        """
+        if self.ready_pid != os.getpid():
+            with self.lock:
+                # the thread connecting passes through, the others wait until it is done
+                if self.ready_pid != os.getpid() and self.pid != os.getpid():
+                    self.connect()
+
+    def ping(self) -> bool:
+        """
+        Probe the database, creating the schema when the database could not be opened before
+
+        :return: True if the database answers, False otherwise
+        """
+        self.ensure_connected()
+        started = time.monotonic()
+        try:
+            if not self.isConnected:
+                with self.lock:
+                    self.connect()
+            else:
+                self.connection().execute("SELECT 1").fetchone()
+        except sqlite3.Error as e:
+            logging.error(e)
+            self.isConnected = False
+        if self.isConnected:
+            self.breaker.success()
+        else:
+            self.breaker.failure()
+        self.checked_at = time.monotonic()
+        self.latency_ms = round((self.checked_at - started) * 1000, 3) if self.isConnected else None
+        return self.isConnected
+
+    def build_memory_indexes(self):
+        """
+        Build the in-process indexes from the days in a single pass
+
+        :return: None
+        """
+        self.reset_memory_indexes(True)
+        for day, records in self.connection().execute("SELECT day, records FROM days"):
+            self.update_memory_indexes(day, json.loads(records))
+
+    def sync_changes(self, revision=0):
+        """
+        Apply the changes of the other workers to the in-process indexes, at most once per `SYNC_INTERVAL` unless a
+        client has written a revision this worker has not seen yet
+
+        :param revision: revision a client has written up to, synced at once when this worker is behind it
+        :return: None
+        """
+        if not self.isConnected or (revision <= self.revision and time.monotonic() - self.synced_at < sync_interval):
+            return
+        self.synced_at = time.monotonic()
+        with self.lock:
+            try:
+                found = self.connection().execute("SELECT rev, day FROM changes WHERE rev > ? ORDER BY rev",
+                                                  (self.revision,)).fetchall()
+                if len(found) == 0:
+                    return
+                if found[0][0] != self.revision + 1:
+                    # some changes are already expired, start over
+                    self.build_memory_indexes()
+                else:
+                    for day in {day for _, day in found}:
+                        record_day = self.find_day(day)
+                        self.update_memory_indexes(day, record_day["records"] if record_day is not None else [])
+                self.revision = found[-1][0]
+            except sqlite3.Error as e:
+                logging.error(e)
+
+    def save_day(self, connection: sqlite3.Connection, day, records) -> int:
+        """
+        Write the day and its tasks in the transaction and log the change for the other workers
+
+        :param connection: connection in the write transaction
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record, the new state of the day - None if the day is deleted
+        :return: revision of the change
+        """
+        connection.execute("DELETE FROM tasks WHERE day = ?", (day,))
+        if records is None:
+            connection.execute("DELETE FROM days WHERE day = ?", (day,))
+        else:
+            connection.execute("INSERT INTO days (day, records) VALUES (?, ?) "
+                               "ON CONFLICT (day) DO UPDATE SET records = excluded.records",
+                               (day, json.dumps(records, separators=(",", ":"))))
+            connection.executemany(
+                "INSERT INTO tasks (day, seq, at, record) VALUES (?, ?, ?, ?)",
+                [(day, seq, DateHelper.task_datetime(day, record.get("start")).isoformat(),
+                  json.dumps(record, separators=(",", ":"))) for seq, record in enumerate(records)]
+            )
+        now = time.time()
+        connection.execute("DELETE FROM changes WHERE at < ?", (now - changes_ttl,))
+        return connection.execute("INSERT INTO changes (day, at) VALUES (?, ?)", (day, now)).lastrowid
+
+    def on_day_changed(self, day, records, revision):
+        """
+        Keep the in-process indexes up to date after a committed write
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record, the current state of the day - empty if the day is deleted
+        :param revision: revision of the change
+        :return: None
+        """
+        with self.lock:
+            self.update_memory_indexes(day, records)
+            self.written = max(self.written, revision)
+            if revision == self.revision + 1:
+                # nobody else wrote in between, this worker is up to date
+                self.revision = revision
+
+    def find_day(self, day, connection: sqlite3.Connection = None):
+        """
+        Find the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param connection: connection in a transaction or None for the connection of the thread
+        :return: day document with records or None if not found
+        """
+        connection = connection if connection is not None else self.connection()
+        row = connection.execute("SELECT records FROM days WHERE day = ?", (day,)).fetchone()
+        return {"_id": day, "records": json.loads(row[0])} if row is not None else None
+
+    def set_key(self, key_type, key):
+        """
+        Save the API key, used to copy the key from mongo
+
+        :param key_type: user of the key, `AUTH_USER` for the key of the API
+        :param key: the signed key
+        :return: None
+        """
+        self.ensure_connected()
+        with self.transaction() as connection:
+            connection.execute("INSERT INTO keys (type, key) VALUES (?, ?) "
+                               "ON CONFLICT (type) DO UPDATE SET key = excluded.key", (key_type, key))
+
+    def get_key(self):
+        """
+        GET the API key
+
+        :return: API key as string or None if the key is not saved
+        """
+        self.ensure_connected()
+        row = self.connection().execute("SELECT key FROM keys WHERE type = ?", (config("AUTH_USER"),)).fetchone()
+        if row is not None and CryptoHelper.verify_token(row[0], SECRET):
+            # if token is verified return token
+            return row[0]
+        return None
+
+    def claim_idempotent(self, key, fingerprint):
+        """
+        Claim the idempotency key before the write is made, so a retry running at the same time does not write again
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :return: None if the key is claimed for this write, else dict with fingerprint of the request, status and
+                 body of the response of the key, status None while the write of the key is running
+        """
+        self.ensure_connected()
+        now = time.time()
+        with self.transaction() as connection:
+            # status 0 is the claim of a running write, taken over once it is older than `IDEMPOTENCY_PENDING`
+            connection.execute("DELETE FROM idempotency WHERE at < ? OR (status = 0 AND at < ?)",
+                               (now - idempotency_ttl, now - idempotency_pending))
+            claimed = connection.execute("INSERT OR IGNORE INTO idempotency (key, fingerprint, status, body, at) "
+                                         "VALUES (?, ?, 0, 'null', ?)", (key, fingerprint, now)).rowcount
+            if claimed:
+                return None
+            row = connection.execute("SELECT fingerprint, status, body FROM idempotency WHERE key = ?",
+                                     (key,)).fetchone()
+        return self.idempotent_row(row)
+
+    def release_idempotent(self, key):
+        """
+        Drop the claim of the key when its write failed, so the retry writes again
+
+        :param key: the idempotency key of the client
+        :return: None
+        """
+        self.ensure_connected()
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM idempotency WHERE key = ? AND status = 0", (key,))
+
+    def save_idempotent(self, key, fingerprint, status, body):
+        """
+        Save the response of the write made with the idempotency key, the first response of the key is kept
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :param status: status code of the response
+        :param body: body of the response
+        :return: None
+        """
+        self.ensure_connected()
+        now = time.time()
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM idempotency WHERE at < ?", (now - idempotency_ttl,))
+            saved = connection.execute("UPDATE idempotency SET fingerprint = ?, status = ?, body = ?, at = ? "
+                                       "WHERE key = ? AND status = 0",
+                                       (fingerprint, status, json.dumps(body), now, key)).rowcount
+            if not saved:
+                connection.execute("INSERT OR IGNORE INTO idempotency (key, fingerprint, status, body, at) "
+                                   "VALUES (?, ?, ?, ?, ?)", (key, fingerprint, status, json.dumps(body), now))
+
+    @staticmethod
+    def idempotent_row(row):
+        """
+        :param row: fingerprint, status and body of the idempotency table or None
+        :return: dict with fingerprint, status and body, status None while the write is running, or None
+        """
+        if row is None:
+            return None
+        return {"fingerprint": row[0], "status": row[1] or None, "body": json.loads(row[2])}
+
+    def day_ids(self) -> list:
+        """
+        Get all stored days
+
+        :return: list of days in format of `dd/mm/yyyy` or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        return [day for day, in self.connection().execute("SELECT day FROM days")]
+
+    def get_all_records(self):
+        """
+        GET all records
+
+        :return: records or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        return [{"_id": day, "records": json.loads(records)}
+                for day, records in self.connection().execute("SELECT day, records FROM days ORDER BY rowid")]
+
+    def get_record_for_day(self, day):
+        """
+        GET record of the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: record the day
+        """
+        self.ensure_connected()
+        return self.find_day(day) if self.isConnected else None
+
+    def get_records_for_days(self, days):
+        """
+        GET records of the days in a single query
+
+        :param days: list of days in format of `dd/mm/yyyy`
+        :return: dict of day to array of record or None if the day is not found, None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        days = list(days)
+        found = dict(self.connection().execute(
+            f"SELECT day, records FROM days WHERE day IN ({', '.join('?' * len(days))})", days))
+        return {day: json.loads(found[day]) if day in found else None for day in days}
+
+    def get_most_recent_record(self, day):
+        """
+        GET the latest record
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: record the day - the latest
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        row = self.connection().execute("SELECT json_extract(records, '$[#-1]') FROM days WHERE day = ?",
+                                        (day,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def get_recent_tasks(self, limit, cursor=None):
+        """
+        GET the most recent tasks across all days, paginated by cursor
+
+        :param limit: maximum number of tasks in the page
+        :param cursor: cursor of the last task of the previous page or None for the first page
+        :return: dict with tasks and cursor of the next page, dict with message failed or None if the database is not
+        connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+
+        select = "SELECT id, day, at, record FROM tasks"
+        order = "ORDER BY at DESC, id DESC LIMIT ?"
+        if cursor is None:
+            rows = self.connection().execute(f"{select} {order}", (limit + 1,)).fetchall()
+        else:
+            values = CursorHelper.decode(cursor)
+            try:
+                at, last = str(values[0]), int(values[1])
+            except (TypeError, ValueError, IndexError):
+                return http_res.FAILED_CURSOR
+            # keyset pagination on the index, everything strictly after the last task
+            rows = self.connection().execute(f"{select} WHERE (at, id) < (?, ?) {order}",
+                                             (at, last, limit + 1)).fetchall()
+
+        # fetch one more to know if there is a next page
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last_id, _, last_at, _ = page[-1]
+            next_cursor = CursorHelper.encode(last_at, last_id)
+
+        data = [http_res.set_object(day=day, record=json.loads(record)) for _, day, _, record in page]
+        return http_res.set_object(data=data, next=next_cursor)
+
+    def create_record_for_day(self, day, records):
+        """
+        POST create record for the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record
+        :return: dict of success if success, dict with message failed or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        try:
+            with self.transaction() as connection:
+                if self.find_day(day, connection):
+                    logging.error("Record already exists - creation aborted")
+                    return http_res.FAILED_CREATE_UPDATE
+                revision = self.save_day(connection, day, records)
+        except sqlite3.OperationalError:
+            # locked by another worker past the busy timeout or not readable, answered as unavailable
+            raise
+        except sqlite3.Error as e:
+            logging.error(e)
+            return http_res.FAILED_CREATE_UPDATE
+        self.on_day_changed(day, records, revision)
+        return http_res.SUCCESS_CREATE_UPDATE
+
+    def update_record_for_day(self, day, records):
+        """
+        PUT update the record of day
+
+        :param day: day in format of `dd/mm/yyy`
+        :param records: array of record
+        :return: dict of success if success, dict with message failed or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        try:
+            with self.transaction() as connection:
+                if self.find_day(day, connection) is None:
+                    logging.error("Record not found - update cancelled")
+                    return http_res.FAILED_CREATE_UPDATE
+                revision = self.save_day(connection, day, records)
+        except sqlite3.OperationalError:
+            # locked by another worker past the busy timeout or not readable, answered as unavailable
+            raise
+        except sqlite3.Error as e:
+            logging.error(e)
+            return http_res.FAILED_CREATE_UPDATE
+        self.on_day_changed(day, records, revision)
+        return http_res.SUCCESS_CREATE_UPDATE
+
+    def delete_record_for_day(self, day):
+        """
+        DELETE the record of day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: dict of success if success, dict with message failed or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        try:
+            with self.transaction() as connection:
+                if self.find_day(day, connection) is None:
+                    logging.error("Record not found - delete cancelled")
+                    return http_res.FAILED_DELETED_DAY
+                revision = self.save_day(connection, day, None)
+        except sqlite3.OperationalError:
+            # locked by another worker past the busy timeout or not readable, answered as unavailable
+            raise
+        except sqlite3.Error as e:
+            logging.error(e)
+            return http_res.FAILED_DELETED_DAY
+        self.on_day_changed(day, [], revision)
+        return http_res.SUCCESS_DELETED_DAY
+
+    def delete_task(self, day, task):
+        """
+        DELETE the task of record
+
+        :param task: the task you want to delete
+        :param day: day in format of `dd/mm/yyyy`
+        :return: dict of success if success, dict with message failed or None if the database is not connected
+        """
+        self.ensure_connected()
+        if not self.isConnected:
+            return None
+        try:
+            with self.transaction() as connection:
+                existing = self.find_day(day, connection)
+                if existing is None:
+                    logging.error("Record not found - delete cancelled")
+                    return http_res.FAILED_DELETED_TASK
+                new_records = ListHelper.delete_element(existing["records"].copy(), task)
+                if new_records == existing["records"]:
+                    return http_res.FAILED_DELETED_TASK_NON
+                revision = self.save_day(connection, day, new_records)
+        except sqlite3.OperationalError:
+            # locked by another worker past the busy timeout or not readable, answered as unavailable
+            raise
+        except sqlite3.Error as e:
+            logging.error(e)
+            return http_res.FAILED_DELETED_TASK
+        self.on_day_changed(day, new_records, revision)
+        return http_res.SUCCESS_DELETED_TASK
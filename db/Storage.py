@@ -0,0 +1,412 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from decouple import config
+from helpers.crypt import CryptoHelper
+from interface.access_key import AccessKey
+from helpers.crypt import CLIENT_SECRET
+from helpers.date_helper import DateHelper, EPOCH
+from helpers.inverted_index import InvertedIndex
+from helpers.prefix_index import PrefixIndex
+from helpers.circuit_breaker import CircuitBreaker, CLOSED
+
+# import response
+import src.http_response as http_res
+
+# `mongo` for MongoDB Atlas or `sqlite` for the embedded database of single tenant deployments
+storage_backend = config("STORAGE_BACKEND", default="mongo")
+# seconds between the checks for writes of the other workers and how long the writes are kept for that check
+sync_interval = config("SYNC_INTERVAL", default=1.0, cast=float)
+changes_ttl = config("CHANGES_TTL", default=86400, cast=int)
+# record fields suggested while typing and the half life in days of their weight
+SUGGEST_FIELDS = ("task", "platform")
+suggest_half_life = config("SUGGEST_HALF_LIFE_DAYS", default=30.0, cast=float)
+# consecutive failed calls that open the breaker and seconds before an open breaker is probed
+breaker_threshold = config("BREAKER_THRESHOLD", default=5, cast=int)
+breaker_reset = config("BREAKER_RESET", default=10.0, cast=float)
+# seconds the responses of the writes with an idempotency key are kept for the retries
+idempotency_ttl = config("IDEMPOTENCY_TTL", default=86400, cast=int)
+# seconds a key is claimed for the write running with it, a retry after them writes again
+idempotency_pending = config("IDEMPOTENCY_PENDING", default=60, cast=int)
+# writes of the API and the methods applying them, all of them are idempotent
+WRITE_OPS = {
+    "create": "create_record_for_day",
+    "update": "update_record_for_day",
+    "delete_day": "delete_record_for_day",
+    "delete_task": "delete_task",
+}
+
+
+class StorageAPI(ABC):
+    """
+    Storage of the days of tasks used by the server, implemented by every backend
+    """
+    # based check on connection
+    isConnected = False
+    api_key = None
+    # journal of the writes while the backend is unavailable, only for the remote backends
+    journal = None
+    search_index = None
+    suggest_index = None
+    # day -> (field, value) uses of the day counted in the suggest index
+    suggest_days = {}
+    # last probe of the health of the backend, monotonic time and round trip of the ping
+    checked_at = None
+    latency_ms = None
+    # bumped on every change of the data seen by this worker, the responses are cached per generation
+    generation = 0
+    # when the changes of the other workers were checked
+    synced_at = 0.0
+    # highest revision of the changes written by this worker, sent to the clients with the responses of the writes
+    written = 0
+
+    def __init__(self):
+        # the calls run in the threadpool, the lock guards the connection and the in-process indexes
+        self.lock = threading.RLock()
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+
+    @abstractmethod
+    def ensure_connected(self):
+        """
+        Connect if this process is not connected yet, also in a forked worker of a process that was
+
+        :return: None
+        """
+
+    @abstractmethod
+    def ping(self) -> bool:
+        """
+        Probe the backend, reconnecting when the connection could not be made before
+
+        :return: True if the backend answers, False otherwise
+        """
+
+    @abstractmethod
+    def get_key(self):
+        """
+        GET the API key
+
+        :return: API key as string or None if keys is not connected
+        """
+
+    @abstractmethod
+    def day_ids(self) -> list:
+        """
+        Get all stored days
+
+        :return: list of days in format of `dd/mm/yyyy` or None if the storage cannot be found
+        """
+
+    def recent_days(self, count: int) -> list:
+        """
+        Get the most recent stored days, what the clients read first
+
+        :param count: number of days
+        :return: list of days in format of `dd/mm/yyyy`, the most recent first
+        """
+        days = self.day_ids() or []
+        return sorted(days, key=lambda day: DateHelper.parse_day(day) or EPOCH, reverse=True)[:count]
+
+    @abstractmethod
+    def get_all_records(self):
+        """
+        GET all records
+
+        :return: records or None if does not exits
+        """
+
+    @abstractmethod
+    def get_record_for_day(self, day):
+        """
+        GET record of the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: record the day
+        """
+
+    @abstractmethod
+    def get_records_for_days(self, days):
+        """
+        GET records of the days in a single query
+
+        :param days: list of days in format of `dd/mm/yyyy`
+        :return: dict of day to array of record or None if the day is not found, None if the storage cannot be found
+        """
+
+    @abstractmethod
+    def get_most_recent_record(self, day):
+        """
+        GET the latest record
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: record the day - the latest
+        """
+
+    @abstractmethod
+    def get_recent_tasks(self, limit, cursor=None):
+        """
+        GET the most recent tasks across all days, paginated by cursor
+
+        :param limit: maximum number of tasks in the page
+        :param cursor: cursor of the last task of the previous page or None for the first page
+        :return: dict with tasks and cursor of the next page, dict with message failed or None if the storage cannot
+        be found
+        """
+
+    @abstractmethod
+    def create_record_for_day(self, day, records):
+        """
+        POST create record for the day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record
+        :return: dict of success if success, dict with message failed or None if the storage cannot be found
+        """
+
+    @abstractmethod
+    def update_record_for_day(self, day, records):
+        """
+        PUT update the record of day
+
+        :param day: day in format of `dd/mm/yyy`
+        :param records: array of record
+        :return: dict of success if success, dict with message failed or None if the storage cannot be found
+        """
+
+    @abstractmethod
+    def delete_record_for_day(self, day):
+        """
+        DELETE the record of day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: dict of success if success, dict with message failed or None if the storage cannot be found
+        """
+
+    @abstractmethod
+    def delete_task(self, day, task):
+        """
+        DELETE the task of record
+
+        :param task: the task you want to delete
+        :param day: day in format of `dd/mm/yyyy`
+        :return: dict of success if success, dict with message failed or None if the storage cannot be found
+        """
+
+    @abstractmethod
+    def claim_idempotent(self, key, fingerprint):
+        """
+        Claim the idempotency key before the write is made, so a retry running at the same time does not write again
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :return: None if the key is claimed for this write, else dict with fingerprint of the request, status and
+                 body of the response of the key, status None while the write of the key is running
+        """
+
+    @abstractmethod
+    def release_idempotent(self, key):
+        """
+        Drop the claim of the key when its write failed, so the retry writes again
+
+        :param key: the idempotency key of the client
+        :return: None
+        """
+
+    @abstractmethod
+    def save_idempotent(self, key, fingerprint, status, body):
+        """
+        Save the response of the write made with the idempotency key, the first response of the key is kept
+
+        :param key: the idempotency key of the client
+        :param fingerprint: hash of the method, path and body of the request
+        :param status: status code of the response
+        :param body: body of the response
+        :return: None
+        """
+
+    def sync_changes(self, revision=0):
+        """
+        Apply the changes of the other workers to the in-process indexes, nothing when the backend has no workers
+
+        :param revision: revision a client has written up to, synced at once when this worker is behind it
+        :return: None
+        """
+        pass
+
+    def sync_due(self) -> bool:
+        """
+        Check if the changes of the other workers should be checked
+
+        :return: True if `SYNC_INTERVAL` passed since the last check
+        """
+        return time.monotonic() - self.synced_at >= sync_interval
+
+    def changed(self):
+        """
+        Count a change of the data, the cached responses of older generations are not served anymore
+
+        :return: None
+        """
+        self.generation += 1
+
+    def cacheable(self) -> bool:
+        """
+        Check if the responses can be cached, not while writes wait in the journal.
+
+        Called on the event loop, so the journal is not queried, its count is refreshed by the connect and the sync of
+        the changes in the threadpool
+
+        :return: True if the responses can be cached
+        """
+        return self.journal is None or not self.journal.waiting
+
+    def write(self, op, day, *args):
+        """
+        Apply the write
+
+        :param op: name of the write, key of WRITE_OPS
+        :param day: day in format of `dd/mm/yyyy`
+        :param args: arguments of the write after the day
+        :return: response of the write
+        """
+        return getattr(self, WRITE_OPS[op])(day, *args)
+
+    def replay_journal(self) -> int:
+        """
+        Apply the journaled writes in order, nothing when the backend has no journal
+
+        :return: number of writes applied
+        """
+        return 0
+
+    def get_connection(self):
+        """
+        GET the connection status of the storage
+
+        :return: True if the storage is connected, False otherwise
+        """
+        self.ensure_connected()
+        return self.isConnected and self.breaker.state == CLOSED
+
+    def get_cached_key(self):
+        """
+        GET the API key, fetched once per process
+
+        :return: API key as string or None if keys is not connected
+        """
+        self.ensure_connected()
+        if self.api_key is None:
+            self.api_key = self.get_key()
+        return self.api_key
+
+    def get_client_key(self, body: AccessKey):
+        client_token = body.access_token
+        if CryptoHelper.verify_token(client_token, CLIENT_SECRET):
+            # if it is verified get the key from the database
+            return self.get_key()
+
+    def reset_memory_indexes(self, search: bool):
+        """
+        Empty the in-process indexes before they are built
+
+        :param search: True to build the in-process search index as well
+        :return: None
+        """
+        self.search_index = InvertedIndex() if search else None
+        self.suggest_index = {field: PrefixIndex(suggest_half_life) for field in SUGGEST_FIELDS}
+        self.suggest_days = {}
+
+    def update_memory_indexes(self, day, records):
+        """
+        Replace the day in the in-process indexes
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record, the current state of the day - empty if the day is deleted
+        :return: None
+        """
+        self.changed()
+        if self.search_index is not None:
+            self.search_index.add_day(day, records)
+
+        if self.suggest_index is not None:
+            # remove the uses the day had before, the index may have seen a different state than the caller
+            for field, value in self.suggest_days.pop(day, []):
+                self.suggest_index[field].remove(value)
+            uses = []
+            for record in records:
+                used = DateHelper.task_datetime(day, record.get("start"))
+                for field, index in self.suggest_index.items():
+                    index.add(record.get(field), used)
+                    uses.append((field, record.get(field)))
+            if len(uses) > 0:
+                self.suggest_days[day] = uses
+
+    @staticmethod
+    def search_page(query, page, offset, limit, has_next, highlighter: InvertedIndex = None):
+        """
+        Response of the search with the highlights of the matched words
+
+        :param query: the search query
+        :param page: list of (score, day, record)
+        :param offset: number of tasks skipped
+        :param limit: maximum number of tasks in the page
+        :param has_next: True if there are more tasks after the page
+        :param highlighter: index highlighting its fields or None for the default fields
+        :return: dict with tasks and offset of the next page
+        """
+        terms = set(InvertedIndex.tokenize(query))
+        highlighter = highlighter if highlighter is not None else InvertedIndex()
+        data = [http_res.set_object(day=day, record=record, score=score,
+                                    highlights=highlighter.highlights(record, terms))
+                for score, day, record in page]
+        return http_res.set_object(data=data, next=offset + limit if has_next else None)
+
+    def search_tasks(self, query, offset, limit):
+        """
+        GET the tasks matching the query in the task name or notes, ranked by relevance
+
+        :param query: the search query
+        :param offset: number of tasks to skip
+        :param limit: maximum number of tasks in the page
+        :return: dict with tasks and offset of the next page or None if the index is not build
+        """
+        self.ensure_connected()
+        self.sync_changes()
+        if self.search_index is None:
+            return None
+        with self.lock:
+            page, total = self.search_index.search(query, offset, limit)
+        return StorageAPI.search_page(query, page, offset, limit, offset + limit < total, self.search_index)
+
+    def suggest(self, field, prefix, limit):
+        """
+        GET the suggestions of the field for the typed prefix
+
+        :param field: the record field, one of `SUGGEST_FIELDS`
+        :param prefix: the typed prefix
+        :param limit: maximum number of suggestions
+        :return: list of suggestions, dict with message failed or None if the index is not build
+        """
+        self.ensure_connected()
+        self.sync_changes()
+        if self.suggest_index is None:
+            return None
+        elif field not in self.suggest_index:
+            return http_res.FAILED_SUGGEST_FIELD
+        else:
+            with self.lock:
+                return self.suggest_index[field].suggest(prefix, limit)
+
+    def health(self) -> dict:
+        """
+        Health of the storage as seen by the last calls and probes, without a round trip
+
+        :return: dict with connected, state of the breaker, seconds since the last probe and its round trip
+        """
+        age = round(time.monotonic() - self.checked_at, 3) if self.checked_at is not None else None
+        return {
+            "connected": self.isConnected and self.breaker.state == CLOSED,
+            "breaker": self.breaker.state,
+            "checked": age,
+            "latency_ms": self.latency_ms,
+        }
@@ -0,0 +1,26 @@
+import os
+# gunicorn reads every name of this module as setting, `config` is one of them so decouple is not imported by name
+import decouple
+
+
+def available_cpus() -> int:
+    """
+    Number of CPUs this process may run on, which is the limit of the container rather than of the host
+
+    :return: number of CPUs
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f":{decouple.config('PORT', default=8000)}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = decouple.config("WEB_CONCURRENCY", default=available_cpus(), cast=int)
+
+# the app is imported once before the fork, MongoAPI connects lazily in every worker so no client crosses the fork
+preload_app = decouple.config("PRELOAD_APP", default=True, cast=bool)
+
+# 0 keeps the previous behaviour of no worker timeout
+timeout = decouple.config("WORKER_TIMEOUT", default=0, cast=int)
@@ -0,0 +1,91 @@
+import asyncio
+import contextvars
+import functools
+from collections import deque
+
+
+class Overloaded(Exception):
+    """
+    The call is not admitted, the wait queue is full or the deadline passed while waiting
+    """
+
+
+class Limiter(object):
+    """
+    Concurrency limit with a bounded wait queue in front of blocking calls, which run in the threadpool
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.running = 0
+        self.waiters = deque()
+
+    async def run(self, function, *args, timeout=None):
+        """
+        Run the blocking function in the threadpool once a slot is free
+
+        :param function: the blocking function
+        :param args: arguments of the function
+        :param timeout: seconds to wait for a slot or None to wait as long as it takes
+        :return: result of the function
+        """
+        await self.acquire(timeout)
+        try:
+            # the context of the request goes along to the thread, as with run_in_threadpool
+            context = contextvars.copy_context()
+            future = asyncio.get_running_loop().run_in_executor(None, functools.partial(context.run, function, *args))
+        except BaseException:
+            self.release()
+            raise
+        # a cancelled request stops waiting while the thread still runs, its slot is free once the thread is done
+        future.add_done_callback(lambda _: self.release())
+        return await asyncio.shield(future)
+
+    async def acquire(self, timeout=None):
+        """
+        Take a slot, waiting in the queue when all slots are taken
+
+        :param timeout: seconds to wait for a slot or None to wait as long as it takes
+        :return: None
+        """
+        if self.running < self.concurrency and len(self.waiters) == 0:
+            self.running += 1
+            return
+        if len(self.waiters) >= self.queue_size:
+            raise Overloaded()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            # the slot is handed over by release, it is counted as running already
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            raise Overloaded()
+        except asyncio.CancelledError:
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                # cancelled right after the slot was handed over, pass it on
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Free the slot, handing it over to the first waiter
+
+        :return: None
+        """
+        self.running -= 1
+        while len(self.waiters) > 0:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.running += 1
+                return
+
+    def _discard(self, waiter):
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
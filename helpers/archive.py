@@ -0,0 +1,80 @@
+import gzip
+import json
+from collections import OrderedDict
+from helpers.date_helper import DateHelper
+
+# format of the month of the archived days, the `_id` of the archived month
+MONTH_FORMAT = "%Y-%m"
+
+
+class MonthArchive(object):
+    """
+    Days of a month packed to a single compressed blob, the records are kept in API form
+    """
+
+    @staticmethod
+    def month_of(day: str):
+        """
+        :param day: day in format of `dd/mm/yyyy`
+        :return: month in format of `yyyy-mm` or None if the day cannot be parsed
+        """
+        midnight = DateHelper.parse_day(day)
+        return midnight.strftime(MONTH_FORMAT) if midnight is not None else None
+
+    @staticmethod
+    def pack(days: dict) -> bytes:
+        """
+        :param days: dict of day to array of record
+        :return: gzip compressed JSON of the days
+        """
+        return gzip.compress(json.dumps(days, separators=(",", ":")).encode(), compresslevel=9)
+
+    @staticmethod
+    def unpack(blob: bytes) -> dict:
+        """
+        :param blob: blob made by pack
+        :return: dict of day to array of record
+        """
+        return json.loads(gzip.decompress(blob))
+
+
+class ArchiveCache(object):
+    """
+    LRU cache of the unpacked months, an entry is valid for the version of the month it was unpacked from
+    """
+
+    def __init__(self, max_months: int):
+        self.max_months = max_months
+        self.months = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, month: str, version):
+        """
+        :param month: month in format of `yyyy-mm`
+        :param version: current version of the archived month
+        :return: dict of day to array of record or None if not cached or unpacked from an older version
+        """
+        entry = self.months.get(month)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self.months.move_to_end(month)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, month: str, version, days: dict):
+        """
+        Cache the unpacked month, evicting the least recently used ones over the limit
+
+        :param month: month in format of `yyyy-mm`
+        :param version: version of the archived month
+        :param days: dict of day to array of record
+        :return: None
+        """
+        if self.max_months <= 0:
+            return
+        self.months[month] = (version, days)
+        self.months.move_to_end(month)
+        while len(self.months) > self.max_months:
+            self.months.popitem(last=False)
@@ -0,0 +1,80 @@
+import threading
+import time
+
+# states of the breaker
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """
+    The call is not made, the backend is failing
+    """
+
+
+class CircuitBreaker(object):
+    """
+    Circuit breaker of a backend, opened by consecutive failures and closed again by a successful probe
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def check(self):
+        """
+        Fail fast when the breaker is not closed
+
+        :return: None, raise CircuitOpen when the call is not allowed
+        """
+        if self.state != CLOSED:
+            raise CircuitOpen()
+
+    def success(self):
+        """
+        Count a successful call, closing the breaker
+
+        :return: None
+        """
+        with self.lock:
+            self.failures = 0
+            self.state = CLOSED
+
+    def failure(self):
+        """
+        Count a failed call, opening the breaker at the threshold or when the probe fails
+
+        :return: None
+        """
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def trip(self):
+        """
+        Open the breaker at once, e.g. when the connection cannot be made at all
+
+        :return: None
+        """
+        with self.lock:
+            self.failures = max(self.failures, self.threshold)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def probe_due(self) -> bool:
+        """
+        Check if the backend should be probed, moving an open breaker to half open after the reset timeout
+
+        :return: True if the breaker is closed or ready to be probed
+        """
+        with self.lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            return self.state != OPEN
@@ -2,6 +2,7 @@ import jwt
 from jwt import InvalidSignatureError
 from decouple import config
 import logging
+from helpers.tracing import traced
 
 SECRET = config("SECRET")
 CLIENT_SECRET = config("CLIENT_SECRET")
@@ -13,6 +14,7 @@ class CryptoHelper(object):
     """
 
     @staticmethod
+    @traced("auth.verify_token")
     def verify_token(token: str, secret: str) -> bool:
         """
         verify JWT
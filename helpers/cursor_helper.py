@@ -0,0 +1,34 @@
+import base64
+import json
+
+
+class CursorHelper(object):
+    """
+    Helper to encode or decode the opaque pagination cursor
+    """
+
+    @staticmethod
+    def encode(*values) -> str:
+        """
+        Encode values of the last item of the page to a cursor
+
+        :param values: JSON serializable values
+        :return: url safe cursor string
+        """
+        raw = json.dumps(list(values), separators=(",", ":")).encode("UTF-8")
+        return base64.urlsafe_b64encode(raw).decode("UTF-8")
+
+    @staticmethod
+    def decode(cursor: str):
+        """
+        Decode the cursor back to values
+
+        :param cursor: url safe cursor string
+        :return: list of values or None if the cursor is invalid
+        """
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("UTF-8"))
+            values = json.loads(raw)
+        except (ValueError, TypeError):
+            return None
+        return values if isinstance(values, list) else None
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+# day id format used as `_id` of the day documents
+DAY_FORMAT = "%d/%m/%Y"
+
+# accepted time of day formats for the start and end of a task
+TIME_FORMATS = ("%H:%M:%S", "%H:%M", "%H:%M:%S.%f")
+
+# fallback for the days or tasks that cannot be parsed, sorted as the oldest
+EPOCH = datetime(1970, 1, 1)
+
+
+class DateHelper(object):
+    """
+    Helper to parse the day id and the task times to datetime
+    """
+
+    @staticmethod
+    def parse_day(day: str):
+        """
+        Parse day id to datetime
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: datetime of midnight of the day or None if it cannot be parsed
+        """
+        try:
+            return datetime.strptime(day, DAY_FORMAT)
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def parse_seconds(value: str):
+        """
+        Parse time of day to seconds since midnight
+
+        :param value: time in format of `hh:mm:ss` or `hh:mm`
+        :return: seconds since midnight or None if it cannot be parsed
+        """
+        # `hh:mm:ss` is what the clients send, parse it without strptime
+        if isinstance(value, str) and len(value) == 8 and value[2] == ":" and value[5] == ":":
+            hours, minutes, seconds = value[0:2], value[3:5], value[6:8]
+            if hours.isdigit() and minutes.isdigit() and seconds.isdigit():
+                hours, minutes, seconds = int(hours), int(minutes), int(seconds)
+                if hours < 24 and minutes < 60 and seconds < 62:
+                    return hours * 3600 + minutes * 60 + seconds
+
+        for time_format in TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(value, time_format)
+                return parsed.hour * 3600 + parsed.minute * 60 + parsed.second + parsed.microsecond / 1e6
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    @staticmethod
+    def parse_time(value: str):
+        """
+        Parse time of day to timedelta since midnight
+
+        :param value: time in format of `hh:mm:ss` or `hh:mm`
+        :return: timedelta since midnight or None if it cannot be parsed
+        """
+        seconds = DateHelper.parse_seconds(value)
+        return timedelta(seconds=seconds) if seconds is not None else None
+
+    @staticmethod
+    def duration_hours(start: str, end: str):
+        """
+        Duration of the task in hours, an end before the start is on the next day
+
+        :param start: time of day or full ISO datetime string
+        :param end: time of day or full ISO datetime string
+        :return: duration in hours or None if the times cannot be parsed
+        """
+        start_seconds = DateHelper.parse_seconds(start)
+        end_seconds = DateHelper.parse_seconds(end)
+        if start_seconds is not None and end_seconds is not None:
+            duration = end_seconds - start_seconds
+            if duration < 0:
+                duration += 86400
+            return duration / 3600
+
+        try:
+            return (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds() / 3600
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def task_datetime(day: str, value: str) -> datetime:
+        """
+        Combine the day and time of the task to a datetime
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param value: time of day or full ISO datetime string
+        :return: datetime of the task, midnight of the day or epoch if nothing can be parsed
+        """
+        midnight = DateHelper.parse_day(day)
+        offset = DateHelper.parse_time(value)
+        if midnight is not None and offset is not None:
+            return midnight + offset
+
+        try:
+            # the client may send a full datetime instead of time of day
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return midnight if midnight is not None else EPOCH
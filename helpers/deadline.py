@@ -0,0 +1,42 @@
+import contextvars
+import time
+
+# monotonic time the current request has to be answered by, copied to the threads running its mongo calls
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class Deadline(object):
+    """
+    Deadline of the current request
+    """
+
+    @staticmethod
+    def start(seconds: float):
+        """
+        Set the deadline of the current request if it is not set yet
+
+        :param seconds: seconds from now
+        :return: None
+        """
+        if _deadline.get() is None:
+            _deadline.set(time.monotonic() + seconds)
+
+    @staticmethod
+    def remaining():
+        """
+        Time left of the current request
+
+        :return: seconds left, never below 0, or None if there is no deadline
+        """
+        deadline = _deadline.get()
+        return max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+
+    @staticmethod
+    def remaining_ms():
+        """
+        Time left of the current request for the `maxTimeMS` of mongo
+
+        :return: milliseconds left, at least 1 as 0 means no limit for mongo, or None if there is no deadline
+        """
+        remaining = Deadline.remaining()
+        return max(int(remaining * 1000), 1) if remaining is not None else None
@@ -0,0 +1,155 @@
+import math
+import re
+from collections import defaultdict
+from helpers.date_helper import DateHelper
+
+# words of the text, the same as the default tokenization of mongo text index without stemming
+TOKEN = re.compile(r"\w+")
+
+# weight of the record fields in the score, the task name weighs more than the notes
+FIELD_WEIGHTS = {"task": 2.0, "notes": 1.0}
+
+# markers around the matched words in the highlights
+HIGHLIGHT_START = "<em>"
+HIGHLIGHT_END = "</em>"
+
+
+class InvertedIndex(object):
+    """
+    In-process inverted index of the tasks, ranked by tf-idf of the record fields
+    """
+
+    def __init__(self, fields: dict = None):
+        self.fields = fields if fields is not None else FIELD_WEIGHTS
+        # term -> {key: weighted term frequency}
+        self.postings = defaultdict(dict)
+        # key -> (day, record, datetime of the task)
+        self.documents = {}
+        # day -> keys of the tasks of the day
+        self.days = defaultdict(list)
+        self._next_key = 0
+
+    @staticmethod
+    def tokenize(text) -> list:
+        """
+        Split text to lower case words
+
+        :param text: text to be split, anything else than string has no words
+        :return: list of words
+        """
+        if not isinstance(text, str):
+            return []
+        return TOKEN.findall(text.lower())
+
+    @staticmethod
+    def highlight(text, terms: set):
+        """
+        Mark the words of the text that start with one of the terms
+
+        :param text: text of the record field
+        :param terms: set of lower case search terms
+        :return: text with marked words or None if nothing matches
+        """
+        if not isinstance(text, str):
+            return None
+        matched = False
+
+        def mark(match):
+            nonlocal matched
+            word = match.group(0)
+            if any(word.lower().startswith(term) for term in terms):
+                matched = True
+                return f"{HIGHLIGHT_START}{word}{HIGHLIGHT_END}"
+            return word
+
+        marked = TOKEN.sub(mark, text)
+        return marked if matched else None
+
+    def highlights(self, record: dict, terms: set) -> dict:
+        """
+        Highlights of all indexed fields of the record
+
+        :param record: the task record
+        :param terms: set of lower case search terms
+        :return: dict of field to marked text, only for the fields that match
+        """
+        found = {}
+        for field in self.fields:
+            marked = InvertedIndex.highlight(record.get(field), terms)
+            if marked is not None:
+                found[field] = marked
+        return found
+
+    def remove_day(self, day):
+        """
+        Remove all tasks of the day from the index
+
+        :param day: day in format of `dd/mm/yyyy`
+        :return: None
+        """
+        for key in self.days.pop(day, []):
+            _, record, _ = self.documents.pop(key)
+            for term in self._terms(record):
+                posting = self.postings[term]
+                posting.pop(key, None)
+                if len(posting) == 0:
+                    del self.postings[term]
+
+    def add_day(self, day, records: list):
+        """
+        Index the tasks of the day, replacing the tasks already indexed for that day
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record
+        :return: None
+        """
+        self.remove_day(day)
+        for record in records:
+            key = self._next_key
+            self._next_key += 1
+            self.documents[key] = (day, record, DateHelper.task_datetime(day, record.get("start")))
+            self.days[day].append(key)
+            for term, weight in self._terms(record).items():
+                self.postings[term][key] = weight
+
+    def search(self, query: str, offset: int, limit: int):
+        """
+        Search the tasks matching any of the words of the query
+
+        :param query: the search query
+        :param offset: number of results to skip
+        :param limit: maximum number of results
+        :return: tuple of list of (score, day, record) ordered by score then recency and the total number of results
+        """
+        terms = set(InvertedIndex.tokenize(query))
+        scores = defaultdict(float)
+        total_docs = max(len(self.documents), 1)
+        for term in terms:
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + total_docs / len(posting))
+            for key, weight in posting.items():
+                scores[key] += weight * idf
+
+        # most recent first among the equal scores, the sort is stable
+        ranked = sorted(scores.items(), key=lambda item: self.documents[item[0]][2], reverse=True)
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        page = []
+        for key, score in ranked[offset:offset + limit]:
+            day, record, _ = self.documents[key]
+            page.append((score, day, record))
+        return page, len(ranked)
+
+    def _terms(self, record: dict) -> dict:
+        """
+        Weighted term frequencies of the record
+
+        :param record: the task record
+        :return: dict of term to weighted frequency
+        """
+        terms = defaultdict(float)
+        for field, weight in self.fields.items():
+            for term in InvertedIndex.tokenize(record.get(field)):
+                terms[term] += weight
+        return terms
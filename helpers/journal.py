@@ -0,0 +1,125 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    day TEXT NOT NULL,
+    args TEXT NOT NULL,
+    at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_day ON journal (day, seq);
+"""
+
+
+class WriteJournal(object):
+    """
+    Durable append-only journal of writes in SQLite, the writes are on disk once they are appended and are
+    replayed in the order of appending.
+
+    The file can be shared by the workers, SQLite locks it across the processes
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.lock = threading.Lock()
+        self.connection = None
+        # process the connection belongs to, the connection is not fork safe
+        self.pid = None
+        # writes wait in the journal as last seen by this process, read without the lock or a query
+        self.waiting = False
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Open the journal in this process, created when it does not exist
+
+        :return: the connection
+        """
+        if self.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                         check_same_thread=False)
+            # the write ahead log keeps the readers off the writers, `FULL` syncs it on every commit
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+            self.pid = os.getpid()
+        return self.connection
+
+    def append(self, op: str, day: str, args: list) -> int:
+        """
+        Append the write, durable when it returns
+
+        :param op: name of the write
+        :param day: day in format of `dd/mm/yyyy`
+        :param args: JSON serializable arguments of the write after the day
+        :return: sequence number of the write
+        """
+        with self.lock:
+            cursor = self.connect().execute(
+                "INSERT INTO journal (op, day, args, at) VALUES (?, ?, ?, ?)",
+                (op, day, json.dumps(args, separators=(",", ":")), time.time())
+            )
+            self.waiting = True
+            return cursor.lastrowid
+
+    def count(self) -> int:
+        """
+        Number of writes not replayed yet, also by the other processes
+
+        :return: number of writes
+        """
+        with self.lock:
+            count = self.connect().execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+            self.waiting = count > 0
+            return count
+
+    def pending(self, day: str = None) -> list:
+        """
+        Writes not replayed yet in the order of appending
+
+        :param day: only the writes of the day or None for all
+        :return: list of (seq, op, day, args)
+        """
+        with self.lock:
+            if day is None:
+                rows = self.connect().execute("SELECT seq, op, day, args FROM journal ORDER BY seq")
+            else:
+                rows = self.connect().execute("SELECT seq, op, day, args FROM journal WHERE day = ? ORDER BY seq",
+                                              (day,))
+            return [(seq, op, day, json.loads(args)) for seq, op, day, args in rows.fetchall()]
+
+    def replay(self, apply) -> int:
+        """
+        Apply the writes one by one in order, every write is removed in the transaction that applied it.
+
+        The transaction holds the write lock of the file, so a write is applied by a single worker, but a crash
+        after the apply and before the commit applies it again: the writes have to be idempotent
+
+        :param apply: function of (op, day, args) applying the write, the replay stops at the first exception
+        :return: number of writes applied
+        """
+        applied = 0
+        with self.lock:
+            connection = self.connect()
+            while True:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute("SELECT seq, op, day, args FROM journal ORDER BY seq LIMIT 1").fetchone()
+                    if row is None:
+                        connection.execute("COMMIT")
+                        self.waiting = False
+                        return applied
+                    seq, op, day, args = row
+                    apply(op, day, json.loads(args))
+                    connection.execute("DELETE FROM journal WHERE seq = ?", (seq,))
+                    connection.execute("COMMIT")
+                    applied += 1
+                except BaseException:
+                    connection.execute("ROLLBACK")
+                    raise
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+
+
+class LoopMonitor:
+    """
+    Lag of the event loop, measured by how late a sleep of the interval wakes up.
+
+    In debug mode a watchdog thread also catches the loop while it is blocked longer than the threshold and logs the
+    stack of the blocking call with the route of the request running it
+    """
+
+    def __init__(self, interval: float, threshold: float, debug: bool, window: int = 120):
+        """
+        :param interval: seconds between the measures
+        :param threshold: seconds of lag counted as stall, and reported with the stack in debug mode
+        :param debug: True to run the watchdog thread
+        :param window: number of the last measures the percentile is taken from
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.lags = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.blocked = 0
+        # task -> route of the request it runs, filled by the middleware in debug mode
+        self.routes = weakref.WeakKeyDictionary()
+        self.loop = None
+        self.loop_thread = None
+        self.beat = None
+        self.stopped = threading.Event()
+
+    async def run(self):
+        """
+        Measure the lag until the task is cancelled
+
+        :return: None
+        """
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.beat = time.monotonic()
+        self.stopped = threading.Event()
+        if self.debug:
+            threading.Thread(target=self.watch, name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                start = time.monotonic()
+                await asyncio.sleep(self.interval)
+                self.beat = time.monotonic()
+                self.measured(self.beat - start - self.interval)
+        finally:
+            self.stopped.set()
+
+    def measured(self, lag: float):
+        """
+        Count the measured lag
+
+        :param lag: seconds the sleep woke up late
+        :return: None
+        """
+        lag = max(lag, 0.0)
+        self.lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag >= self.threshold:
+            self.stalls += 1
+
+    def watch(self):
+        """
+        Watchdog thread of the debug mode, reporting every blocking call once
+
+        :return: None
+        """
+        reported = None
+        while not self.stopped.wait(self.threshold / 2):
+            beat = self.beat
+            if time.monotonic() - beat >= self.threshold + self.interval and reported != beat:
+                reported = beat
+                self.blocked += 1
+                self.report(time.monotonic() - beat - self.interval)
+
+    def report(self, blocked: float):
+        """
+        Log the stack of the event loop thread and the route of the task running on it
+
+        :param blocked: seconds the loop is blocked so far
+        :return: None
+        """
+        frame = sys._current_frames().get(self.loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        # read from the watchdog thread, the task running on the loop is the one blocking it
+        task = asyncio.current_task(self.loop)
+        route = self.routes.get(task) if task is not None else None
+        logging.warning(f"event loop blocked for {blocked * 1000:.0f} ms by {route or 'no request'}\n{stack}")
+
+    def stats(self) -> dict:
+        """
+        Lag of the event loop
+
+        :return: dict with the last lag, its 99th percentile over the window and maximum in milliseconds, the number
+        of stalls over the threshold and of blocking calls reported
+        """
+        lags = sorted(self.lags)
+        return {
+            "lag_ms": round(self.lags[-1] * 1000, 3) if self.lags else None,
+            "p99_ms": round(lags[min(int(len(lags) * 0.99), len(lags) - 1)] * 1000, 3) if lags else None,
+            "max_ms": round(self.max_lag * 1000, 3),
+            "stalls": self.stalls,
+            "blocked": self.blocked,
+        }
+
+
+class LoopRouteMiddleware:
+    """
+    ASGI middleware recording the route of the task of every request, for the reports of the watchdog
+    """
+
+    def __init__(self, app, monitor: LoopMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            task = asyncio.current_task()
+            if task is not None:
+                self.monitor.routes[task] = f"{scope['method']} {scope['path']}"
+        await self.app(scope, receive, send)
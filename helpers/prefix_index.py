@@ -0,0 +1,108 @@
+import heapq
+import math
+import sys
+from bisect import bisect_left, insort
+from datetime import datetime
+
+# reference of the recency, any fixed datetime gives the same order
+EPOCH = datetime(1970, 1, 1)
+
+# the last unicode code point, upper bound of the keys with a prefix
+LAST_CHAR = "\U0010ffff"
+
+
+class PrefixIndex(object):
+    """
+    In-memory prefix index of distinct strings, a sorted array searched with bisect.
+
+    Suggestions are ranked by frequency decayed by the time since the string was last used
+    """
+
+    def __init__(self, half_life_days: float = 30.0):
+        self.half_life_days = half_life_days
+        # sorted array of (lower case string, string)
+        self.keys = []
+        # string -> [frequency, datetime of last use]
+        self.entries = {}
+        # string -> log of the weight relative to epoch, the decay is the same for all strings at any time
+        # so the order does not depend on the current datetime
+        self.ranks = {}
+
+    def add(self, value, used: datetime):
+        """
+        Count one use of the string
+
+        :param value: the string, anything else than non empty string is ignored
+        :param used: datetime of the use
+        :return: None
+        """
+        if not isinstance(value, str) or value == "":
+            return
+        entry = self.entries.get(value)
+        if entry is None:
+            entry = self.entries[value] = [1, used]
+            insort(self.keys, (value.lower(), value))
+        else:
+            entry[0] += 1
+            entry[1] = max(entry[1], used)
+        self._rank(value, entry)
+
+    def remove(self, value):
+        """
+        Remove one use of the string, the string is dropped when it is not used anymore
+
+        :param value: the string
+        :return: None
+        """
+        entry = self.entries.get(value)
+        if entry is None:
+            return
+        entry[0] -= 1
+        if entry[0] <= 0:
+            del self.entries[value]
+            del self.ranks[value]
+            key = (value.lower(), value)
+            index = bisect_left(self.keys, key)
+            if index < len(self.keys) and self.keys[index] == key:
+                del self.keys[index]
+        else:
+            self._rank(value, entry)
+
+    def suggest(self, prefix: str, limit: int) -> list:
+        """
+        Find the strings starting with the prefix, case insensitive
+
+        :param prefix: the typed prefix
+        :param limit: maximum number of suggestions
+        :return: list of strings ordered by weight
+        """
+        lower = prefix.lower()
+        # all keys starting with the prefix sort between the prefix and the prefix followed by the last code point
+        start = bisect_left(self.keys, (lower, ""))
+        end = bisect_left(self.keys, (lower + LAST_CHAR, ""), start)
+        ranks = self.ranks
+        top = heapq.nlargest(limit, self.keys[start:end], key=lambda key: ranks[key[1]])
+        return [value for _, value in top]
+
+    def memory_usage(self) -> int:
+        """
+        Approximate memory used by the index
+
+        :return: size in bytes
+        """
+        size = sys.getsizeof(self.keys) + sys.getsizeof(self.entries) + sys.getsizeof(self.ranks)
+        for key, value in self.keys:
+            size += sys.getsizeof((key, value)) + sys.getsizeof(key) + sys.getsizeof(value)
+            size += sys.getsizeof(self.entries[value]) + sys.getsizeof(self.ranks[value])
+        return size
+
+    def _rank(self, value, entry: list):
+        """
+        Set the log weight of the string relative to epoch, the frequency halved for every half life since last use
+
+        :param value: the string
+        :param entry: [frequency, datetime of last use] of the string
+        :return: None
+        """
+        count, used = entry
+        self.ranks[value] = math.log(count) + (used - EPOCH).total_seconds() / 86400 / self.half_life_days * math.log(2)
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from helpers.date_helper import DateHelper, TIME_FORMATS
+
+# record fields stored as datetime
+TIME_FIELDS = ("start", "end")
+
+# key of the formats of the fields that are not in the default format
+FORMAT_KEY = "fmt"
+DEFAULT_FORMAT = "%H:%M:%S"
+
+
+class RecordCodec(object):
+    """
+    Convert the record between the API form with time of day strings and the stored form.
+
+    In the typed form start and end are stored as datetime of the day, so they can be queried and aggregated by
+    mongo. Strings that cannot be converted back to exactly the same string are stored as they are
+    """
+
+    def __init__(self, typed: bool):
+        self.typed = typed
+
+    def encode(self, day, record: dict) -> dict:
+        """
+        Convert the record to the stored form
+
+        :param day: day in format of `dd/mm/yyyy`
+        :param record: the record in API form
+        :return: the record in stored form
+        """
+        midnight = DateHelper.parse_day(day)
+        if not self.typed or midnight is None:
+            return record
+
+        stored = dict(record)
+        formats = {}
+        start = None
+        for field in TIME_FIELDS:
+            found = RecordCodec.parse_exact(record.get(field))
+            if found is None:
+                continue
+            offset, time_format = found
+            at = midnight + offset
+            if field == "end" and start is not None and at < start:
+                # the task ends on the next day
+                at += timedelta(days=1)
+            if field == "start":
+                start = at
+            stored[field] = at
+            if time_format != DEFAULT_FORMAT:
+                formats[field] = time_format
+
+        if len(formats) > 0:
+            stored[FORMAT_KEY] = formats
+        return stored
+
+    @staticmethod
+    def decode(record: dict) -> dict:
+        """
+        Convert the record from either stored form to the API form
+
+        :param record: the record in stored form
+        :return: the record in API form
+        """
+        if not any(isinstance(record.get(field), datetime) for field in TIME_FIELDS):
+            return record
+
+        formats = record.get(FORMAT_KEY, {})
+        decoded = {key: value for key, value in record.items() if key != FORMAT_KEY}
+        for field in TIME_FIELDS:
+            value = decoded.get(field)
+            if isinstance(value, datetime):
+                decoded[field] = value.strftime(formats.get(field, DEFAULT_FORMAT))
+        return decoded
+
+    def encode_records(self, day, records: list) -> list:
+        """
+        :param day: day in format of `dd/mm/yyyy`
+        :param records: array of record in API form
+        :return: array of record in stored form
+        """
+        if not self.typed:
+            return records
+        return [self.encode(day, record) for record in records]
+
+    @staticmethod
+    def decode_records(records: list) -> list:
+        """
+        :param records: array of record in stored form
+        :return: array of record in API form
+        """
+        return [RecordCodec.decode(record) for record in records]
+
+    @staticmethod
+    def parse_exact(value):
+        """
+        Parse time of day that formats back to the same string
+
+        :param value: time of day string
+        :return: tuple of timedelta since midnight and the format or None if it cannot be parsed exactly
+        """
+        if not isinstance(value, str):
+            return None
+        for time_format in TIME_FORMATS:
+            try:
+                parsed = datetime.strptime(value, time_format)
+            except ValueError:
+                continue
+            if parsed.strftime(time_format) == value:
+                return timedelta(hours=parsed.hour, minutes=parsed.minute,
+                                 seconds=parsed.second, microseconds=parsed.microsecond), time_format
+        return None
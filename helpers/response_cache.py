@@ -0,0 +1,114 @@
+import gzip
+from collections import OrderedDict
+from starlette.responses import Response
+
+
+class CachedResponse(object):
+    """
+    Encoded body of a response and its gzip form if it is big enough to be compressed
+    """
+
+    def __init__(self, generation: int, body: bytes, compressed: bytes = None):
+        self.generation = generation
+        self.body = body
+        self.compressed = compressed
+        self.size = len(body) + (len(compressed) if compressed is not None else 0)
+
+
+class ResponseCache(object):
+    """
+    LRU cache of encoded JSON responses, an entry is valid for the generation of the data it was encoded from
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, gzip_min: int = 0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.gzip_min = gzip_min
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, generation: int):
+        """
+        Find the response of the key encoded from the current data
+
+        :param key: route and query of the request
+        :param generation: current generation of the data
+        :return: CachedResponse or None if not cached or encoded from older data
+        """
+        entry = self.entries.get(key)
+        if entry is None or entry.generation != generation:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, generation: int, body: bytes) -> CachedResponse:
+        """
+        Cache the encoded response, evicting the least recently used ones over the limits
+
+        :param key: route and query of the request
+        :param generation: generation of the data the body was encoded from
+        :param body: encoded JSON body
+        :return: CachedResponse, also when it is too big to be cached
+        """
+        return self.store(key, self.compress(generation, body))
+
+    def compress(self, generation: int, body: bytes) -> CachedResponse:
+        """
+        Entry of the encoded response with its gzip form if it is big enough, safe to make outside of the event loop
+
+        :param generation: generation of the data the body was encoded from
+        :param body: encoded JSON body
+        :return: CachedResponse
+        """
+        compressed = None
+        if 0 < self.gzip_min <= len(body):
+            compressed = gzip.compress(body, compresslevel=6)
+        return CachedResponse(generation, body, compressed)
+
+    def store(self, key, entry: CachedResponse) -> CachedResponse:
+        """
+        Cache the entry, evicting the least recently used ones over the limits
+
+        :param key: route and query of the request
+        :param entry: the entry made by compress
+        :return: CachedResponse, also when it is too big to be cached
+        """
+        if self.max_entries <= 0 or entry.size > self.max_bytes:
+            return entry
+        self.discard(key)
+        self.entries[key] = entry
+        self.size += entry.size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+        return entry
+
+    def discard(self, key):
+        """
+        Remove the response of the key
+
+        :param key: route and query of the request
+        :return: None
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    @staticmethod
+    def respond(entry: CachedResponse, accept_gzip: bool) -> Response:
+        """
+        Response with the encoded body as it is, compressed if the client accepts it
+
+        :param entry: the cached response
+        :param accept_gzip: True if the client accepts gzip
+        :return: Response without serialization
+        """
+        headers = {"Vary": "Accept-Encoding"}
+        if accept_gzip and entry.compressed is not None:
+            headers["Content-Encoding"] = "gzip"
+            return Response(entry.compressed, headers=headers, media_type="application/json")
+        return Response(entry.body, headers=headers, media_type="application/json")
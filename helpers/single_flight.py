@@ -0,0 +1,49 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Concurrent calls of the same key share one call in flight and its result or exception.
+
+    The call runs in its own task: a caller that is cancelled stops waiting, the call goes on for the other callers
+    """
+
+    def __init__(self):
+        # key -> task of the call in flight
+        self.flights = {}
+        # calls made and callers served by a call of another caller
+        self.calls = 0
+        self.shared = 0
+
+    async def run(self, key, function, *args):
+        """
+        Await the call in flight for the key or start it
+
+        :param key: hashable key, equal for the calls giving the same result
+        :param function: coroutine function of the call
+        :param args: arguments of the call
+        :return: result of the call, raise its exception
+        """
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(function(*args))
+            self.flights[key] = flight
+            self.calls += 1
+            flight.add_done_callback(lambda done: self.landed(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(flight)
+
+    def landed(self, key, flight):
+        """
+        Forget the finished call, the next caller of the key starts a new one
+
+        :param key: key of the call
+        :param flight: the finished task
+        :return: None
+        """
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.cancelled():
+            # retrieved, so an exception nobody waits for anymore is not reported as never retrieved
+            flight.exception()
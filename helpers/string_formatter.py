@@ -7,3 +7,7 @@ class StringFormatter(object):
     @staticmethod
     def convert_underscore_to_slash(string):
         return string.replace("_", "/")
+
+    @staticmethod
+    def convert_slash_to_underscore(string):
+        return string.replace("/", "_")
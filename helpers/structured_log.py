@@ -0,0 +1,223 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+# header of the request id, taken from the client or the load balancer when it is sent
+REQUEST_ID_HEADER = "x-request-id"
+
+# request being handled, copied into the threadpool calls with the rest of the context
+request_id = contextvars.ContextVar("request_id", default=None)
+route = contextvars.ContextVar("route", default=None)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request id and route, and the exception if any
+    """
+
+    def format(self, record) -> str:
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a share of the info and debug logs of the high volume routes, the warnings and errors are always kept.
+
+    Also stamps the record with the request id and route of the request being handled
+    """
+
+    def __init__(self, rates: dict):
+        """
+        :param rates: dict of route prefix -> share of the records kept, from 0 to 1
+        """
+        super().__init__()
+        # the longest prefix matching the route decides
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record) -> bool:
+        record.request_id = request_id.get()
+        record.route = route.get()
+        if record.levelno >= logging.WARNING or record.route is None:
+            return True
+        for prefix, rate in self.rates:
+            if record.route.startswith(prefix):
+                return random.random() < rate
+        return True
+
+
+class DrainingListener(QueueListener):
+    """
+    Background thread writing the queued records, stopping once the records queued before the stop are written
+    """
+
+    def enqueue_sentinel(self):
+        # waits for room in a full queue, the callers drop their records meanwhile
+        self.queue.put(self._sentinel)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hand the records to a bounded queue written by a background thread, the record is dropped when the queue is full
+    instead of blocking the caller.
+
+    The thread is started in every process on its first record, so a handler set up before the fork of the workers
+    writes in every worker. The threads logging at once in a new process wait until one of them started it
+    """
+
+    def __init__(self, size: int, target: logging.Handler):
+        """
+        :param size: maximum number of records waiting to be written
+        :param target: the handler writing the records
+        """
+        super().__init__(queue.Queue(size))
+        self.target = target
+        self.listener = None
+        self.pid = None
+        self.starting = threading.Lock()
+        self.dropped = 0
+        if hasattr(os, "register_at_fork"):
+            # a thread of the parent starting the listener at the fork leaves the lock held in the child
+            os.register_at_fork(after_in_child=self.reset_starting)
+
+    def prepare(self, record):
+        # the message and the exception are rendered by the caller, the arguments may change after the call,
+        # the JSON is formatted by the background thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            with self.starting:
+                # started by another thread while this one waited
+                if self.pid != os.getpid():
+                    self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        """
+        Start the background thread of this process
+
+        :return: None
+        """
+        # the queue of the parent may hold records the parent writes itself
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.listener = DrainingListener(self.queue, self.target)
+        self.listener.start()
+        # the other threads only skip the start once the queue of this process is in place
+        self.pid = os.getpid()
+
+    def reset_starting(self):
+        """
+        New lock of the start in the child process
+
+        :return: None
+        """
+        self.starting = threading.Lock()
+
+    def close(self):
+        """
+        Write the records still waiting and stop the background thread
+
+        :return: None
+        """
+        if self.listener is not None and self.pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+            self.pid = None
+        super().close()
+
+
+def setup_logging(level: str, queue_size: int, rates: dict, stream=None) -> DroppingQueueHandler:
+    """
+    Write every log of the process as JSON lines from a background thread
+
+    :param level: level of the root logger, e.g. `INFO`
+    :param queue_size: maximum number of records waiting to be written
+    :param rates: dict of route prefix -> share of the info logs kept
+    :param stream: stream written to, stderr by default
+    :return: the handler of the root logger
+    """
+    target = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    target.setFormatter(JsonFormatter())
+    handler = DroppingQueueHandler(queue_size, target)
+    handler.addFilter(SamplingFilter(rates))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, DroppingQueueHandler):
+            root.removeHandler(existing)
+            existing.close()
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def parse_rates(values) -> dict:
+    """
+    Parse the sampling rates of the routes
+
+    :param values: list of `prefix=rate`, e.g. `/api/v0.7/day=0.1`
+    :return: dict of route prefix -> rate
+    """
+    rates = {}
+    for value in values:
+        prefix, _, rate = value.rpartition("=")
+        rates[prefix] = float(rate)
+    return rates
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware setting the request id and route of every request for its logs, the request id is sent back in
+    the response header
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sent = dict(scope["headers"]).get(REQUEST_ID_HEADER.encode())
+        # only short ASCII ids of the client are kept, they end up in every log line of the request
+        current = sent.decode("latin-1") if sent and len(sent) <= 64 and sent.isascii() else uuid.uuid4().hex
+        id_token = request_id.set(current)
+        route_token = route.set(scope["path"])
+
+        async def send_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.encode(), current.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_id)
+        finally:
+            request_id.reset(id_token)
+            route.reset(route_token)
@@ -0,0 +1,242 @@
+import contextvars
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+# W3C trace context: version, trace id, parent span id and flags, only the sampled flag is used
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED = 0x01
+
+# span of the code being run, None when the request is not sampled, so the spans cost one lookup
+current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Timed stage of a sampled request, exported when it ends
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes", "error", "tracer")
+
+    def __init__(self, tracer, name: str, trace_id: str, parent_id=None, **attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.error = None
+        self.start = time.time()
+        self.end = None
+
+    def child(self, name: str, **attributes):
+        """
+        :param name: name of the span
+        :param attributes: attributes of the span
+        :return: new span of the same trace with this span as parent
+        """
+        return Span(self.tracer, name, self.trace_id, self.span_id, **attributes)
+
+    def finish(self, error=None):
+        """
+        End and export the span
+
+        :param error: exception that ended the span or None
+        :return: None
+        """
+        self.end = time.time()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.tracer.exporter.export(self)
+
+    def traceparent(self) -> str:
+        """
+        :return: W3C `traceparent` header continuing the trace from this span
+        """
+        return f"00-{self.trace_id}-{self.span_id}-{SAMPLED:02x}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": round(self.start, 6),
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class ConsoleExporter:
+    """
+    Write every span as JSON line to stderr, for local use
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stderr
+        self.lock = threading.Lock()
+
+    def export(self, span: Span):
+        """
+        :param span: the ended span
+        :return: None
+        """
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self.lock:
+            self.stream.write(line)
+
+
+class FileExporter(ConsoleExporter):
+    """
+    Append every span as JSON line to the file, opened in every process on its first span
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.pid = None
+
+    def export(self, span: Span):
+        if self.pid != os.getpid():
+            with self.lock:
+                self.pid = os.getpid()
+                self.stream = open(self.path, "a", buffering=1, encoding="utf-8")
+        super().export(span)
+
+
+class Tracer:
+    """
+    Start the spans of the sampled requests, nothing is recorded for the other requests
+    """
+
+    def __init__(self, sample: float, exporter):
+        """
+        :param sample: share of the requests traced, from 0 to 1. With 0 tracing is off, also for the requests of
+        a sampled parent, otherwise the sampled flag of the parent decides
+        :param exporter: object with `export(span)`
+        """
+        self.sample = sample
+        self.exporter = exporter
+
+    def start_request(self, name: str, traceparent=None, **attributes):
+        """
+        Start the root span of the request, continuing the trace of the caller
+
+        :param name: name of the span
+        :param traceparent: value of the `traceparent` header or None
+        :param attributes: attributes of the span
+        :return: Span or None if the request is not sampled
+        """
+        if self.sample <= 0:
+            return None
+        parent = TRACEPARENT.match(traceparent) if traceparent else None
+        if parent is not None:
+            if not int(parent.group(3), 16) & SAMPLED:
+                return None
+            return Span(self, name, parent.group(1), parent.group(2), **attributes)
+        if random.random() >= self.sample:
+            return None
+        return Span(self, name, f"{random.getrandbits(128):032x}", **attributes)
+
+
+class ChildSpan:
+    """
+    Context manager running the block in a child span of the current span
+    """
+    __slots__ = ("span", "token")
+
+    def __init__(self, parent: Span, name: str, attributes: dict):
+        self.span = parent.child(name, **attributes)
+        self.token = None
+
+    def __enter__(self):
+        self.token = current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, kind, value, traceback):
+        current_span.reset(self.token)
+        self.span.finish(value)
+
+
+# shared by every block of the requests not sampled, entering it does nothing
+NO_SPAN = nullcontext()
+
+
+def span(name: str, **attributes):
+    """
+    Time the block as child of the current span, nothing when the request is not sampled
+
+    :param name: name of the span
+    :param attributes: attributes of the span
+    :return: context manager of the span, giving the span or None
+    """
+    parent = current_span.get()
+    if parent is None:
+        return NO_SPAN
+    return ChildSpan(parent, name, attributes)
+
+
+def traced(name: str):
+    """
+    Decorate the function to run in a span of the name
+
+    :param name: name of the span
+    :return: the decorator
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware running every sampled request in its root span, the `traceparent` of the span is sent back
+    """
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.tracer.sample <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = dict(scope["headers"]).get(b"traceparent")
+        root = self.tracer.start_request(f"{scope['method']} {scope['path']}",
+                                         traceparent.decode("latin-1") if traceparent else None,
+                                         method=scope["method"], path=scope["path"])
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_traceparent(message):
+            if message["type"] == "http.response.start":
+                root.attributes["status"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"traceparent", root.traceparent().encode())
+                ]
+            await send(message)
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_traceparent)
+        except BaseException as e:
+            root.finish(e)
+            raise
+        else:
+            root.finish()
+        finally:
+            current_span.reset(token)
@@ -0,0 +1,172 @@
+import json
+import random
+import threading
+import time
+
+# placeholder of every redacted character, the length of the value is kept for the size of the replayed bodies
+REDACTED = "x"
+
+
+class TrafficRecorder:
+    """
+    Sample of the requests written as JSON lines: method, path with query, sanitized body, status and duration.
+
+    The headers are never recorded, the API key is added by the replay
+    """
+
+    def __init__(self, path: str, sample: float, redact_fields, skip_paths=()):
+        """
+        :param path: JSON lines file the requests are appended to
+        :param sample: share of the requests recorded, from 0 to 1
+        :param redact_fields: body fields and query parameters with user data, their values are redacted
+        :param skip_paths: parts of the paths never recorded, e.g. of the probes and the routes with credentials
+        """
+        self.path = path
+        self.sample = sample
+        self.redact_fields = set(redact_fields)
+        self.skip_paths = tuple(skip_paths)
+        self.lock = threading.Lock()
+        self.file = None
+
+    def wants(self, path: str) -> bool:
+        """
+        Decide if the request is recorded
+
+        :param path: path of the request
+        :return: True if the request is sampled and its path is not skipped
+        """
+        if any(part in path for part in self.skip_paths):
+            return False
+        return random.random() < self.sample
+
+    def sanitize(self, value):
+        """
+        Redact the user data of the decoded body, the structure, types and lengths stay the same
+
+        :param value: decoded JSON
+        :return: copy of the value with the redacted fields replaced
+        """
+        if isinstance(value, dict):
+            return {key: self.redact(item) if key in self.redact_fields else self.sanitize(item)
+                    for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.sanitize(item) for item in value]
+        return value
+
+    @staticmethod
+    def redact(value):
+        """
+        Replace the string of user data with the placeholder of the same length
+
+        :param value: value of a redacted field
+        :return: placeholder string, other types are kept
+        """
+        return REDACTED * len(value) if isinstance(value, str) else value
+
+    def sanitize_query(self, query: str) -> str:
+        """
+        Redact the values of the redacted query parameters
+
+        :param query: raw query string of the request
+        :return: query string with the same parameters
+        """
+        params = []
+        for param in query.split("&") if query else []:
+            name, sep, value = param.partition("=")
+            params.append(f"{name}{sep}{self.redact(value)}" if name in self.redact_fields else param)
+        return "&".join(params)
+
+    def sanitize_body(self, body: bytes):
+        """
+        Decode and sanitize the body of the request
+
+        :param body: raw body
+        :return: sanitized JSON, None if there is no body or it is not JSON
+        """
+        if not body:
+            return None
+        try:
+            return self.sanitize(json.loads(body))
+        except ValueError:
+            return None
+
+    def record(self, started: float, method: str, path: str, query: str, body: bytes, status: int,
+               duration: float):
+        """
+        Append the request to the log
+
+        :param started: wall clock time the request started at, the replay keeps the gaps between the requests
+        :param method: HTTP method
+        :param path: path of the request
+        :param query: raw query string
+        :param body: raw body
+        :param status: status code of the response
+        :param duration: seconds until the response was sent
+        :return: None
+        """
+        query = self.sanitize_query(query)
+        entry = {
+            "at": round(started, 6),
+            "method": method,
+            "path": f"{path}?{query}" if query else path,
+            "body": self.sanitize_body(body),
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.file is None:
+                # line buffered, a killed worker loses the request in flight at most
+                self.file = open(self.path, "a", buffering=1, encoding="utf-8")
+            self.file.write(line)
+
+    def close(self):
+        """
+        Close the log
+
+        :return: None
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordMiddleware:
+    """
+    ASGI middleware passing the request through and recording the sampled ones once their response is sent.
+
+    The body is copied while the route reads it, the route still receives every chunk
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.wants(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        started = time.time()
+        clock = time.perf_counter()
+        chunks = []
+        status = []
+
+        async def receive_copy():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive_copy, send_status)
+        finally:
+            # an exception of the app is answered 500 by the outer middleware
+            self.recorder.record(started, scope["method"], scope["path"], scope["query_string"].decode("latin-1"),
+                                 b"".join(chunks), status[0] if status else 500, time.perf_counter() - clock)
@@ -9,3 +9,35 @@ class BodyObject(BaseModel):
     """
     id: str
     records: List[Record] = []
+
+    @staticmethod
+    def fast_parse(data):
+        """
+        Validate decoded JSON body to mongo ready records in a single pass
+
+        :param data: decoded JSON body
+        :return: RawBody or None if the model has to validate the body
+        """
+        if type(data) is not dict or type(data.get("id")) is not str:
+            return None
+        records = data.get("records", [])
+        if type(records) is not list:
+            return None
+
+        validated = []
+        for record in records:
+            checked = Record.fast_validate(record)
+            if checked is None:
+                return None
+            validated.append(checked)
+        return RawBody(data["id"], validated)
+
+
+class RawBody:
+    """
+    Body with the records already converted to mongo documents
+    """
+
+    def __init__(self, _id, records):
+        self.id = _id
+        self.records = records
@@ -1,4 +1,13 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
+from helpers.date_helper import DateHelper
+from typing import Optional
+
+# hours the delta of the client may differ from the delta derived from start and end
+DELTA_TOLERANCE = 0.05
+
+# fields of the record in the order they are stored, with the exact JSON types accepted without coercion
+RECORD_FIELDS = ("id", "task", "start", "end", "delta", "platform", "notes")
+STRING_FIELDS = ("task", "start", "end", "platform", "notes")
 
 
 class Record(BaseModel):
@@ -9,7 +18,63 @@ class Record(BaseModel):
     task: str
     start: str
     end: str
-    delta: float
+    delta: Optional[float] = None
     platform: str
     notes: str
 
+    @staticmethod
+    def check_delta(start: str, end: str, delta):
+        """
+        Derive the delta in hours from start and end, the delta sent by the client has to match it
+
+        :param start: start of the task
+        :param end: end of the task
+        :param delta: delta sent by the client or None
+        :return: the delta
+        """
+        derived = DateHelper.duration_hours(start, end)
+        if derived is None:
+            # free-form times, the client has to send the delta
+            if delta is None:
+                raise ValueError("delta is required when start and end are not times")
+            return delta
+        elif delta is None:
+            return round(derived, 6)
+        elif abs(delta - derived) > DELTA_TOLERANCE:
+            raise ValueError("delta does not match start and end")
+        return delta
+
+    @root_validator(skip_on_failure=True)
+    def derive_delta(cls, values):
+        values["delta"] = Record.check_delta(values["start"], values["end"], values.get("delta"))
+        return values
+
+    @staticmethod
+    def fast_validate(data):
+        """
+        Validate decoded JSON record that already has the exact types, without building the model
+
+        Anything that would need coercion or fail returns None, the model then validates it to give the same
+        result and errors as before
+
+        :param data: decoded JSON record
+        :return: mongo ready record or None if the model has to validate it
+        """
+        if type(data) is not dict or type(data.get("id")) is not int:
+            return None
+        for field in STRING_FIELDS:
+            if type(data.get(field)) is not str:
+                return None
+        delta = data.get("delta")
+        if delta is not None and type(delta) is not float and type(delta) is not int:
+            return None
+        try:
+            delta = Record.check_delta(data["start"], data["end"], delta)
+        except ValueError:
+            return None
+
+        if len(data) == len(RECORD_FIELDS) and tuple(data) == RECORD_FIELDS and type(data["delta"]) is float:
+            # already exactly the stored record, use it as it is
+            return data
+        return {"id": data["id"], "task": data["task"], "start": data["start"], "end": data["end"],
+                "delta": float(delta), "platform": data["platform"], "notes": data["notes"]}
@@ -0,0 +1,30 @@
+import argparse
+from datetime import datetime, timedelta
+from db.MongoDB import MongoAPI, archive_after_days
+
+
+def archive_days(after_days):
+    """
+    Move the days older than the given number of days to the archive, run it e.g. once a month
+
+    :param after_days: age in days of the days archived
+    :return: None
+    """
+    mongo = MongoAPI()
+    mongo.ensure_connected()
+    if not mongo.check_tasks_exist():
+        print("Mongo is not connected, nothing is archived")
+        return
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    moved = mongo.archive_days(today - timedelta(days=after_days))
+    for month, count in moved.items():
+        print(f"{month}: {count} days archived")
+    print(f"{sum(moved.values())} days archived")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move the old days from the tasks collection to the archive")
+    parser.add_argument("--after-days", type=int, default=archive_after_days)
+    arguments = parser.parse_args()
+    archive_days(arguments.after_days)
@@ -0,0 +1,33 @@
+import sys
+from db.MongoDB import MongoAPI, MongoConnection, task_layout
+
+
+def backfill_time_storage(storage):
+    """
+    Rewrite every day with start and end in the given storage form
+
+    Reads understand both forms, so the API can keep serving while the backfill runs. Set `TIME_STORAGE` to the
+    same form before the backfill so new writes are not left behind.
+
+    :param storage: `string` or `datetime`
+    :return: None
+    """
+    client = MongoConnection.get_database()
+    if client is None:
+        print("Mongo is not connected, nothing is backfilled")
+        return
+
+    layout = MongoAPI.get_layout(client, task_layout, storage)
+    days = layout.day_ids()
+    for count, day in enumerate(days, start=1):
+        record_day = layout.find_day(day)
+        layout.save_day(day, record_day["records"])
+        print(f"{count}/{len(days)} {day}: {len(record_day['records'])} tasks")
+
+
+if __name__ == "__main__":
+    # usage: python -m scripts.backfill_time_storage <string|datetime>
+    if len(sys.argv) != 2 or sys.argv[1] not in ("string", "datetime"):
+        print("usage: python -m scripts.backfill_time_storage <string|datetime>")
+    else:
+        backfill_time_storage(sys.argv[1])
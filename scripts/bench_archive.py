@@ -0,0 +1,87 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+import db.MongoDB as mongo
+from db.MongoDB import MongoAPI
+from scripts.bench_series import make_day
+
+COLLECTIONS = ("coll_task", "coll_task_items", "coll_task_series", "coll_feed", "coll_changes", "coll_archive")
+
+
+def working_set(storage) -> str:
+    """
+    :param storage: the connected MongoAPI
+    :return: bytes of the data and the indexes of the hot collections and of the archive
+    """
+    database = storage.client[mongo.db_name]
+    sizes = {}
+    for name in (mongo.coll_task, mongo.coll_task_items, mongo.coll_feed, mongo.coll_archive):
+        stats = database.command("collStats", name)
+        sizes[name] = stats.get("storageSize", 0) + stats.get("totalIndexSize", 0)
+    hot = sum(size for name, size in sizes.items() if name != mongo.coll_archive)
+    return f"hot {hot / 1024:.0f} KiB, archive {sizes[mongo.coll_archive] / 1024:.0f} KiB"
+
+
+def latency(function, *args, rounds) -> str:
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return f"p50 {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms"
+
+
+def report(storage, recent, old, rounds):
+    print(f"  working set: {working_set(storage)}")
+    print(f"  recent day: {latency(storage.get_record_for_day, recent, rounds=rounds)}")
+    print(f"  old day: {latency(storage.get_record_for_day, old, rounds=rounds)}")
+    print(f"  all days: {latency(storage.get_all_records, rounds=max(rounds // 10, 1))}")
+
+
+def bench_archive(days, tasks, keep, rounds):
+    """
+    Working set and latency of the reads before and after the days older than `keep` are archived, in collections of
+    the benchmark dropped at the end
+
+    :param days: number of days filled up to today
+    :param tasks: tasks per day
+    :param keep: age in days of the days archived
+    :param rounds: number of reads timed
+    :return: None
+    """
+    for name in COLLECTIONS:
+        setattr(mongo, name, f"bench_archive_{name}")
+    storage = MongoAPI()
+    storage.ensure_connected()
+    if not storage.check_tasks_exist():
+        raise SystemExit("Mongo is not connected")
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    all_days = [(today - timedelta(days=offset)).strftime("%d/%m/%Y") for offset in range(days)]
+    for day in all_days:
+        storage.layout.save_day(day, make_day(tasks))
+    storage.rebuild_feed()
+    recent, old = all_days[0], all_days[-1]
+
+    try:
+        print(f"--- {days} days of {tasks} tasks")
+        report(storage, recent, old, rounds)
+        start = time.perf_counter()
+        moved = storage.archive_days(today - timedelta(days=keep))
+        print(f"--- {sum(moved.values())} days older than {keep} days archived in {time.perf_counter() - start:.1f} s")
+        report(storage, recent, old, rounds)
+        print(f"  archive cache: {storage.archive_cache.hits} hits, {storage.archive_cache.misses} misses")
+    finally:
+        for name in COLLECTIONS:
+            storage.client[mongo.db_name].drop_collection(getattr(mongo, name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Working set and read latency before and after archiving old days")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--tasks", type=int, default=32)
+    parser.add_argument("--keep", type=int, default=90)
+    parser.add_argument("--rounds", type=int, default=100)
+    arguments = parser.parse_args()
+    bench_archive(arguments.days, arguments.tasks, arguments.keep, arguments.rounds)
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from project import VERSION
+from helpers.response_cache import ResponseCache
+from scripts.bench_response_cache import make_records, request
+from scripts.bench_single_flight import counting
+
+# month written by the benchmark, far from the days in use and removed afterwards
+BENCH_MONTH = [(datetime(1999, 1, 1) + timedelta(days=offset)).strftime("%d/%m/%Y") for offset in range(31)]
+
+
+async def bench_batch(views, rtt, key_name):
+    """
+    Month views loaded with a request per day, all at once as the clients do, and with a single batch request, the
+    response cache is off so every request reaches the storage
+
+    :param views: number of month views loaded
+    :param rtt: seconds added to every storage read
+    :param key_name: header of the API key
+    :return: None
+    """
+    import src.server as server
+
+    storage = server.storage
+    headers = {key_name: storage.get_cached_key()}
+    for day in BENCH_MONTH:
+        storage.delete_record_for_day(day)
+        storage.create_record_for_day(day, make_records(10))
+    date_ids = [day.replace("/", "_") for day in BENCH_MONTH]
+
+    reads = Counter()
+    counting(storage, "get_record_for_day", reads, rtt)
+    counting(storage, "get_records_for_days", reads, rtt)
+    server.response_cache = ResponseCache(0, 0)
+
+    async def per_day():
+        return await asyncio.gather(*[request(server.api, f"/api/{VERSION}/day/{date_id}", headers)
+                                      for date_id in date_ids])
+
+    async def batch():
+        return [await request(server.api, f"/api/{VERSION}/days", headers, f"date_ids={','.join(date_ids)}")]
+
+    try:
+        for name, view in (("request per day", per_day), ("batch", batch)):
+            reads.clear()
+            timings = []
+            statuses = Counter()
+            for _ in range(views):
+                start = time.perf_counter()
+                statuses.update(await view())
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f"{name}: {sum(reads.values()) / views:.0f} storage reads and {sum(statuses.values()) // views} "
+                  f"requests per month view, p50 {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms, "
+                  f"status {dict(statuses)}")
+    finally:
+        for day in BENCH_MONTH:
+            storage.delete_record_for_day(day)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Month view loaded day by day and with a single batch request")
+    parser.add_argument("--views", type=int, default=50)
+    parser.add_argument("--rtt", type=float, default=0.0, help="seconds added to every read, e.g. 0.02 for a "
+                                                               "local storage standing in for Atlas")
+    arguments = parser.parse_args()
+
+    from decouple import config
+    asyncio.run(bench_batch(arguments.views, arguments.rtt, config("API_KEY_NAME")))
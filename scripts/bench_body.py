@@ -0,0 +1,45 @@
+import json
+import time
+from interface.body import BodyObject
+from src.server import convert_records
+
+
+def make_body(size) -> bytes:
+    records = [{"id": i, "task": f"task {i}", "start": "10:00:00", "end": "10:30:00", "delta": 0.5,
+                "platform": "web", "notes": "benchmark"} for i in range(size)]
+    return json.dumps({"id": "01/01/2000", "records": records}).encode("UTF-8")
+
+
+def model_path(raw):
+    body = BodyObject.validate(json.loads(raw))
+    return convert_records(body.records)
+
+
+def fast_path(raw):
+    return BodyObject.fast_parse(json.loads(raw)).records
+
+
+def bench_body(sizes=(1000, 100000), repeat=5):
+    """
+    Time the validation of POST/PUT bodies to mongo documents, through the model and the single pass
+
+    :param sizes: number of records of the body
+    :param repeat: number of runs, the best is reported
+    :return: None
+    """
+    for size in sizes:
+        raw = make_body(size)
+        assert model_path(raw) == fast_path(raw)
+        for name, function in (("model", model_path), ("fast", fast_path)):
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function(raw)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{size} records, {name}: {best * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    # invoke the benchmark, imports the server so the .env has to be set
+    bench_body()
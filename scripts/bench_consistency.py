@@ -0,0 +1,61 @@
+import argparse
+import time
+import db.MongoDB as mongo
+from db.MongoDB import MongoAPI, PROFILES
+from scripts.bench_read_preference import DAYS, make_records
+
+
+def percentiles(timings) -> str:
+    timings = sorted(timings)
+    return f"p50 {timings[len(timings) // 2]:.1f} ms, p99 {timings[int(len(timings) * 0.99)]:.1f} ms"
+
+
+def bench_profile(profile, rounds) -> dict:
+    """
+    Latency of the operations of the routes with all of them in the profile
+
+    :param profile: key of PROFILES
+    :param rounds: number of times every operation is run
+    :return: dict of operation to list of milliseconds
+    """
+    mongo.consistency_profile = profile
+    mongo.consistency_routes = []
+    storage = MongoAPI()
+    storage.ensure_connected()
+    if not storage.isConnected:
+        raise SystemExit("Mongo is not connected")
+    for day in DAYS:
+        # left over by an interrupted run
+        storage.layout.delete_day(day)
+
+    timings = {"create": [], "update": [], "day": [], "latest": [], "delete_day": []}
+
+    def timed(operation, function, *args):
+        start = time.perf_counter()
+        function(*args)
+        timings[operation].append((time.perf_counter() - start) * 1000)
+
+    for i in range(rounds):
+        day = DAYS[i % len(DAYS)]
+        timed("create", storage.create_record_for_day, day, make_records(20))
+        # the running task is updated by the client many times a day
+        for size in (20, 21, 22):
+            timed("update", storage.update_record_for_day, day, make_records(size))
+        timed("day", storage.get_record_for_day, day)
+        timed("latest", storage.get_most_recent_record, day)
+        timed("delete_day", storage.delete_record_for_day, day)
+    storage.client.close()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of the operations per consistency profile, run against a "
+                                                 "replica set, the profiles only differ where writes wait for members")
+    parser.add_argument("--rounds", type=int, default=100)
+    arguments = parser.parse_args()
+
+    for name in PROFILES:
+        result = bench_profile(name, arguments.rounds)
+        print(f"--- {name}")
+        for operation, timings in result.items():
+            print(f"{operation:>10}: {percentiles(timings)}")
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import tempfile
+import time
+from helpers.journal import WriteJournal
+
+
+def make_records(size) -> list:
+    return [{"id": i, "task": f"task {i}", "start": "10:00:00", "end": "10:30:00", "delta": 0.5,
+             "platform": "web", "notes": "benchmark"} for i in range(size)]
+
+
+def bench_journal(count=2000, size=10):
+    """
+    Time the journaled writes, every append is synced to disk before it returns, and their replay
+
+    :param count: number of writes
+    :param size: number of records of every write
+    :return: None
+    """
+    records = make_records(size)
+    for synchronous in ("FULL", "NORMAL"):
+        path = os.path.join(tempfile.mkdtemp(), "journal.db")
+        journal = WriteJournal(path)
+        journal.connect().execute(f"PRAGMA synchronous={synchronous}")
+        start = time.perf_counter()
+        for i in range(count):
+            journal.append("update", f"{i % 28 + 1:02d}/01/2000", [records])
+        elapsed = time.perf_counter() - start
+        print(f"append synchronous={synchronous}: {count / elapsed:.0f} writes/s, {elapsed / count * 1e6:.0f} us/write")
+
+        start = time.perf_counter()
+        applied = journal.replay(lambda op, day, args: None)
+        elapsed = time.perf_counter() - start
+        print(f"replay synchronous={synchronous}: {applied / elapsed:.0f} writes/s without the mongo writes")
+
+
+if __name__ == "__main__":
+    # invoke the benchmark, only the journal is used so no .env is needed
+    print(f"sqlite {sqlite3.sqlite_version}")
+    bench_journal()
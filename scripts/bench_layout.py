@@ -0,0 +1,70 @@
+import time
+import bson
+from db.MongoDB import MongoConnection, MongoDayLayout, MongoTaskLayout, db_name, time_storage
+from helpers.record_codec import RecordCodec
+
+DAY = "01/01/2000"
+SIZES = (10, 100, 1000, 10000, 50000)
+
+
+def make_record(i, note="benchmark"):
+    return {"id": i, "task": f"task {i}", "start": "00:00:00", "end": "00:01:00", "delta": 0.02,
+            "platform": "benchmark", "notes": note}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_layout(layout, size):
+    """
+    Time the operations of the routes for a day with the given number of tasks
+
+    :param layout: the storage layout
+    :param size: number of tasks of the day
+    :return: dict of operation to milliseconds
+    """
+    records = [make_record(i) for i in range(size)]
+    layout.delete_day(DAY)
+    result = {"create": timed(layout.insert_day, DAY, records),
+              "get day": timed(layout.find_day, DAY),
+              "get latest": timed(layout.find_latest, DAY)}
+
+    # the running task is updated by the client many times a day
+    updated = records[:-1] + [make_record(size - 1, "updated")]
+    result["update last"] = timed(layout.replace_records, DAY, records, updated)
+
+    appended = updated + [make_record(size)]
+    result["append"] = timed(layout.replace_records, DAY, updated, appended)
+    result["delete day"] = timed(layout.delete_day, DAY)
+    return result
+
+
+def run_bench():
+    client = MongoConnection.get_database()
+    if client is None:
+        print("Mongo is not connected")
+        return
+
+    database = client[db_name]
+    codec = RecordCodec(time_storage == "datetime")
+    layouts = {"day": MongoDayLayout(database["bench_layout_day"], codec),
+               "task": MongoTaskLayout(database["bench_layout_task"], database["bench_layout_task_items"], codec)}
+    layouts["task"].ensure_indexes()
+
+    for size in SIZES:
+        document = bson.encode({"_id": DAY, "records": [make_record(i) for i in range(size)]})
+        print(f"--- {size} tasks, day document {len(document) / 1024:.0f} KiB")
+        for name, layout in layouts.items():
+            timings = bench_layout(layout, size)
+            print(f"{name:>5}: " + ", ".join(f"{operation} {ms:.1f} ms" for operation, ms in timings.items()))
+
+    for name in ("bench_layout_day", "bench_layout_task", "bench_layout_task_items"):
+        database.drop_collection(name)
+
+
+if __name__ == "__main__":
+    # invoke the benchmark against the configured database
+    run_bench()
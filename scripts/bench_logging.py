@@ -0,0 +1,82 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+from helpers.structured_log import setup_logging, DroppingQueueHandler, JsonFormatter, request_id, route
+
+
+class SlowHandler(logging.StreamHandler):
+    """
+    Sink of a blocked stderr, e.g. a full pipe of the log collector during an outage
+    """
+
+    def emit(self, record):
+        time.sleep(0.002)
+        super().emit(record)
+
+
+def paced(logger, rate, duration) -> list:
+    """
+    Log one error per request at the rate, the way every request logs during an outage
+
+    :return: list of seconds spent in the logging call per request
+    """
+    costs = []
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        request_id.set(f"{i:032x}")
+        route.set("/api/v0.7/day/01_01_2020")
+        begin = time.perf_counter()
+        logger.error("Connection to mongo failed: %s", "timeout")
+        costs.append(time.perf_counter() - begin)
+    return costs
+
+
+def print_costs(name, costs, rate, dropped=0):
+    costs = sorted(costs)
+    mean = sum(costs) / len(costs)
+    print(f"{name:<28} mean {mean * 1e6:7.1f} us, p99 {costs[int(len(costs) * 0.99)] * 1e6:8.1f} us, "
+          f"max {costs[-1] * 1e3:6.2f} ms, {mean * rate * 100:5.1f}% of the loop at {rate:.0f} rps, "
+          f"{dropped} dropped")
+
+
+def bench_logging(rate, duration):
+    """
+    Compare the time the requests spend logging with a blocking handler and with the background thread
+
+    :param rate: requests per second
+    :param duration: seconds per run
+    :return: None
+    """
+    root = logging.getLogger()
+    logger = logging.getLogger("bench")
+    path = os.path.join(tempfile.mkdtemp(), "log.jsonl")
+    for slow in (False, True):
+        sink = "slow sink" if slow else "file"
+        with open(path, "w") as stream:
+            handler = (SlowHandler if slow else logging.StreamHandler)(stream)
+            handler.setFormatter(JsonFormatter())
+            root.handlers = [handler]
+            root.setLevel(logging.INFO)
+            print_costs(f"blocking, {sink}", paced(logger, rate, duration), rate)
+
+            root.handlers = []
+            queued = setup_logging("INFO", 1000, {}, stream)
+            queued.target = SlowHandler(stream) if slow else queued.target
+            queued.target.setFormatter(JsonFormatter())
+            costs = paced(logger, rate, duration)
+            queued.close()
+            print_costs(f"queue, {sink}", costs, rate, queued.dropped)
+    root.handlers = [handler for handler in root.handlers if not isinstance(handler, DroppingQueueHandler)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time spent logging per request, blocking and with the queue handler")
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--duration", type=float, default=5)
+    arguments = parser.parse_args()
+    bench_logging(arguments.rate, arguments.duration)
@@ -0,0 +1,94 @@
+import argparse
+import time
+from collections import Counter
+from pymongo import monitoring
+import db.MongoDB as mongo
+from db.MongoDB import MongoAPI
+
+DAYS = [f"{day:02d}/01/2000" for day in range(1, 11)]
+
+
+def make_records(size):
+    return [{"id": i, "task": f"task {i}", "start": "00:00:00", "end": "00:01:00", "delta": 0.02,
+             "platform": "benchmark", "notes": "benchmark"} for i in range(size)]
+
+
+class ServerCommands(monitoring.CommandListener):
+    """
+    Count the commands sent to every member of the replica set
+    """
+
+    def __init__(self):
+        self.commands = Counter()
+
+    def started(self, event):
+        self.commands[event.connection_id] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def bench_mode(mode, staleness, reads, writes, listener) -> tuple:
+    """
+    Run the read heavy mix of the routes with the reads of the days sent to the members of the mode
+
+    :param mode: name of the read preference
+    :param staleness: MAX_STALENESS_SECONDS
+    :param reads: number of reads
+    :param writes: number of writes
+    :param listener: ServerCommands registered before the client is created
+    :return: (commands per member, seconds, primary address)
+    """
+    mongo.read_preference = mode
+    mongo.max_staleness = staleness
+    storage = MongoAPI()
+    storage.ensure_connected()
+    if not storage.isConnected:
+        raise SystemExit("Mongo is not connected")
+    for day in DAYS:
+        # left over by an interrupted run
+        storage.layout.delete_day(day)
+        storage.create_record_for_day(day, make_records(20))
+
+    listener.commands.clear()
+    start = time.perf_counter()
+    for i in range(reads + writes):
+        day = DAYS[i % len(DAYS)]
+        if i % (reads // max(writes, 1) + 1) == 0:
+            storage.update_record_for_day(day, make_records(20 + i % 3))
+            # read your own write, a stale secondary would give the records before the update
+            assert len(storage.get_record_for_day(day)["records"]) == 20 + i % 3
+        elif i % 2:
+            storage.get_record_for_day(day)
+        else:
+            storage.get_most_recent_record(day)
+    elapsed = time.perf_counter() - start
+
+    commands = dict(listener.commands)
+    primary = storage.client.primary
+    for day in DAYS:
+        storage.delete_record_for_day(day)
+    storage.client.close()
+    return commands, elapsed, primary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Commands on the primary with the reads of the days kept on it and "
+                                                 "routed to the secondaries, needs a replica set in MONGO_URI")
+    parser.add_argument("--mode", default="secondaryPreferred")
+    parser.add_argument("--staleness", type=int, default=90)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--writes", type=int, default=100)
+    arguments = parser.parse_args()
+
+    listener = ServerCommands()
+    monitoring.register(listener)
+    for mode in ("primary", arguments.mode):
+        commands, elapsed, primary = bench_mode(mode, arguments.staleness, arguments.reads, arguments.writes, listener)
+        on_primary = commands.get(primary, 0)
+        print(f"{mode}: {on_primary} of {sum(commands.values())} commands on the primary, "
+              f"{arguments.reads + arguments.writes} operations in {elapsed:.2f} s, "
+              + ", ".join(f"{host}:{port} {count}" for (host, port), count in sorted(commands.items())))
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from project import VERSION
+from helpers.response_cache import ResponseCache
+
+# day written by the benchmark, far from the days in use and removed afterwards
+BENCH_DAY = "01/01/1999"
+
+
+def make_records(size) -> list:
+    return [{"id": i, "task": f"bench task {i}", "start": f"{i % 24:02d}:00:00", "end": f"{i % 24:02d}:30:00",
+             "delta": 0.5, "platform": "bench", "notes": "response cache"} for i in range(size)]
+
+
+async def request(app, path, headers, query="") -> int:
+    """
+    Call the ASGI app directly, without a client or the network
+
+    :return: status code of the response
+    """
+    scope = {"type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+             "raw_path": path.encode("UTF-8"), "query_string": query.encode("UTF-8"), "root_path": "",
+             "headers": [(name.lower().encode("UTF-8"), value.encode("UTF-8")) for name, value in headers.items()],
+             "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 8000)}
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def bench_response_cache(sizes=(10, 1000), duration=3.0):
+    """
+    Requests per second of the day routes with the response cache and without it
+
+    :param sizes: number of records of the day
+    :param duration: seconds per run
+    :return: None
+    """
+    import src.server as server
+
+    storage = server.storage
+    key = storage.get_cached_key()
+    headers = {"access_token": key, "accept-encoding": "gzip"}
+    day_path = f"/api/{VERSION}/day/{BENCH_DAY.replace('/', '_')}"
+    for size in sizes:
+        storage.delete_record_for_day(BENCH_DAY)
+        storage.create_record_for_day(BENCH_DAY, make_records(size))
+        for name, cache in (("no cache", ResponseCache(0, 0)), ("cache", server.response_cache)):
+            server.response_cache = cache
+            count = 0
+            end = time.perf_counter() + duration
+            start = time.perf_counter()
+            while time.perf_counter() < end:
+                assert await request(server.api, day_path, headers) == 200
+                count += 1
+            elapsed = time.perf_counter() - start
+            print(f"{size} records, {name}: {count / elapsed:.0f} req/s, {elapsed / count * 1e6:.0f} us/req")
+    storage.delete_record_for_day(BENCH_DAY)
+
+
+if __name__ == "__main__":
+    # invoke the benchmark, imports the server so the .env has to be set
+    asyncio.run(bench_response_cache())
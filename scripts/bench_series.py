@@ -0,0 +1,105 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+from db.MongoDB import MongoConnection, MongoDayLayout, MongoTaskLayout, MongoSeriesLayout, db_name
+from helpers.record_codec import RecordCodec
+
+PLATFORMS = ("web", "android", "ios", "desktop")
+START = datetime(2000, 1, 1)
+
+
+def make_day(tasks) -> list:
+    # tasks of the day one after another from 8 o'clock on, 15 minutes each, at most 64
+    return [{"id": i, "task": f"task {i % 10}", "start": f"{8 + i // 4:02d}:{i % 4 * 15:02d}:00",
+             "end": f"{8 + (i + 1) // 4:02d}:{(i + 1) % 4 * 15:02d}:00", "delta": 0.25,
+             "platform": PLATFORMS[i % len(PLATFORMS)], "notes": "benchmark"} for i in range(tasks)]
+
+
+def storage_size(database, names) -> int:
+    """
+    :param database: the database
+    :param names: collections of the layout
+    :return: bytes of the data and the indexes on disk
+    """
+    total = 0
+    for name in names:
+        stats = database.command("collStats", name)
+        total += stats.get("storageSize", 0) + stats.get("totalIndexSize", 0)
+    return total
+
+
+def platform_totals(layout, name, start, end) -> list:
+    """
+    Hours per platform of the tasks started in the range, the query of a monthly report
+
+    :param layout: the storage layout
+    :param name: `day`, `task` or `series`
+    :param start: datetime of the start of the range
+    :param end: datetime of the end of the range
+    :return: list of dict with platform and hours
+    """
+    if name == "series":
+        # answered from the buckets of the time range
+        pipeline = [{"$match": {"at": {"$gte": start, "$lt": end}}},
+                    {"$group": {"_id": "$meta.platform", "hours": {"$sum": "$record.delta"}}}]
+        return list(layout.items.aggregate(pipeline))
+    elif name == "task":
+        pipeline = [{"$match": {"record.start": {"$gte": start, "$lt": end}}},
+                    {"$group": {"_id": "$record.platform", "hours": {"$sum": "$record.delta"}}}]
+        return list(layout.items.aggregate(pipeline))
+    else:
+        pipeline = [{"$unwind": "$records"},
+                    {"$match": {"records.start": {"$gte": start, "$lt": end}}},
+                    {"$group": {"_id": "$records.platform", "hours": {"$sum": "$records.delta"}}}]
+        return list(layout.tasks.aggregate(pipeline))
+
+
+def run_bench(days, tasks, rounds):
+    client = MongoConnection.get_database()
+    if client is None:
+        print("Mongo is not connected")
+        return
+
+    database = client[db_name]
+    # start and end as datetime in every layout, so the range can be queried in all of them
+    codec = RecordCodec(True)
+    layouts = {"day": (MongoDayLayout(database["bench_series_day"], codec), ["bench_series_day"]),
+               "task": (MongoTaskLayout(database["bench_series_task"], database["bench_series_task_items"], codec),
+                        ["bench_series_task", "bench_series_task_items"]),
+               "series": (MongoSeriesLayout(database["bench_series_series"], database["bench_series_series_items"],
+                                            codec), ["bench_series_series", "bench_series_series_items"])}
+    month = (START + timedelta(days=days - 30), START + timedelta(days=days))
+
+    for name, (layout, collections) in layouts.items():
+        layout.ensure_indexes()
+        start = time.perf_counter()
+        for offset in range(days):
+            day = (START + timedelta(days=offset)).strftime("%d/%m/%Y")
+            layout.save_day(day, make_day(tasks))
+        filled = time.perf_counter() - start
+
+        totals = platform_totals(layout, name, *month)
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            platform_totals(layout, name, *month)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        hours = sum(total["hours"] for total in totals)
+        print(f"{name:>6}: {storage_size(database, collections) / 1024:.0f} KiB on disk, filled in {filled:.1f} s, "
+              f"platform totals of the last 30 days p50 {timings[len(timings) // 2]:.1f} ms "
+              f"max {timings[-1]:.1f} ms ({hours:.0f} hours)")
+
+    for _, collections in layouts.values():
+        for name in collections:
+            database.drop_collection(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Storage size and range aggregation of the day, task and series "
+                                                 "layouts, the series layout needs mongo 7.0")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tasks", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    arguments = parser.parse_args()
+    run_bench(arguments.days, arguments.tasks, arguments.rounds)
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import functools
+import time
+from collections import Counter
+from project import VERSION
+from helpers.response_cache import ResponseCache
+from scripts.bench_response_cache import BENCH_DAY, make_records, request
+
+
+def counting(storage, name, counter, rtt):
+    """
+    Count the calls of the storage read, adding the round trip to the database the local storage does not have
+
+    :return: None
+    """
+    read = getattr(storage, name)
+
+    @functools.wraps(read)
+    def wrapper(*args):
+        counter[name] += 1
+        time.sleep(rtt)
+        return read(*args)
+
+    setattr(storage, name, wrapper)
+
+
+async def herd(app, paths, headers, clients, waves) -> list:
+    """
+    Every wave polls the paths with all clients at once, the next wave starts when the previous one is answered
+
+    :return: list of (status, seconds)
+    """
+    results = []
+
+    async def poll(path):
+        start = time.perf_counter()
+        status = await request(app, path, headers)
+        results.append((status, time.perf_counter() - start))
+
+    for wave in range(waves):
+        await asyncio.gather(*[poll(paths[client % len(paths)]) for client in range(clients)])
+    return results
+
+
+async def bench_single_flight(clients, waves, rtt, key_name):
+    """
+    Storage reads and latency of a thundering herd polling the same day, with and without single-flight, the response
+    cache is off so every request reaches the storage
+
+    :param clients: concurrent requests per wave
+    :param waves: number of waves
+    :param rtt: seconds added to every storage read
+    :param key_name: header of the API key
+    :return: None
+    """
+    import src.server as server
+
+    storage = server.storage
+    headers = {key_name: storage.get_cached_key()}
+    storage.delete_record_for_day(BENCH_DAY)
+    storage.create_record_for_day(BENCH_DAY, make_records(10))
+    day_path = f"/api/{VERSION}/day/{BENCH_DAY.replace('/', '_')}"
+    paths = [day_path, f"{day_path}/latest"]
+
+    reads = Counter()
+    counting(storage, "get_record_for_day", reads, rtt)
+    counting(storage, "get_most_recent_record", reads, rtt)
+    server.response_cache = ResponseCache(0, 0)
+    try:
+        for enabled in (False, True):
+            server.SINGLE_FLIGHT = enabled
+            reads.clear()
+            results = await herd(server.api, paths, headers, clients, waves)
+            latencies = sorted(elapsed * 1000 for _, elapsed in results)
+            statuses = Counter(status for status, _ in results)
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print(f"single-flight {enabled}: {sum(reads.values())} storage reads for {len(results)} requests, "
+                  f"p50 {latencies[len(latencies) // 2]:.1f} ms, p99 {p99:.1f} ms, max {latencies[-1]:.1f} ms, "
+                  f"status {dict(statuses)}")
+    finally:
+        storage.delete_record_for_day(BENCH_DAY)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thundering herd of polls of one day with and without single-flight")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--waves", type=int, default=20)
+    parser.add_argument("--rtt", type=float, default=0.0, help="seconds added to every read, e.g. 0.02 for a "
+                                                               "local storage standing in for Atlas")
+    arguments = parser.parse_args()
+
+    from decouple import config
+    asyncio.run(bench_single_flight(arguments.clients, arguments.waves, arguments.rtt, config("API_KEY_NAME")))
@@ -0,0 +1,92 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from project import VERSION
+
+# days written by the benchmark, far from the days in use and removed afterwards
+BENCH_DAYS = [f"{day:02d}/01/1999" for day in range(1, 29)]
+
+
+def make_records(day, size) -> list:
+    return [{"id": i, "task": f"bench task {i}", "start": f"{i % 24:02d}:00:00", "end": f"{i % 24:02d}:30:00",
+             "delta": 0.5, "platform": "bench", "notes": day} for i in range(size)]
+
+
+def percentiles(latencies) -> str:
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    return f"p50 {p50:.0f} us, p99 {p99:.0f} us"
+
+
+def bench_routes(repeat=500, size=10):
+    """
+    Time the routes of the server on the storage selected by `STORAGE_BACKEND`, in process without the network
+
+    :param repeat: number of requests per route
+    :param size: number of records of the days
+    :return: None
+    """
+    from fastapi.testclient import TestClient
+    from src.server import api, storage
+
+    key = storage.get_cached_key()
+    if key is None:
+        print(f"{type(storage).__name__}: no API key, copy it with scripts.copy_storage first")
+        return
+    headers = {"access_token": key}
+    client = TestClient(api)
+
+    def path(endpoint):
+        return f"/api/{VERSION}/{endpoint}"
+
+    for day in BENCH_DAYS:
+        client.delete(path(f"day/{day.replace('/', '_')}"), headers=headers)
+        client.post(path("day"), json={"id": day, "records": make_records(day, size)}, headers=headers)
+
+    routes = {
+        "GET day": lambda i: client.get(path(f"day/{BENCH_DAYS[i % 28].replace('/', '_')}"), headers=headers),
+        "GET latest": lambda i: client.get(path(f"day/{BENCH_DAYS[i % 28].replace('/', '_')}/latest"), headers=headers),
+        "GET feed": lambda i: client.get(path("feed?limit=20"), headers=headers),
+        "GET suggest": lambda i: client.get(path("suggest?prefix=bench&field=task"), headers=headers),
+        "PUT day": lambda i: client.put(path(f"day/{BENCH_DAYS[i % 28].replace('/', '_')}"),
+                                        json={"id": BENCH_DAYS[i % 28], "records": make_records(BENCH_DAYS[i % 28], size)},
+                                        headers=headers),
+    }
+    for name, request in routes.items():
+        latencies = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            response = request(i)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+        print(f"{type(storage).__name__} {name}: {percentiles(latencies)}")
+
+    # the same reads without the HTTP layer, what the storage itself costs
+    calls = {
+        "get_record_for_day": lambda i: storage.get_record_for_day(BENCH_DAYS[i % 28]),
+        "get_most_recent_record": lambda i: storage.get_most_recent_record(BENCH_DAYS[i % 28]),
+        "get_recent_tasks": lambda i: storage.get_recent_tasks(20),
+    }
+    for name, call in calls.items():
+        latencies = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - start)
+        print(f"{type(storage).__name__} {name}: {percentiles(latencies)}")
+
+    for day in BENCH_DAYS:
+        client.delete(path(f"day/{day.replace('/', '_')}"), headers=headers)
+
+
+if __name__ == "__main__":
+    # usage: python -m scripts.bench_storage [mongo] [sqlite], every backend is measured in its own process
+    if len(sys.argv) == 3 and sys.argv[1] == "--run":
+        bench_routes()
+    else:
+        for backend in sys.argv[1:] or ["mongo", "sqlite"]:
+            subprocess.run([sys.executable, "-m", "scripts.bench_storage", "--run", backend],
+                           env=dict(os.environ, STORAGE_BACKEND=backend))
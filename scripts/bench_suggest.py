@@ -0,0 +1,47 @@
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from helpers.prefix_index import PrefixIndex
+
+
+def random_word(length):
+    return "".join(random.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def bench_suggest(distinct=10000, uses=200000, queries=10000):
+    """
+    Build the prefix index from synthetic tasks and time the suggestions
+
+    :param distinct: number of distinct task names
+    :param uses: number of tasks using those names
+    :param queries: number of suggestion queries
+    :return: None
+    """
+    random.seed(1)
+    names = [f"{random_word(random.randint(3, 8))} {random_word(random.randint(3, 10))}" for _ in range(distinct)]
+    now = datetime.now()
+    index = PrefixIndex()
+
+    start = time.perf_counter()
+    for _ in range(uses):
+        index.add(random.choice(names), now - timedelta(days=random.randint(0, 365)))
+    build = time.perf_counter() - start
+
+    prefixes = [random.choice(names)[:random.randint(1, 4)] for _ in range(queries)]
+    timings = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        index.suggest(prefix, 10)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    print(f"entries: {len(index.entries)}, memory: {index.memory_usage() / 1024:.0f} KiB, build: {build:.2f} s")
+    for percentile in (50, 90, 99):
+        value = timings[int(len(timings) * percentile / 100) - 1]
+        print(f"p{percentile}: {value * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    # invoke the benchmark
+    bench_suggest()
@@ -0,0 +1,118 @@
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+import bson
+from helpers.date_helper import DateHelper, DAY_FORMAT
+from helpers.record_codec import RecordCodec
+
+DAYS = 730
+TASKS_PER_DAY = 20
+PLATFORMS = ("web", "ios", "android", "desktop")
+
+
+def make_days():
+    """
+    Two years of synthetic days in API form
+
+    :return: list of (day, records)
+    """
+    random.seed(1)
+    first = datetime(2020, 1, 1)
+    days = []
+    for offset in range(DAYS):
+        day = (first + timedelta(days=offset)).strftime(DAY_FORMAT)
+        records = []
+        for i in range(TASKS_PER_DAY):
+            start = timedelta(minutes=random.randint(0, 1380))
+            end = start + timedelta(minutes=random.randint(1, 59))
+            records.append({"id": i, "task": f"task {i}", "start": str(start).zfill(8), "end": str(end).zfill(8),
+                            "delta": (end - start).total_seconds() / 3600, "platform": random.choice(PLATFORMS),
+                            "notes": ""})
+        days.append((day, records))
+    return days
+
+
+def hours_by_platform_strings(days, start, end):
+    """
+    Aggregation over string times, every time has to be parsed in python
+    """
+    totals = {}
+    for day, records in days:
+        for record in records:
+            at = DateHelper.task_datetime(day, record["start"])
+            if start <= at < end:
+                totals[record["platform"]] = totals.get(record["platform"], 0) + record["delta"]
+    return totals
+
+
+def hours_by_platform_typed(days, start, end):
+    """
+    Aggregation over stored datetimes, a comparison per task and no parsing
+    """
+    totals = {}
+    for _, records in days:
+        for record in records:
+            if start <= record["start"] < end:
+                totals[record["platform"]] = totals.get(record["platform"], 0) + record["delta"]
+    return totals
+
+
+def bench_mongo(string_days, typed_days, start, end):
+    """
+    Aggregation in mongo, only the typed form can be matched on the server
+    """
+    from db.MongoDB import MongoConnection, db_name
+    client = MongoConnection.get_database()
+    if client is None:
+        print("Mongo is not connected")
+        return
+    database = client[db_name]
+    string_coll, typed_coll = database["bench_time_string"], database["bench_time_typed"]
+    string_coll.insert_many([{"_id": day, "records": records} for day, records in string_days])
+    typed_coll.insert_many([{"_id": day, "records": records} for day, records in typed_days])
+    typed_coll.create_index("records.start")
+
+    began = time.perf_counter()
+    fetched = [(item["_id"], item["records"]) for item in string_coll.find()]
+    hours_by_platform_strings(fetched, start, end)
+    print(f"mongo fetch and parse in python: {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    began = time.perf_counter()
+    list(typed_coll.aggregate([
+        {"$match": {"records.start": {"$gte": start, "$lt": end}}},
+        {"$unwind": "$records"},
+        {"$match": {"records.start": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": "$records.platform", "hours": {"$sum": "$records.delta"}}},
+    ]))
+    print(f"mongo aggregation on datetime: {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    database.drop_collection("bench_time_string")
+    database.drop_collection("bench_time_typed")
+
+
+def run_bench(with_mongo=False):
+    string_days = make_days()
+    codec = RecordCodec(True)
+    typed_days = [(day, codec.encode_records(day, records)) for day, records in string_days]
+
+    string_size = sum(len(bson.encode({"_id": day, "records": records})) for day, records in string_days)
+    typed_size = sum(len(bson.encode({"_id": day, "records": records})) for day, records in typed_days)
+    print(f"documents: string {string_size / 1024:.0f} KiB, datetime {typed_size / 1024:.0f} KiB "
+          f"({(1 - typed_size / string_size) * 100:.1f}% smaller)")
+
+    # one quarter out of the two years
+    start, end = datetime(2021, 1, 1), datetime(2021, 4, 1)
+    for name, function, days in (("string", hours_by_platform_strings, string_days),
+                                 ("datetime", hours_by_platform_typed, typed_days)):
+        began = time.perf_counter()
+        function(days, start, end)
+        print(f"python aggregation {name}: {(time.perf_counter() - began) * 1000:.0f} ms")
+
+    if with_mongo:
+        bench_mongo(string_days, typed_days, start, end)
+
+
+if __name__ == "__main__":
+    # pass --mongo to also run the aggregation against the configured database
+    run_bench("--mongo" in sys.argv)
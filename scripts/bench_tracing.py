@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import io
+import time
+from helpers.tracing import Tracer, TracingMiddleware, ConsoleExporter, span
+
+# spans of a write request: api key, token, body, storage call
+SPANS_PER_REQUEST = 4
+
+
+async def plain(scope, receive, send):
+    """
+    Route doing nothing
+    """
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def app(scope, receive, send):
+    """
+    Route doing nothing but its spans
+    """
+    for _ in range(SPANS_PER_REQUEST):
+        with span("stage"):
+            pass
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def requests(asgi, count) -> float:
+    """
+    Send the requests straight to the ASGI app
+
+    :return: seconds per request
+    """
+    scope = {"type": "http", "method": "GET", "path": "/api/v0.7/day/01_01_2020", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await asgi(scope, receive, send)
+    return (time.perf_counter() - start) / count
+
+
+def bench_tracing(count):
+    """
+    Time the requests without tracing, with the spans but no middleware, with tracing off and with every request traced
+
+    :param count: number of requests per run
+    :return: None
+    """
+    stream = io.StringIO()
+    runs = [
+        ("no tracing", plain),
+        ("spans only", app),
+        ("sample 0", TracingMiddleware(app, Tracer(0.0, ConsoleExporter(stream)))),
+        ("sample 0.01", TracingMiddleware(app, Tracer(0.01, ConsoleExporter(stream)))),
+        ("sample 1", TracingMiddleware(app, Tracer(1.0, ConsoleExporter(stream)))),
+    ]
+    baseline = None
+    for name, asgi in runs:
+        # the first run warms up, the best of three is kept
+        asyncio.run(requests(asgi, count // 10))
+        elapsed = min(asyncio.run(requests(asgi, count)) for _ in range(3))
+        baseline = elapsed if baseline is None else baseline
+        print(f"{name:<14} {elapsed * 1e6:7.2f} us/request, overhead {(elapsed - baseline) * 1e6:6.2f} us")
+        stream.seek(0)
+        stream.truncate(0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead of the tracing per request with sampling off and on")
+    parser.add_argument("--count", type=int, default=50000)
+    arguments = parser.parse_args()
+    bench_tracing(arguments.count)
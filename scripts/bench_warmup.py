@@ -0,0 +1,95 @@
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from project import VERSION
+from scripts.bench_workers import wait_ready
+
+
+def wait_routable(port, timeout=60) -> bool:
+    """
+    Wait until the readiness probe answers 200, when a load balancer starts to send traffic to the worker
+
+    :return: True if the worker became ready before the timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        connection.request("GET", "/api/health/ready")
+        response = connection.getresponse()
+        response.read()
+        if response.status == 200:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def first_minute(port, paths, headers, duration) -> list:
+    """
+    Send requests for the paths in turn from the moment the server is alive
+
+    :return: list of latencies in seconds in the order of the requests
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        connection.request("GET", paths[len(latencies) % len(paths)], headers=headers)
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_warmup(warmup, port, paths, headers, duration, app):
+    """
+    Start a single worker with or without warm-up and measure the latency of the first requests
+
+    :return: None
+    """
+    env = dict(os.environ, WEB_CONCURRENCY="1", PORT=str(port), WARMUP=str(warmup))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", app], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port, "/api/health/live"):
+            print(f"warm-up {warmup}: server did not start")
+            return
+        started = time.monotonic()
+        if not wait_routable(port):
+            print(f"warm-up {warmup}: server did not become ready")
+            return
+        ready = (time.monotonic() - started) * 1000
+        latencies = first_minute(port, paths, headers, duration)
+        first = latencies[0] * 1000
+        latencies = sorted(latencies)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"warm-up {warmup}: ready after {ready:.0f} ms, {len(latencies)} requests, first {first:.1f} ms, "
+              f"p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {latencies[-1] * 1000:.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    today = datetime.utcnow()
+    parser = argparse.ArgumentParser(description="Latency of the first minute after the start with and without warm-up")
+    parser.add_argument("--day", action="append", help="day requested in format of dd_mm_yyyy, today and yesterday "
+                                                       "by default")
+    parser.add_argument("--key", required=True, help="API key sent in the header")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app", default="main:api")
+    arguments = parser.parse_args()
+
+    from decouple import config
+    days = arguments.day or [(today - timedelta(days=offset)).strftime("%d_%m_%Y") for offset in (0, 1)]
+    day_paths = [f"/api/{VERSION}/day/{day}" for day in days]
+    for enabled in (False, True):
+        bench_warmup(enabled, arguments.port, day_paths, {config("API_KEY_NAME"): arguments.key},
+                     arguments.duration, arguments.app)
@@ -0,0 +1,90 @@
+import argparse
+import http.client
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from project import VERSION
+
+
+def wait_ready(port, path, timeout=60):
+    """
+    Wait until the server answers
+
+    :return: True if the server answered before the timeout
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", path)
+            connection.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def client(args):
+    """
+    Send requests on a keep-alive connection until the end of the run
+
+    :return: list of latencies in seconds
+    """
+    port, path, headers, end = args
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    latencies = []
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        connection.request("GET", path, headers=headers)
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_workers(workers, port, path, headers, clients, duration, app):
+    """
+    Start gunicorn with the number of workers and measure the throughput of the path
+
+    :return: None
+    """
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), PORT=str(port))
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", app], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_ready(port, path):
+            print(f"{workers} workers: server did not start")
+            return
+        # warm up every worker before measuring
+        end = time.monotonic() + 2
+        with multiprocessing.Pool(clients) as pool:
+            pool.map(client, [(port, path, headers, end)] * clients)
+            end = time.monotonic() + duration
+            results = pool.map(client, [(port, path, headers, end)] * clients)
+        latencies = sorted(latency for result in results for latency in result)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"{workers} workers: {len(latencies) / duration:.0f} req/s, p50 {p50:.1f} ms, p99 {p99:.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the API with 1/2/4/8 gunicorn workers")
+    parser.add_argument("--path", default=f"/api/{VERSION}/connection")
+    parser.add_argument("--key", default=None, help="API key sent in the header for the protected routes")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app", default="main:api")
+    arguments = parser.parse_args()
+
+    key_headers = {}
+    if arguments.key is not None:
+        from decouple import config
+        key_headers[config("API_KEY_NAME")] = arguments.key
+    for count in (1, 2, 4, 8):
+        bench_workers(count, arguments.port, arguments.path, key_headers, arguments.clients, arguments.duration,
+                      arguments.app)
@@ -0,0 +1,30 @@
+from decouple import config
+from db.MongoDB import MongoAPI
+from db.SQLite import SQLiteAPI
+
+
+def copy_storage():
+    """
+    Copy the API key and every day from mongo to the embedded database of `SQLITE_PATH`, days already in the embedded
+    database are overwritten
+
+    :return: None
+    """
+    source = MongoAPI()
+    key = source.get_key()
+    records = source.get_all_records()
+    if key is None or records is None:
+        print("Mongo is not connected or the key is not found, nothing is copied")
+        return
+
+    target = SQLiteAPI()
+    target.set_key(config("AUTH_USER"), key)
+    for count, record_day in enumerate(records, start=1):
+        with target.transaction() as connection:
+            target.save_day(connection, record_day["_id"], record_day["records"])
+        print(f"{count}/{len(records)} {record_day['_id']}: {len(record_day['records'])} tasks")
+
+
+if __name__ == "__main__":
+    # set `STORAGE_BACKEND=sqlite` once the copy is done
+    copy_storage()
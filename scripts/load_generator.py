@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import random
+import time
+from httpx import AsyncClient, ASGITransport
+from project import VERSION
+
+# share of every operation in the mix, overridden as `read=60,latest=25,put=10,delete_task=5`
+DEFAULT_MIX = {"read": 60, "latest": 25, "put": 10, "delete_task": 5}
+
+
+def make_records(size) -> list:
+    return [{"id": i, "task": f"task {i}", "start": f"{8 + i % 12:02d}:00:00", "end": f"{8 + i % 12:02d}:30:00",
+             "delta": 0.5, "platform": "web", "notes": "load"} for i in range(size)]
+
+
+def parse_mix(value) -> dict:
+    """
+    Parse the mix of the operations
+
+    :param value: e.g. `read=60,latest=25,put=10,delete_task=5`
+    :return: dict of operation -> weight
+    """
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"unknown operation {name}, one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class LoadGenerator:
+    """
+    Open-loop load of many clients: the requests start at Poisson arrivals of the rate, whether the earlier requests
+    are answered or not, so a slow server builds a queue the way it would in production
+    """
+
+    def __init__(self, client: AsyncClient, headers: dict, days: int, records: int, mix: dict, max_in_flight: int):
+        """
+        :param client: client of the in-process app or of the server
+        :param headers: headers of every request, the API key
+        :param days: number of days the load is spread over
+        :param records: number of records of every day
+        :param mix: dict of operation -> weight
+        :param max_in_flight: requests in flight before the arrivals are dropped, the client side limit of sockets
+        """
+        self.client = client
+        self.headers = headers
+        self.days = [f"{day % 28 + 1:02d}/{day // 28 % 12 + 1:02d}/{2000 + day // 336}" for day in range(days)]
+        self.records = make_records(records)
+        self.operations = list(mix)
+        self.weights = [mix[operation] for operation in self.operations]
+        self.max_in_flight = max_in_flight
+        # ids of the tasks not deleted yet per day, a put brings all of them back
+        self.live = {day: set(range(records)) for day in self.days}
+        self.in_flight = 0
+        self.dropped = 0
+        # route -> list of (status, seconds) measured
+        self.results = {}
+
+    def path(self, day, suffix="") -> str:
+        return f"/api/{VERSION}/day/{day.replace('/', '_')}{suffix}"
+
+    async def setup(self):
+        """
+        Create the days of the load, replacing their records if they exist
+
+        :return: None
+        """
+        for day in self.days:
+            response = await self.client.post(f"/api/{VERSION}/day", json={"id": day, "records": self.records},
+                                              headers=self.headers)
+            if response.status_code >= 400:
+                await self.client.put(self.path(day), json={"id": day, "records": self.records},
+                                      headers=self.headers)
+
+    async def send(self, operation, measured):
+        """
+        Send one request of the operation for a random day, counted in flight by the caller until it is answered
+
+        :param operation: name of the operation
+        :param measured: False while warming up
+        :return: None
+        """
+        day = random.choice(self.days)
+        if operation == "delete_task" and not self.live[day]:
+            # every task of the day is deleted, bring them back instead
+            operation = "put"
+
+        if operation == "read":
+            request = self.client.get(self.path(day), headers=self.headers)
+        elif operation == "latest":
+            request = self.client.get(self.path(day, "/latest"), headers=self.headers)
+        elif operation == "put":
+            self.live[day] = set(range(len(self.records)))
+            request = self.client.put(self.path(day), json={"id": day, "records": self.records}, headers=self.headers)
+        else:
+            task = random.choice(list(self.live[day]))
+            self.live[day].discard(task)
+            request = self.client.delete(self.path(day, f"/task/{task}"), headers=self.headers)
+
+        start = time.perf_counter()
+        try:
+            status = (await request).status_code
+        except Exception:
+            status = 0
+        finally:
+            self.in_flight -= 1
+        if measured:
+            self.results.setdefault(operation, []).append((status, time.perf_counter() - start))
+
+    async def run(self, rate, warmup, duration):
+        """
+        Send the requests at the rate, the first seconds are not measured
+
+        :param rate: mean arrivals per second
+        :param warmup: seconds before measuring
+        :param duration: seconds measured
+        :return: None
+        """
+        tasks = set()
+        start = time.monotonic()
+        measure_from = start + warmup
+        end = measure_from + duration
+        arrival = start
+        while arrival < end:
+            arrival += random.expovariate(rate)
+            delay = arrival - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            measured = arrival >= measure_from
+            if self.in_flight >= self.max_in_flight:
+                self.dropped += measured
+                continue
+            operation = random.choices(self.operations, self.weights)[0]
+            # counted before the task runs, the arrivals of a burst all see the requests sent before them
+            self.in_flight += 1
+            task = asyncio.ensure_future(self.send(operation, measured))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def report(self, duration):
+        """
+        Print the throughput, latency percentiles and error rate per route
+
+        :param duration: seconds measured
+        :return: None
+        """
+        print(f"{'route':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+        everything = []
+        for operation in self.operations:
+            results = self.results.get(operation, [])
+            everything += results
+            self.print_row(operation, results, duration)
+        self.print_row("total", everything, duration)
+        if self.dropped:
+            print(f"{self.dropped} arrivals dropped with {self.max_in_flight} requests in flight")
+
+    @staticmethod
+    def print_row(name, results, duration):
+        if not results:
+            print(f"{name:<12} {0:>8}")
+            return
+        latencies = sorted(elapsed * 1000 for _, elapsed in results)
+        errors = sum(1 for status, _ in results if not 200 <= status < 300)
+
+        def at(share):
+            return latencies[min(int(len(latencies) * share), len(latencies) - 1)]
+
+        print(f"{name:<12} {len(results) / duration:>8.1f} {at(0.5):>8.2f} {at(0.95):>8.2f} {at(0.99):>8.2f} "
+              f"{latencies[-1]:>8.2f} {errors / len(results):>7.1%}")
+
+
+async def main(arguments):
+    from decouple import config
+    headers = {config("API_KEY_NAME"): arguments.key}
+    if arguments.url is None:
+        # the app in this process, with its startup and shutdown
+        from src.server import api
+        client = AsyncClient(transport=ASGITransport(app=api), base_url="http://localhost")
+        await api.router.startup()
+    else:
+        api = None
+        client = AsyncClient(base_url=arguments.url, timeout=60)
+    try:
+        generator = LoadGenerator(client, headers, arguments.days, arguments.records, parse_mix(arguments.mix),
+                                  arguments.max_in_flight)
+        await generator.setup()
+        await generator.run(arguments.rate, arguments.warmup, arguments.duration)
+        generator.report(arguments.duration)
+    finally:
+        await client.aclose()
+        if api is not None:
+            await api.router.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop mixed load of reads, latest polls, puts and task deletes")
+    parser.add_argument("--key", required=True, help="API key sent in the header")
+    parser.add_argument("--url", default=None, help="e.g. http://127.0.0.1:8000, the app in this process by default")
+    parser.add_argument("--rate", type=float, default=200, help="mean arrivals per second")
+    parser.add_argument("--mix", default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()))
+    parser.add_argument("--days", type=int, default=50)
+    parser.add_argument("--records", type=int, default=10)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
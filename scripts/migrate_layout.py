@@ -0,0 +1,59 @@
+import sys
+from db.MongoDB import MongoAPI, MongoConnection
+
+LAYOUTS = ("day", "task", "series")
+
+
+def stored_layout(stored) -> str:
+    """
+    Layout the day is stored in, the day layout keeps records in the day document and the series layout marks it
+
+    :param stored: day document without records
+    :return: `day`, `task` or `series`
+    """
+    if "records" in stored:
+        return "day"
+    return "series" if stored.get("series") else "task"
+
+
+def migrate_layout(source_name, target_name):
+    """
+    Migrate every day from the source storage layout to the target layout, day by day
+
+    Set `TASK_LAYOUT` to the target layout once the migration is done.
+
+    :param source_name: `day`, `task` or `series`
+    :param target_name: `day`, `task` or `series`
+    :return: None
+    """
+    client = MongoConnection.get_database()
+    if client is None:
+        print("Mongo is not connected, nothing is migrated")
+        return
+
+    source = MongoAPI.get_layout(client, source_name)
+    target = MongoAPI.get_layout(client, target_name)
+    target.ensure_indexes()
+
+    tasks = MongoConnection.get_tasks_collection(client)
+    days = source.day_ids()
+    for count, day in enumerate(days, start=1):
+        # skip the days migrated by a previous run
+        stored = tasks.find_one({"_id": day}, {"records": {"$slice": 0}, "series": 1})
+        if stored_layout(stored) == target_name:
+            print(f"{count}/{len(days)} {day}: already migrated")
+            continue
+
+        record_day = source.find_day(day)
+        # write the target first then remove what only the source uses, a day is never lost half way
+        target.save_day(day, record_day["records"])
+        source.cleanup(day)
+        print(f"{count}/{len(days)} {day}: {len(record_day['records'])} tasks")
+
+
+if __name__ == "__main__":
+    # usage: python -m scripts.migrate_layout <day|task|series> <day|task|series>
+    if len(sys.argv) != 3 or sys.argv[1] == sys.argv[2] or not set(sys.argv[1:]) <= set(LAYOUTS):
+        print("usage: python -m scripts.migrate_layout <day|task|series> <day|task|series>")
+    else:
+        migrate_layout(sys.argv[1], sys.argv[2])
@@ -0,0 +1,15 @@
+from db.MongoDB import MongoAPI
+
+
+def rebuild_feed():
+    mongo = MongoAPI()
+    count = mongo.rebuild_feed()
+    if count is None:
+        print("Mongo is not connected, feed is not rebuild")
+    else:
+        print(f"Feed rebuild with {count} tasks")
+
+
+if __name__ == "__main__":
+    # invoke rebuild of the feed
+    rebuild_feed()
@@ -0,0 +1,135 @@
+import argparse
+import http.client
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# the days and tasks in the paths, the requests of a route are compared together
+ID_PATTERN = re.compile(r"/(\d{2}_\d{2}_\d{4}|\d+)(?=/|$)")
+
+
+def load_traffic(path) -> list:
+    """
+    Read the recorded requests in the order they started
+
+    :param path: JSON lines file written by the recorder of the server
+    :return: list of the recorded requests
+    """
+    with open(path, encoding="utf-8") as file:
+        entries = [json.loads(line) for line in file if line.strip()]
+    return sorted(entries, key=lambda entry: entry["at"])
+
+
+def route_of(entry) -> str:
+    """
+    Route of the recorded request, the method and the path without ids and query
+
+    :param entry: recorded request
+    :return: e.g. `GET /api/v0.7/day/{id}`
+    """
+    path = ID_PATTERN.sub("/{id}", entry["path"].partition("?")[0])
+    return f"{entry['method']} {path}"
+
+
+def percentile(values, share) -> float:
+    """
+    :param values: sorted values
+    :param share: from 0 to 1
+    :return: the value at the share or 0 if there are no values
+    """
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0.0
+
+
+def replay(entries, host, port, headers, speed, concurrency) -> list:
+    """
+    Send the recorded requests to the server, keeping the recorded gaps between them divided by the speed
+
+    :param entries: recorded requests in the order they started
+    :param host: host of the server
+    :param port: port of the server
+    :param headers: headers of every request, the API key
+    :param speed: 1 for the recorded pace, 2 for twice as fast, 0 to send every request as soon as possible
+    :param concurrency: maximum number of requests in flight
+    :return: list of (entry, status, milliseconds) in the order of the entries
+    """
+    local = threading.local()
+    results = [None] * len(entries)
+
+    def send(index, entry):
+        if getattr(local, "connection", None) is None:
+            local.connection = http.client.HTTPConnection(host, port, timeout=60)
+        body = json.dumps(entry["body"]) if entry["body"] is not None else None
+        request_headers = dict(headers, **({"Content-Type": "application/json"} if body is not None else {}))
+        start = time.perf_counter()
+        try:
+            local.connection.request(entry["method"], entry["path"], body=body, headers=request_headers)
+            response = local.connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            # reconnect for the next request, the request counts as failed
+            local.connection.close()
+            local.connection = None
+            status = 0
+        results[index] = (entry, status, (time.perf_counter() - start) * 1000)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        first = entries[0]["at"] if entries else 0.0
+        started = time.monotonic()
+        for index, entry in enumerate(entries):
+            if speed > 0:
+                delay = (entry["at"] - first) / speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(send, index, entry)
+    return results
+
+
+def report(results):
+    """
+    Print the recorded and replayed latencies per route and the requests answered with a different status
+
+    :param results: list of (entry, status, milliseconds)
+    :return: None
+    """
+    routes = {}
+    for entry, status, elapsed in results:
+        route = routes.setdefault(route_of(entry), ([], [], []))
+        route[0].append(entry["duration_ms"])
+        route[1].append(elapsed)
+        if status != entry["status"]:
+            route[2].append((entry["status"], status))
+
+    print(f"{'route':<48} {'count':>6} {'p50 rec':>9} {'p50 now':>9} {'p99 rec':>9} {'p99 now':>9} {'status':>7}")
+    for route, (recorded, replayed, changed) in sorted(routes.items()):
+        recorded, replayed = sorted(recorded), sorted(replayed)
+        print(f"{route:<48} {len(recorded):>6} {percentile(recorded, 0.5):>9.2f} {percentile(replayed, 0.5):>9.2f} "
+              f"{percentile(recorded, 0.99):>9.2f} {percentile(replayed, 0.99):>9.2f} {len(changed):>7}")
+
+    changed = [(route_of(entry), entry["status"], status) for entry, status, _ in results if status != entry["status"]]
+    if changed:
+        print(f"{len(changed)} requests answered with another status than recorded, e.g.:")
+        for route, recorded, status in changed[:10]:
+            print(f"  {route}: recorded {recorded}, now {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the recorded traffic (RECORD_SAMPLE) against a local server")
+    parser.add_argument("--log", default="traffic.jsonl", help="recorded requests, RECORD_PATH of the server")
+    parser.add_argument("--key", required=True, help="API key sent in the header")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 for the recorded pace, 0 as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=16)
+    arguments = parser.parse_args()
+
+    from decouple import config
+    traffic = load_traffic(arguments.log)
+    print(f"replaying {len(traffic)} requests at speed {arguments.speed}")
+    start = time.monotonic()
+    replayed = replay(traffic, arguments.host, arguments.port, {config("API_KEY_NAME"): arguments.key},
+                      arguments.speed, arguments.concurrency)
+    print(f"done in {time.monotonic() - start:.1f} s")
+    report(replayed)
@@ -0,0 +1,26 @@
+import sys
+from db.MongoDB import MongoAPI
+
+
+def restore_archive(months):
+    """
+    Move the days of the archived months back to the tasks collection
+
+    :param months: list of months in format of `yyyy-mm`, all archived months when empty
+    :return: None
+    """
+    mongo = MongoAPI()
+    mongo.ensure_connected()
+    if not mongo.check_tasks_exist():
+        print("Mongo is not connected, nothing is restored")
+        return
+
+    if len(months) == 0:
+        months = [stored["_id"] for stored in mongo.archive.find({}, {"_id": 1})]
+    for month in months:
+        print(f"{month}: {mongo.restore_month(month)} days restored")
+
+
+if __name__ == "__main__":
+    # usage: python -m scripts.restore_archive [yyyy-mm ...]
+    restore_archive(sys.argv[1:])
@@ -5,4 +5,10 @@ MONGO_CONNECTION = "Mongo connection cannot be established"
 MONGO_DB_TASKS = "Cannot connect to the collection - task"
 MONGO_DB_KEYS = "Cannot connect to the collection - keys"
 NOT_FOUND = "Record not found"
-
+OVERLOADED = "Server is overloaded, retry later"
+MONGO_UNAVAILABLE = "Mongo is unavailable, retry later"
+STORAGE_UNAVAILABLE = "Storage is unavailable, retry later"
+IDEMPOTENCY_KEY = "Idempotency-Key must be 1 to 255 characters"
+IDEMPOTENCY_KEY_REUSED = "Idempotency-Key was used for another request"
+IDEMPOTENCY_KEY_PENDING = "Idempotency-Key is used by a write still running, retry later"
+BATCH_DAYS = "date_ids must list 1 to {} days"
@@ -10,9 +10,12 @@ FAILED_CREATE_UPDATE = {"message": "failed creating / updating"}
 FAILED_DELETED_DAY = {"message": "failed to delete day"}
 FAILED_DELETED_TASK = {"message": "failed to delete task"}
 FAILED_DELETED_TASK_NON = {"message": "task not found"}
+FAILED_CURSOR = {"message": "invalid cursor"}
+FAILED_SUGGEST_FIELD = {"message": "field cannot be suggested"}
 
 # server unavailable
 SERVER_UNAVAILABLE = {"message": "server unavailable"}
+JOURNALED = {"message": "accepted, pending write"}
 
 # success message
 SUCCESS_CREATE_UPDATE = {"message": "success"}
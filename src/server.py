@@ -1,29 +1,346 @@
-from fastapi import Security, Depends, FastAPI, HTTPException, Response
+import asyncio
+import email.message
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from fastapi import Security, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import MissingError
 from fastapi.security.api_key import APIKeyCookie, APIKeyHeader, APIKey
-from db.MongoDB import MongoAPI
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from starlette.concurrency import run_in_threadpool
+from db.Storage import StorageAPI, storage_backend
 from helpers.string_formatter import StringFormatter
-from interface.body import BodyObject
+from helpers.admission import Limiter, Overloaded
+from helpers.deadline import Deadline
+from helpers.circuit_breaker import CircuitOpen
+from helpers.response_cache import ResponseCache, CachedResponse
+from helpers.traffic_recorder import TrafficRecorder, RecordMiddleware
+from helpers.structured_log import setup_logging, parse_rates, RequestIdMiddleware
+from helpers.tracing import Tracer, TracingMiddleware, ConsoleExporter, FileExporter, span
+from helpers.loop_monitor import LoopMonitor, LoopRouteMiddleware
+from helpers.single_flight import SingleFlight
+from interface.body import BodyObject, RawBody
 from interface.access_key import AccessKey
 from helpers.crypt import CryptoHelper, SECRET  # import crypt to verify signature
 import src.http_response as http_res  # response
 import src.error as error  # errors
-from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
-from decouple import config  # get the decouple for .env
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND, HTTP_409_CONFLICT, HTTP_503_SERVICE_UNAVAILABLE
+from decouple import config, Csv  # get the decouple for .env
 from project import VERSION  # import project detail
 from icecream import ic
+from typing import List, Optional
+
+
+def get_storage() -> StorageAPI:
+    """
+    Create the storage selected by `STORAGE_BACKEND`, only the selected backend is imported with its configuration
+
+    :return: the storage
+    """
+    if storage_backend == "sqlite":
+        from db.SQLite import SQLiteAPI
+        return SQLiteAPI()
+    else:
+        from db.MongoDB import MongoAPI
+        return MongoAPI()
+
 
 api = FastAPI()
-mongo = MongoAPI()
+storage = get_storage()
 
 # START OF THE SERVER DEFINITION
 
-API_KEY = mongo.get_key() if not None else ""
 API_KEY_NAME = config("API_KEY_NAME")
+FEED_MAX_LIMIT = config("FEED_MAX_LIMIT", default=200, cast=int)
+SEARCH_MAX_LIMIT = config("SEARCH_MAX_LIMIT", default=100, cast=int)
+SUGGEST_MAX_LIMIT = config("SUGGEST_MAX_LIMIT", default=20, cast=int)
+# days fetched at once by a batch read, a month view needs 31 and a 6 week calendar 42
+BATCH_MAX_DAYS = config("BATCH_MAX_DAYS", default=62, cast=int)
+
+# admission control of the storage calls: concurrent calls and waiting calls per route group,
+# overridden per group as `group=concurrency:queue`, e.g. `search=2:8,write=4:16`
+ADMISSION_CONCURRENCY = config("ADMISSION_CONCURRENCY", default=8, cast=int)
+ADMISSION_QUEUE = config("ADMISSION_QUEUE", default=32, cast=int)
+ADMISSION_ROUTES = config("ADMISSION_ROUTES", default="", cast=Csv())
+REQUEST_DEADLINE = config("REQUEST_DEADLINE", default=10.0, cast=float)
+RETRY_AFTER = config("RETRY_AFTER", default=1, cast=int)
+# seconds between the background pings of the storage, which also probe an open breaker
+HEALTH_INTERVAL = config("HEALTH_INTERVAL", default=5.0, cast=float)
+# encoded responses of the day listings cached per worker, no cache when the size is 0,
+# bodies from the gzip minimum on are also cached compressed, never when it is 0. A write invalidates the cache of
+# its worker at once and of the other workers once they sync the changes, up to `SYNC_INTERVAL` later
+RESPONSE_CACHE_SIZE = config("RESPONSE_CACHE_SIZE", default=256, cast=int)
+RESPONSE_CACHE_BYTES = config("RESPONSE_CACHE_BYTES", default=64 * 1024 * 1024, cast=int)
+RESPONSE_CACHE_GZIP_MIN = config("RESPONSE_CACHE_GZIP_MIN", default=1024, cast=int)
+# warm-up after the start of the worker: connection, API key, in-process indexes and the responses of the most
+# recent days, reported by the readiness probe as `warmed` without holding the worker back
+WARMUP = config("WARMUP", default=True, cast=bool)
+WARMUP_DAYS = config("WARMUP_DAYS", default=2, cast=int)
+# header of the key the clients send with the writes they may retry, the response of the first write is sent again
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_KEY_MAX = 255
+# concurrent identical reads share one storage call in flight
+SINGLE_FLIGHT = config("SINGLE_FLIGHT", default=True, cast=bool)
+# header of the revision of the changes, sent with the response of a write and sent back by the client with its reads,
+# which then see the write on any worker
+REVISION_HEADER = "Revision"
+# share of the requests recorded to the JSON lines file for `scripts.replay_traffic`, nothing is recorded when it is 0,
+# the values of the redacted body fields and query parameters are replaced
+RECORD_SAMPLE = config("RECORD_SAMPLE", default=0.0, cast=float)
+RECORD_PATH = config("RECORD_PATH", default="traffic.jsonl")
+RECORD_REDACT = config("RECORD_REDACT", default="task,notes,platform,q,prefix", cast=Csv())
+# logs are written as JSON lines by a background thread, dropped when more than the queue size wait,
+# the info logs of the routes are sampled as `prefix=share`, e.g. `/api/v0.7/day=0.1`
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+LOG_SAMPLE = config("LOG_SAMPLE", default="", cast=Csv())
+# share of the requests traced, off when it is 0, the spans are written by the `console` or `file` exporter
+TRACE_SAMPLE = config("TRACE_SAMPLE", default=0.0, cast=float)
+TRACE_EXPORTER = config("TRACE_EXPORTER", default="console")
+TRACE_PATH = config("TRACE_PATH", default="traces.jsonl")
+# seconds between the measures of the event loop lag, off when it is 0, lags from the threshold on count as stalls,
+# in debug mode the stack of every call blocking the loop that long is logged with its route
+LOOP_MONITOR_INTERVAL = config("LOOP_MONITOR_INTERVAL", default=0.5, cast=float)
+LOOP_BLOCK_THRESHOLD = config("LOOP_BLOCK_THRESHOLD", default=0.1, cast=float)
+LOOP_DEBUG = config("LOOP_DEBUG", default=False, cast=bool)
 
 api_key_cookie = APIKeyCookie(name=API_KEY_NAME, auto_error=False)
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
 
+def get_limiters() -> dict:
+    """
+    Create the limiters of the route groups
+
+    :return: dict of group to limiter
+    """
+    limits = {group: (ADMISSION_CONCURRENCY, ADMISSION_QUEUE)
+              for group in ("auth", "day", "latest", "feed", "search", "suggest", "write")}
+    for route in ADMISSION_ROUTES:
+        group, limit = route.split("=")
+        concurrency, queue = limit.split(":")
+        limits[group.strip()] = (int(concurrency), int(queue))
+    return {group: Limiter(concurrency, queue) for group, (concurrency, queue) in limits.items()}
+
+
+limiters = get_limiters()
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_BYTES, RESPONSE_CACHE_GZIP_MIN)
+flights = SingleFlight()
+# the probes and the exchange of the access token for the API key are never recorded
+recorder = TrafficRecorder(RECORD_PATH, RECORD_SAMPLE, RECORD_REDACT, ("/api/health/", "/auth/"))
+if RECORD_SAMPLE > 0:
+    api.add_middleware(RecordMiddleware, recorder=recorder)
+loop_monitor = LoopMonitor(LOOP_MONITOR_INTERVAL, LOOP_BLOCK_THRESHOLD, LOOP_DEBUG)
+if LOOP_MONITOR_INTERVAL > 0 and LOOP_DEBUG:
+    api.add_middleware(LoopRouteMiddleware, monitor=loop_monitor)
+tracer = Tracer(TRACE_SAMPLE, FileExporter(TRACE_PATH) if TRACE_EXPORTER == "file" else ConsoleExporter())
+api.add_middleware(TracingMiddleware, tracer=tracer)
+log_handler = setup_logging(LOG_LEVEL, LOG_QUEUE_SIZE, parse_rates(LOG_SAMPLE))
+# outermost, every log of the request carries its id
+api.add_middleware(RequestIdMiddleware)
+
+
+async def admit(group: str, function, *args):
+    """
+    Run the storage call in the threadpool within the limits of the route group and the deadline of the request
+
+    :param group: the route group
+    :param function: the storage call
+    :param args: arguments of the call
+    :return: result of the call, raise 503 with Retry-After if the call is shed, runs out of time or the storage is failing
+    """
+    Deadline.start(REQUEST_DEADLINE)
+    try:
+        # fail fast while the breaker is open instead of waiting for the server selection of every call,
+        # except for the writes taken by the journal
+        if group != "write" or storage.journal is None:
+            storage.breaker.check()
+        with span(f"storage.{function.__name__}", group=group):
+            result = await limiters[group].run(function, *args, timeout=Deadline.remaining())
+    except Overloaded:
+        raise unavailable(error.OVERLOADED)
+    except CircuitOpen:
+        raise unavailable(error.MONGO_UNAVAILABLE)
+    except (ConnectionFailure, ExecutionTimeout) as e:
+        logging.error(e)
+        storage.breaker.failure()
+        raise unavailable(error.MONGO_UNAVAILABLE)
+    except sqlite3.OperationalError as e:
+        # the file of the embedded database is locked by another worker past the busy timeout or cannot be read
+        logging.error(e)
+        storage.breaker.failure()
+        raise unavailable(error.STORAGE_UNAVAILABLE)
+    if result is not http_res.JOURNALED:
+        storage.breaker.success()
+    return result
+
+
+async def coalesced(group: str, function, *args):
+    """
+    Run the storage read through admit, sharing the call in flight of the same read
+
+    :param group: the route group
+    :param function: the storage read
+    :param args: arguments of the read
+    :return: result of the read
+    """
+    if not SINGLE_FLIGHT:
+        return await admit(group, function, *args)
+    # a read started before a write of this worker is not shared with the requests after the write
+    return await flights.run((function.__name__, args, storage.generation), admit, group, function, *args)
+
+
+async def idempotent(request: Request, response: Response, write):
+    """
+    Run the write once per idempotency key, the retries get the stored response of the first write
+
+    :param request: the request, its method, path and body are the fingerprint of the key
+    :param response: response object to be send to client
+    :param write: coroutine function of the route writing and setting the status code of the response it is given
+    :return: body of the response
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        body = await write(response)
+    else:
+        if not 0 < len(key) <= IDEMPOTENCY_KEY_MAX:
+            raise HTTPException(status_code=400, detail=error.IDEMPOTENCY_KEY)
+
+        fingerprint = hashlib.sha256(
+            b"\n".join([request.method.encode(), request.url.path.encode(), await request.body()])
+        ).hexdigest()
+        # a retry sent while the first write is still running waits for it, a request reusing the key for another
+        # write does not join it and gets the mismatch of the key
+        status, body, replayed = await flights.run(("idempotency", key, fingerprint), write_once, key, fingerprint,
+                                                   write)
+        response.status_code = status
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+    # the reads the client sends the revision back with see the write on any worker
+    response.headers[REVISION_HEADER] = str(max(storage.written, storage.revision))
+    return body
+
+
+async def write_once(key: str, fingerprint: str, write):
+    """
+    Replay the stored response of the key or claim the key, write and store the response
+
+    :param key: the idempotency key
+    :param fingerprint: hash of the method, path and body of the request
+    :param write: coroutine function of the route writing and setting the status code of the response it is given
+    :return: status code, body of the response and True if it is replayed
+    """
+    stored = await admit("write", storage.claim_idempotent, key, fingerprint)
+    if stored is not None:
+        if stored["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=422, detail=error.IDEMPOTENCY_KEY_REUSED)
+        if stored["status"] is None:
+            # the first write of the key still runs in another worker
+            raise HTTPException(status_code=HTTP_409_CONFLICT, detail=error.IDEMPOTENCY_KEY_PENDING,
+                                headers={"Retry-After": str(RETRY_AFTER)})
+        return stored["status"], stored["body"], True
+
+    written = Response()
+    try:
+        body = await write(written)
+    except Exception:
+        await admit("write", storage.release_idempotent, key)
+        raise
+    # failures of the server are not stored, the retry writes again
+    if written.status_code < 500:
+        await admit("write", storage.save_idempotent, key, fingerprint, written.status_code, body)
+    else:
+        await admit("write", storage.release_idempotent, key)
+    return written.status_code, body, False
+
+
+def unavailable(detail: str) -> HTTPException:
+    """
+    Create the 503 error asking the client to retry later
+
+    :param detail: the error message
+    :return: HTTPException with Retry-After header
+    """
+    return HTTPException(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE, detail=detail, headers={"Retry-After": str(RETRY_AFTER)}
+    )
+
+
+def client_revision(request: Request) -> int:
+    """
+    :param request: the request
+    :return: revision of the last write of the client from the revision header, 0 without it
+    """
+    revision = request.headers.get(REVISION_HEADER, "")
+    return int(revision) if revision.isdigit() else 0
+
+
+async def sync_changes(group: str, revision: int = 0):
+    """
+    Sync the changes of the other workers when it is due or the client wrote a revision this worker has not seen
+
+    :param group: the route group
+    :param revision: revision of the last write of the client
+    :return: None
+    """
+    if storage.sync_due() or revision > storage.revision:
+        # the writes of the other workers change the generation as well
+        await coalesced(group, storage.sync_changes, revision)
+
+
+async def cached_entry(key, group: str, function, *args, revision: int = 0):
+    """
+    Data of the storage call encoded, from the response cache while the data is unchanged
+
+    :param key: path and query of the request
+    :param group: the route group
+    :param function: the storage call
+    :param args: arguments of the call
+    :param revision: revision of the last write of the client
+    :return: CachedResponse or None if the call found nothing
+    """
+    await sync_changes(group, revision)
+    cacheable = storage.cacheable()
+    generation = storage.generation
+    entry = response_cache.get(key, generation) if cacheable else None
+    if entry is None:
+        data = await coalesced(group, function, *args)
+        if data is None:
+            return None
+        # encoded the same way FastAPI encodes the returned dict
+        body = JSONResponse(jsonable_encoder(http_res.set_data(data))).body
+        if cacheable:
+            # the gzip form of a big listing is made in the threadpool, not on the event loop, a write during the call
+            # changed the generation and the entry is never served
+            entry = response_cache.store(key, await run_in_threadpool(response_cache.compress, generation, body))
+        else:
+            entry = CachedResponse(generation, body)
+    return entry
+
+
+async def cached_data(request: Request, group: str, function, *args):
+    """
+    Data of the storage call as encoded response, served from the response cache while the data is unchanged
+
+    :param request: the request, its path and query are the key of the cache
+    :param group: the route group
+    :param function: the storage call
+    :param args: arguments of the call
+    :return: Response with the encoded data or None if the call found nothing
+    """
+    entry = await cached_entry((request.url.path, request.url.query), group, function, *args,
+                               revision=client_revision(request))
+    if entry is None:
+        return None
+    return ResponseCache.respond(entry, "gzip" in request.headers.get("accept-encoding", ""))
+
+
 def check_version(response: Response, version: str):
     """
     Check the version of the API
@@ -72,6 +389,57 @@ def convert_records(records) -> list:
     return _records
 
 
+def is_json(content_type) -> bool:
+    """
+    Check if the content type of the body is JSON, missing content type is JSON
+
+    :param content_type: content type header
+    :return: True if the body has to be decoded as JSON
+    """
+    if content_type is None:
+        return True
+    message = email.message.Message()
+    message["content-type"] = content_type
+    subtype = message.get_content_subtype()
+    return message.get_content_maintype() == "application" and (subtype == "json" or subtype.endswith("+json"))
+
+
+async def get_body(request: Request) -> RawBody:
+    """
+    Decode and validate the body of POST and PUT requests
+
+    Bodies with the exact JSON types are validated straight to mongo documents, anything else is validated by
+    BodyObject so the coercion and the error responses stay the same as declaring it as body parameter
+
+    :param request: the request
+    :return: body with records as mongo documents
+    """
+    data = None
+    try:
+        body_bytes = await request.body()
+        if body_bytes:
+            data = json.loads(body_bytes) if is_json(request.headers.get("content-type")) else body_bytes
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([ErrorWrapper(e, ("body", e.pos))], body=e.doc)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail="There was an error parsing the body"
+        ) from e
+
+    with span("body.validate"):
+        body = BodyObject.fast_parse(data)
+        if body is not None:
+            return body
+
+        if data is None:
+            raise RequestValidationError([ErrorWrapper(MissingError(), ("body",))], body=data)
+        try:
+            validated = BodyObject.validate(data)
+        except (TypeError, ValueError) as e:
+            raise RequestValidationError([ErrorWrapper(e, ("body",))], body=data)
+        return RawBody(validated.id, convert_records(validated.records))
+
+
 # noinspection PyShadowingNames
 async def get_api_key(
         p_header: str = Security(api_key_header),
@@ -84,24 +452,29 @@ async def get_api_key(
     :param p_cookie: cookie with api key
     :return: api key header
     """
-    if p_header == API_KEY:
-        if CryptoHelper.verify_token(p_header, SECRET):
-            return p_header
-        else:
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN, detail=error.AUTH
-            )
-    elif p_cookie == API_KEY:
-        if CryptoHelper.verify_token(p_cookie, SECRET):
-            return p_cookie
+    with span("auth.api_key"):
+        API_KEY = storage.api_key
+        if API_KEY is None:
+            # the key is fetched on first use in every worker, which connects, never on the event loop
+            API_KEY = await run_in_threadpool(storage.get_cached_key) or ""
+        if p_header == API_KEY:
+            if CryptoHelper.verify_token(p_header, SECRET):
+                return p_header
+            else:
+                raise HTTPException(
+                    status_code=HTTP_403_FORBIDDEN, detail=error.AUTH
+                )
+        elif p_cookie == API_KEY:
+            if CryptoHelper.verify_token(p_cookie, SECRET):
+                return p_cookie
+            else:
+                raise HTTPException(
+                    status_code=HTTP_403_FORBIDDEN, detail=error.AUTH
+                )
         else:
             raise HTTPException(
                 status_code=HTTP_403_FORBIDDEN, detail=error.AUTH
             )
-    else:
-        raise HTTPException(
-            status_code=HTTP_403_FORBIDDEN, detail=error.AUTH
-        )
 
 
 def set_status_code(response: Response, ok_condition, code: int):
@@ -116,6 +489,107 @@ def set_status_code(response: Response, ok_condition, code: int):
     response.status_code = 200 if ok_condition else code
 
 
+@api.on_event("startup")
+async def connect():
+    """
+    Connect to the storage in the worker process, after the fork when the app is preloaded.
+
+    The warm-up runs in the background, the worker answers the liveness probe meanwhile
+
+    :return: None
+    """
+    api.state.warmed = not WARMUP
+    if WARMUP:
+        api.state.warmup = asyncio.get_running_loop().create_task(warm_up())
+    api.state.health = asyncio.get_running_loop().create_task(watch_health())
+    if LOOP_MONITOR_INTERVAL > 0:
+        api.state.loop_monitor = asyncio.get_running_loop().create_task(loop_monitor.run())
+
+
+async def warm_up():
+    """
+    Connect, fetch the API key, build the in-process indexes and cache the responses of the most recent days
+
+    :return: None
+    """
+    started = time.monotonic()
+    try:
+        await run_in_threadpool(storage.ensure_connected)
+        await run_in_threadpool(storage.get_cached_key)
+        days = await run_in_threadpool(storage.recent_days, WARMUP_DAYS)
+        # every day in its own task, so every day has its own deadline
+        await asyncio.gather(*[
+            cached_entry((f"/api/{VERSION}/day/{StringFormatter.convert_slash_to_underscore(day)}", ""),
+                         "day", storage.get_record_for_day, day)
+            for day in days
+        ])
+        logging.info(f"warm-up of {len(days)} days done in {time.monotonic() - started:.3f} s")
+    except Exception as e:
+        # the routes load what the warm-up could not
+        logging.error(e)
+    api.state.warmed = True
+
+
+@api.on_event("shutdown")
+async def disconnect():
+    """
+    Stop the warm-up, the background pings of the storage and the loop monitor, close the recorded traffic and write
+    the waiting logs
+
+    :return: None
+    """
+    recorder.close()
+    log_handler.close()
+    for task in (getattr(api.state, "warmup", None), getattr(api.state, "health", None),
+                 getattr(api.state, "loop_monitor", None)):
+        if task is not None:
+            task.cancel()
+
+
+async def watch_health():
+    """
+    Ping the storage in the background, keeping the health fresh and probing the breaker once it is half open
+
+    :return: None
+    """
+    while True:
+        try:
+            if storage.breaker.probe_due() and await run_in_threadpool(storage.ping):
+                # writes journaled while the storage was unavailable, or before a crash, go to the storage first
+                await run_in_threadpool(storage.replay_journal)
+        except Exception as e:
+            logging.error(e)
+        await asyncio.sleep(HEALTH_INTERVAL)
+
+
+# liveness and readiness are not versioned, the probes of the deployment do not change with the API
+@api.get("/api/health/live")
+async def get_liveness():
+    """
+    Check if the server is alive, answered by the event loop only
+
+    :return: dict with alive
+    """
+    return http_res.set_object(alive=True)
+
+
+@api.get("/api/health/ready")
+async def get_readiness(response: Response):
+    """
+    Check if the server can take requests, from the health of the last calls and pings of the storage. A worker
+    still warming up is ready, the routes load what the warm-up did not yet
+
+    :param response: response object to be send to client
+    :return: dict with connected, state of the breaker, seconds since the last ping and its round trip, if the
+    warm-up is done and the lag of the event loop
+    """
+    health = storage.health()
+    health["warmed"] = getattr(api.state, "warmed", False)
+    health["loop"] = loop_monitor.stats()
+    set_status_code(response, health["connected"], 503)
+    return http_res.set_object(**health)
+
+
 # Keys are now saved serverside and has to be fetch before connection can be established
 @api.post("/api/{version}/auth/key")
 async def get_key(version: str, body: AccessKey, response: Response):
@@ -129,10 +603,10 @@ async def get_key(version: str, body: AccessKey, response: Response):
     if ver is not VERSION:
         return ver
 
-    key = mongo.get_client_key(body)
+    key = await admit("auth", storage.get_client_key, body)
 
     if key is None:
-        if mongo.isConnected:
+        if storage.isConnected:
             # assuming key is not found thus
             set_status_code(response, False, 400)
         else:
@@ -157,16 +631,18 @@ async def get_connection(version: str, response: Response):
     if ver is not VERSION:
         return ver
     else:
-        connected = mongo.get_connection()
+        # connects on first use in the worker
+        connected = await run_in_threadpool(storage.get_connection)
         set_status_code(response, connected, 503)
         return http_res.set_object(connected=connected)
 
 
 @api.get("/api/{version}/day")
-async def get_records(version: str, response: Response, api_key: APIKey = Depends(get_api_key)):
+async def get_records(version: str, request: Request, response: Response, api_key: APIKey = Depends(get_api_key)):
     """
     Get the records
     :param version: version of the API to be evaluated
+    :param request: request object, the key of the cached response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: all records
@@ -177,18 +653,109 @@ async def get_records(version: str, response: Response, api_key: APIKey = Depend
     if ver is not VERSION:
         return ver
     else:
-        records = mongo.get_all_records()
-        if records is None:
+        cached = await cached_data(request, "day", storage.get_all_records)
+        if cached is None:
+            set_status_code(response, False, 503)
+            return http_res.set_data(None)
+        return cached
+
+
+@api.get("/api/{version}/feed")
+async def get_recent_tasks(version: str, response: Response, limit: int = 50, cursor: Optional[str] = None,
+                           api_key: APIKey = Depends(get_api_key)):
+    """
+    Get the most recent tasks regardless of the day
+
+    :param version: version of the API to be evaluated
+    :param response: response object to be send to client
+    :param limit: maximum number of tasks to be fetch
+    :param cursor: cursor of the next page from the previous response
+    :param api_key: api key to be evaluated
+    :return: tasks with their day and the cursor of the next page
+    """
+
+    # check the version
+    ver = check_version(response, version)
+    if ver is not VERSION:
+        return ver
+    else:
+        page = await admit("feed", storage.get_recent_tasks, max(1, min(limit, FEED_MAX_LIMIT)), cursor)
+        if page is None:
+            set_status_code(response, False, 503)
+            return http_res.SERVER_UNAVAILABLE
+        elif page == http_res.FAILED_CURSOR:
+            set_status_code(response, False, 400)
+            return page
+        else:
+            return page
+
+
+@api.get("/api/{version}/search")
+async def search_tasks(version: str, q: str, response: Response, limit: int = 20, offset: int = 0,
+                       api_key: APIKey = Depends(get_api_key)):
+    """
+    Search the tasks by the task name and notes
+
+    :param version: version of the API to be evaluated
+    :param q: the search query
+    :param response: response object to be send to client
+    :param limit: maximum number of tasks to be fetch
+    :param offset: number of tasks to skip, the next offset from the previous response
+    :param api_key: api key to be evaluated
+    :return: ranked tasks with their day, score and highlights and the offset of the next page
+    """
+
+    # check the version
+    ver = check_version(response, version)
+    if ver is not VERSION:
+        return ver
+    else:
+        found = await admit("search", storage.search_tasks, q, max(0, offset), max(1, min(limit, SEARCH_MAX_LIMIT)))
+        if found is None:
             set_status_code(response, False, 503)
-        return http_res.set_data(records)
+            return http_res.SERVER_UNAVAILABLE
+        return found
+
+
+@api.get("/api/{version}/suggest")
+async def suggest(version: str, prefix: str, response: Response, field: str = "task", limit: int = 10,
+                  api_key: APIKey = Depends(get_api_key)):
+    """
+    Suggest the task or platform for the typed prefix
+
+    :param version: version of the API to be evaluated
+    :param prefix: the typed prefix
+    :param response: response object to be send to client
+    :param field: the record field to be suggested, `task` or `platform`
+    :param limit: maximum number of suggestions
+    :param api_key: api key to be evaluated
+    :return: suggestions ordered by frequency and recency
+    """
+
+    # check the version
+    ver = check_version(response, version)
+    if ver is not VERSION:
+        return ver
+    else:
+        suggestions = await admit("suggest", storage.suggest, field, prefix, max(1, min(limit, SUGGEST_MAX_LIMIT)))
+        if suggestions is None:
+            set_status_code(response, False, 503)
+            return http_res.SERVER_UNAVAILABLE
+        elif suggestions == http_res.FAILED_SUGGEST_FIELD:
+            set_status_code(response, False, 400)
+            return suggestions
+        else:
+            return http_res.set_data(suggestions)
 
 
 @api.get("/api/{version}/day/{date_id}")
-async def get_record(version: str, date_id: str, response: Response, api_key: APIKey = Depends(get_api_key)):
+async def get_record(version: str, date_id: str, request: Request, response: Response,
+                     api_key: APIKey = Depends(get_api_key)):
     """
     Get the record of the day
     :param version: version of the API to be evaluated
     :param date_id: the date id to be fetch
+    :param request: request object, the key of the cached response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: record of the day
@@ -199,20 +766,52 @@ async def get_record(version: str, date_id: str, response: Response, api_key: AP
         return ver
     else:
         correct_day = StringFormatter.convert_underscore_to_slash(date_id)
-        record = mongo.get_record_for_day(correct_day)
-        if record is None:
+        cached = await cached_data(request, "day", storage.get_record_for_day, correct_day)
+        if cached is None:
             set_status_code(response, False, 400)
-        return http_res.set_data(record)
+            return http_res.set_data(None)
+        return cached
+
+
+@api.get("/api/{version}/days")
+async def get_records_for_days(version: str, request: Request, response: Response,
+                               date_ids: List[str] = Query(...), api_key: APIKey = Depends(get_api_key)):
+    """
+    Get the records of many days in a single read, e.g. of a week or month view
+    :param version: version of the API to be evaluated
+    :param request: request object, the key of the cached response
+    :param response: response object to be send to client
+    :param date_ids: the date ids to be fetch, repeated or separated by comma
+    :param api_key: api key to be evaluated
+    :return: records of every day, null for the days not found
+    """
+    # check the version
+    ver = check_version(response, version)
+    if ver is not VERSION:
+        return ver
+    else:
+        # in the order requested, once
+        days = list(dict.fromkeys(StringFormatter.convert_underscore_to_slash(date_id.strip())
+                                  for value in date_ids for date_id in value.split(",") if date_id.strip()))
+        if not 0 < len(days) <= BATCH_MAX_DAYS:
+            raise HTTPException(status_code=400, detail=error.BATCH_DAYS.format(BATCH_MAX_DAYS))
+        cached = await cached_data(request, "day", storage.get_records_for_days, tuple(days))
+        if cached is None:
+            # the days not found are null, none at all only when the storage cannot be reached
+            set_status_code(response, False, 503)
+            return http_res.SERVER_UNAVAILABLE
+        return cached
 
 
 @api.get("/api/{version}/day/{date_id}/latest")
-async def get_most_recent_record(version: str, date_id: str, response: Response,
+async def get_most_recent_record(version: str, date_id: str, request: Request, response: Response,
                                  api_key: APIKey = Depends(get_api_key)):
     """
     Get the most recent task
 
     :param version: version of the API to be evaluated
     :param date_id: the date id to be fetch
+    :param request: request object, its revision header is the last write of the client
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: the most recent task
@@ -224,7 +823,8 @@ async def get_most_recent_record(version: str, date_id: str, response: Response,
         return ver
     else:
         correct_day = StringFormatter.convert_underscore_to_slash(date_id)
-        record = mongo.get_most_recent_record(correct_day)
+        await sync_changes("latest", client_revision(request))
+        record = await coalesced("latest", storage.get_most_recent_record, correct_day)
         if record is None:
             raise HTTPException(
                 status_code=HTTP_404_NOT_FOUND, detail=error.NOT_FOUND
@@ -234,12 +834,14 @@ async def get_most_recent_record(version: str, date_id: str, response: Response,
 
 
 @api.post("/api/{version}/day")
-async def create_record(version: str, body: BodyObject, response: Response, api_key: APIKey = Depends(get_api_key)):
+async def create_record(version: str, request: Request, response: Response, api_key: APIKey = Depends(get_api_key),
+                        body: RawBody = Depends(get_body)):
     """
     Create record of the day
 
     :param version: version of the API to be evaluated
     :param body: the body record object to be saved in the database
+    :param request: request object, its Idempotency-Key header makes the retries replay the response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: message string
@@ -250,27 +852,34 @@ async def create_record(version: str, body: BodyObject, response: Response, api_
     if ver is not VERSION:
         return ver
     else:
-        records = convert_records(body.records)
-        created = mongo.create_record_for_day(body.id, records)
-        if created is None:
-            set_status_code(response, False, 503)
-            return http_res.SERVER_UNAVAILABLE
-        elif created == http_res.FAILED_CREATE_UPDATE:
-            set_status_code(response, False, 400)
-            return created
-        else:
-            set_status_code(response, False, 201)
-            return created
+        async def write(response: Response):
+            records = body.records
+            created = await admit("write", storage.write, "create", body.id, records)
+            if created is None:
+                set_status_code(response, False, 503)
+                return http_res.SERVER_UNAVAILABLE
+            elif created is http_res.JOURNALED:
+                set_status_code(response, False, 202)
+                return created
+            elif created == http_res.FAILED_CREATE_UPDATE:
+                set_status_code(response, False, 400)
+                return created
+            else:
+                set_status_code(response, False, 201)
+                return created
+
+        return await idempotent(request, response, write)
 
 
 @api.put("/api/{version}/day/{date_id}")
-async def update_record(version: str, date_id: str, body: BodyObject, response: Response,
-                        api_key: APIKey = Depends(get_api_key)):
+async def update_record(version: str, date_id: str, request: Request, response: Response,
+                        api_key: APIKey = Depends(get_api_key), body: RawBody = Depends(get_body)):
     """
     Update the record of the day
 
     :param version: version of the API to be evaluated
     :param date_id: the date id to be fetch
+    :param request: request object, its Idempotency-Key header makes the retries replay the response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: message string
@@ -281,28 +890,35 @@ async def update_record(version: str, date_id: str, body: BodyObject, response:
     if ver is not VERSION:
         return ver
     else:
-        correct_day = StringFormatter.convert_underscore_to_slash(date_id)
-        records = convert_records(body.records)
-        updated = mongo.update_record_for_day(correct_day, records)
-        if updated is None:
-            set_status_code(response, False, 503)
-            return http_res.SERVER_UNAVAILABLE
-        elif updated == http_res.FAILED_CREATE_UPDATE:
-            set_status_code(response, False, 400)
-            return updated
-        else:
-            set_status_code(response, True, 200)
-            return updated
+        async def write(response: Response):
+            correct_day = StringFormatter.convert_underscore_to_slash(date_id)
+            records = body.records
+            updated = await admit("write", storage.write, "update", correct_day, records)
+            if updated is None:
+                set_status_code(response, False, 503)
+                return http_res.SERVER_UNAVAILABLE
+            elif updated is http_res.JOURNALED:
+                set_status_code(response, False, 202)
+                return updated
+            elif updated == http_res.FAILED_CREATE_UPDATE:
+                set_status_code(response, False, 400)
+                return updated
+            else:
+                set_status_code(response, True, 200)
+                return updated
+
+        return await idempotent(request, response, write)
 
 
 @api.delete("/api/{version}/day/{date_id}")
-async def delete_record(version: str, date_id: str, response: Response,
+async def delete_record(version: str, date_id: str, request: Request, response: Response,
                         api_key: APIKey = Depends(get_api_key)):
     """
     Delete the record for the day
 
     :param version: version of the API to be evaluated
     :param date_id: the date id to be fetch
+    :param request: request object, its Idempotency-Key header makes the retries replay the response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return: message string
@@ -313,21 +929,28 @@ async def delete_record(version: str, date_id: str, response: Response,
     if ver is not VERSION:
         return ver
     else:
-        correct_day = StringFormatter.convert_underscore_to_slash(date_id)
-        deleted = mongo.delete_record_for_day(correct_day)
-        if deleted is None:
-            set_status_code(response, False, 503)
-            return http_res.SERVER_UNAVAILABLE
-        elif deleted == http_res.FAILED_DELETED_DAY:
-            set_status_code(response, False, 400)
-            return deleted
-        else:
-            set_status_code(response, True, 200)
-            return deleted
+        async def write(response: Response):
+            correct_day = StringFormatter.convert_underscore_to_slash(date_id)
+            deleted = await admit("write", storage.write, "delete_day", correct_day)
+            if deleted is None:
+                set_status_code(response, False, 503)
+                return http_res.SERVER_UNAVAILABLE
+            elif deleted is http_res.JOURNALED:
+                set_status_code(response, False, 202)
+                return deleted
+            elif deleted == http_res.FAILED_DELETED_DAY:
+                set_status_code(response, False, 400)
+                return deleted
+            else:
+                set_status_code(response, True, 200)
+                return deleted
+
+        return await idempotent(request, response, write)
 
 
 @api.delete("/api/{version}/day/{date_id}/task/{task_id}")
-async def delete_task_for_record(version: str, date_id: str, task_id: str, response: Response,
+async def delete_task_for_record(version: str, date_id: str, task_id: str, request: Request,
+                                 response: Response,
                                  api_key: APIKey = Depends(get_api_key)):
     """
     Delete the task for the day
@@ -335,6 +958,7 @@ async def delete_task_for_record(version: str, date_id: str, task_id: str, respo
     :param version: version of the API to be evaluated
     :param date_id: the date id to be fetch
     :param task_id: the task id to be deleted
+    :param request: request object, its Idempotency-Key header makes the retries replay the response
     :param response: response object to be send to client
     :param api_key: api key to be evaluated
     :return:
@@ -345,17 +969,23 @@ async def delete_task_for_record(version: str, date_id: str, task_id: str, respo
     if ver is not VERSION:
         return ver
     else:
-        correct_day = StringFormatter.convert_underscore_to_slash(date_id)
-        deleted = mongo.delete_task(correct_day, int(task_id))
-        if deleted is None:
-            set_status_code(response, False, 503)
-            return http_res.SERVER_UNAVAILABLE
-        elif deleted == http_res.FAILED_DELETED_DAY:
-            set_status_code(response, False, 400)
-            return deleted
-        elif deleted == http_res.FAILED_DELETED_TASK_NON:
-            set_status_code(response, False, 404)
-            return deleted
-        else:
-            set_status_code(response, True, 200)
-            return deleted
+        async def write(response: Response):
+            correct_day = StringFormatter.convert_underscore_to_slash(date_id)
+            deleted = await admit("write", storage.write, "delete_task", correct_day, int(task_id))
+            if deleted is None:
+                set_status_code(response, False, 503)
+                return http_res.SERVER_UNAVAILABLE
+            elif deleted is http_res.JOURNALED:
+                set_status_code(response, False, 202)
+                return deleted
+            elif deleted == http_res.FAILED_DELETED_DAY:
+                set_status_code(response, False, 400)
+                return deleted
+            elif deleted == http_res.FAILED_DELETED_TASK_NON:
+                set_status_code(response, False, 404)
+                return deleted
+            else:
+                set_status_code(response, True, 200)
+                return deleted
+
+        return await idempotent(request, response, write)
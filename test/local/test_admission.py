@@ -0,0 +1,65 @@
+import asyncio
+import time
+
+import pytest
+from helpers.admission import Limiter, Overloaded
+
+# duration of one call of the slow backend
+SLOW_CALL = 0.2
+
+
+def slow_backend():
+    time.sleep(SLOW_CALL)
+    return True
+
+
+async def timed_call(limiter: Limiter, timeout: float):
+    """
+    Call the slow backend through the limiter
+    :param limiter: the limiter
+    :param timeout: seconds to wait for a slot
+    :return: tuple of the outcome and the latency in seconds
+    """
+    started = time.monotonic()
+    try:
+        await limiter.run(slow_backend, timeout=timeout)
+        return "ok", time.monotonic() - started
+    except Overloaded:
+        return "shed", time.monotonic() - started
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_excess_load():
+    limiter = Limiter(2, 4)
+    results = await asyncio.gather(*[timed_call(limiter, 5) for _ in range(20)])
+    accepted = [latency for outcome, latency in results if outcome == "ok"]
+    shed = [latency for outcome, latency in results if outcome == "shed"]
+    # 2 running and 4 waiting are admitted, the rest is rejected at once instead of piling up
+    assert len(accepted) == 6
+    assert len(shed) == 14
+    assert max(shed) < SLOW_CALL / 2
+    # the admitted calls wait for at most the calls queued in front of them
+    assert max(accepted) < SLOW_CALL * 3 + 0.5
+    assert limiter.running == 0 and len(limiter.waiters) == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_deadline_while_waiting():
+    limiter = Limiter(1, 4)
+    results = await asyncio.gather(*[timed_call(limiter, SLOW_CALL / 2) for _ in range(3)])
+    assert [outcome for outcome, _ in results] == ["ok", "shed", "shed"]
+    assert limiter.running == 0 and len(limiter.waiters) == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_cancelled_call_keeps_slot():
+    limiter = Limiter(1, 4)
+    call = asyncio.ensure_future(limiter.run(slow_backend))
+    await asyncio.sleep(SLOW_CALL / 4)
+    call.cancel()
+    await asyncio.sleep(0)
+    # the thread still runs the call, the next call waits for it
+    assert limiter.running == 1
+    outcome, latency = await timed_call(limiter, 5)
+    assert outcome == "ok" and latency > SLOW_CALL * 1.5
+    assert limiter.running == 0 and len(limiter.waiters) == 0
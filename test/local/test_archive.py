@@ -0,0 +1,33 @@
+from helpers.archive import MonthArchive, ArchiveCache
+
+
+def test_pack_round_trip():
+    days = {"03/01/2019": [{"id": 1, "task": "a", "start": "08:00:00", "end": "09:00:00", "delta": 1.0}],
+            "04/01/2019": []}
+    blob = MonthArchive.pack(days)
+    assert isinstance(blob, bytes)
+    assert MonthArchive.unpack(blob) == days
+
+
+def test_month_of():
+    assert MonthArchive.month_of("04/01/2019") == "2019-01"
+    assert MonthArchive.month_of("31/12/2020") == "2020-12"
+    assert MonthArchive.month_of("not a day") is None
+
+
+def test_cache_by_version_and_lru():
+    cache = ArchiveCache(2)
+    cache.put("2019-01", 1, {"03/01/2019": []})
+    cache.put("2019-02", 1, {})
+    assert cache.get("2019-01", 1) == {"03/01/2019": []}
+    # archived again since it was unpacked
+    assert cache.get("2019-01", 2) is None
+    cache.put("2019-03", 1, {})
+    assert cache.get("2019-02", 1) is None and cache.get("2019-01", 1) is not None
+    assert cache.hits == 2 and cache.misses == 2
+
+
+def test_cache_disabled():
+    cache = ArchiveCache(0)
+    cache.put("2019-01", 1, {})
+    assert cache.get("2019-01", 1) is None
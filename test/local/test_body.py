@@ -0,0 +1,88 @@
+import pytest
+from pydantic import ValidationError
+from interface.body import BodyObject
+
+
+def make_record(**changes):
+    record = {"id": 1, "task": "Review", "start": "09:00:00", "end": "10:00:00", "delta": 1.0, "platform": "web",
+              "notes": "body"}
+    record.update(changes)
+    return record
+
+
+def validated(data):
+    """
+    The records as the model validates them, the way the routes did before the fast path
+    :param data: decoded JSON body
+    :return: tuple of the id and the records as mongo documents
+    """
+    body = BodyObject.validate(data)
+    return body.id, [record.dict() for record in body.records]
+
+
+def assert_same(data):
+    """
+    The fast path gives exactly what the model gives, including the types
+    :param data: decoded JSON body
+    :return: None
+    """
+    fast = BodyObject.fast_parse(data)
+    assert fast is not None
+    body_id, records = validated(data)
+    assert fast.id == body_id
+    assert fast.records == records
+    assert [[type(value) for value in record.values()] for record in fast.records] == \
+           [[type(value) for value in record.values()] for record in records]
+    assert [list(record) for record in fast.records] == [list(record) for record in records]
+
+
+def test_exact_body():
+    assert_same({"id": "01/01/2020", "records": [make_record(), make_record(id=2, start="10:00:00", end="11:00:00")]})
+    assert_same({"id": "01/01/2020", "records": []})
+    # records default to none
+    assert_same({"id": "01/01/2020"})
+
+
+def test_int_and_derived_delta():
+    assert_same({"id": "01/01/2020", "records": [make_record(delta=1)]})
+    record = make_record()
+    del record["delta"]
+    assert_same({"id": "01/01/2020", "records": [record]})
+    assert_same({"id": "01/01/2020", "records": [make_record(start="morning", end="noon", delta=2)]})
+
+
+def test_extra_fields_and_order():
+    assert_same({"id": "01/01/2020", "records": [make_record(extra="dropped")]})
+    record = make_record()
+    assert_same({"id": "01/01/2020", "records": [dict(reversed(list(record.items())))]})
+    assert_same({"id": "01/01/2020", "records": [make_record()], "extra": True})
+
+
+@pytest.mark.parametrize("data", [
+    {"id": 1, "records": []},
+    {"id": "01/01/2020", "records": [make_record(id="1")]},
+    {"id": "01/01/2020", "records": [make_record(delta="1.0")]},
+    {"id": "01/01/2020", "records": [make_record(notes=5)]},
+])
+def test_coercions_left_to_the_model(data):
+    # the model coerces them, the fast path does not guess
+    assert BodyObject.fast_parse(data) is None
+    validated(data)
+
+
+@pytest.mark.parametrize("data", [
+    None,
+    [],
+    "body",
+    {"records": []},
+    {"id": "01/01/2020", "records": {}},
+    {"id": "01/01/2020", "records": [make_record(delta=2.0)]},
+    {"id": "01/01/2020", "records": [make_record(start="morning", end="noon", delta=None)]},
+    {"id": "01/01/2020", "records": [{"id": 1}]},
+    {"id": "01/01/2020", "records": [make_record(delta=True, id=[1])]},
+])
+def test_invalid_left_to_the_model(data):
+    # the model gives the errors the routes answer 422 with
+    assert BodyObject.fast_parse(data) is None
+    with pytest.raises((ValidationError, TypeError)):
+        validated(data)
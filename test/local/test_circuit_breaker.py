@@ -0,0 +1,43 @@
+import time
+
+import pytest
+from helpers.circuit_breaker import CircuitBreaker, CircuitOpen, CLOSED, OPEN, HALF_OPEN
+
+
+def test_breaker_opens_on_consecutive_failures():
+    breaker = CircuitBreaker(3, 60)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    # a success in between resets the count
+    assert breaker.state == CLOSED
+    breaker.check()
+
+    breaker.failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    # not probed before the reset timeout
+    assert breaker.probe_due() is False
+
+
+def test_breaker_half_open_probe():
+    breaker = CircuitBreaker(1, 0.05)
+    breaker.failure()
+    time.sleep(0.06)
+    assert breaker.probe_due() is True
+    assert breaker.state == HALF_OPEN
+    # the calls still fail fast while the probe runs
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    # a failed probe opens the breaker again, a successful one closes it
+    breaker.failure()
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    assert breaker.probe_due() is True
+    breaker.success()
+    assert breaker.state == CLOSED
+    breaker.check()
@@ -0,0 +1,59 @@
+from helpers.inverted_index import InvertedIndex
+
+
+def make_record(task_id, task, notes="", start="09:00:00"):
+    return {"id": task_id, "task": task, "start": start, "end": "23:00:00", "delta": 1.0, "platform": "web",
+            "notes": notes}
+
+
+def ranked(index, query, offset=0, limit=10):
+    page, total = index.search(query, offset, limit)
+    return [(day, record["id"]) for _, day, record in page], total
+
+
+def test_task_weighs_more_than_notes():
+    index = InvertedIndex()
+    index.add_day("01/01/2020", [make_record(1, "Write notes", "deploy the release"),
+                                 make_record(2, "Deploy", "release notes")])
+    assert ranked(index, "deploy") == ([("01/01/2020", 2), ("01/01/2020", 1)], 2)
+    # rare words score more than common ones
+    index.add_day("02/01/2020", [make_record(3, "Review", "deploy")])
+    page, _ = index.search("review deploy", 0, 10)
+    assert page[0][2]["id"] == 3
+
+
+def test_equal_scores_most_recent_first():
+    index = InvertedIndex()
+    index.add_day("01/01/2020", [make_record(1, "Standup", start="09:00:00"),
+                                 make_record(2, "Standup", start="10:00:00")])
+    index.add_day("02/01/2020", [make_record(3, "Standup", start="08:00:00")])
+    assert ranked(index, "STANDUP") == ([("02/01/2020", 3), ("01/01/2020", 2), ("01/01/2020", 1)], 3)
+    assert ranked(index, "standup", 1, 1) == ([("01/01/2020", 2)], 3)
+    assert ranked(index, "retro") == ([], 0)
+    assert ranked(index, "") == ([], 0)
+
+
+def test_add_day_replaces_and_remove_day():
+    index = InvertedIndex()
+    index.add_day("01/01/2020", [make_record(1, "Review", "pull request")])
+    index.add_day("01/01/2020", [make_record(1, "Retro")])
+    assert ranked(index, "review request") == ([], 0)
+    assert ranked(index, "retro") == ([("01/01/2020", 1)], 1)
+
+    index.remove_day("01/01/2020")
+    assert ranked(index, "retro") == ([], 0)
+    # nothing is left behind of the removed tasks
+    assert len(index.postings) == 0 and len(index.documents) == 0 and len(index.days) == 0
+    index.remove_day("02/01/2020")
+
+
+def test_highlights():
+    terms = {"rev", "pull"}
+    assert InvertedIndex.highlight("Review the Pull request", terms) == "<em>Review</em> the <em>Pull</em> request"
+    assert InvertedIndex.highlight("Retro", terms) is None
+    assert InvertedIndex.highlight(None, terms) is None
+
+    index = InvertedIndex()
+    record = make_record(1, "Code review", "pull request 12", start="10:00:00")
+    assert index.highlights(record, terms) == {"task": "Code <em>review</em>", "notes": "<em>pull</em> request 12"}
+    assert index.highlights(record, {"retro"}) == {}
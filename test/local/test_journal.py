@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from helpers.journal import WriteJournal
+
+# root of the repository, the crashing processes import the journal from it
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_crashing(script: str):
+    """
+    Run the script in another process that is killed at the end without closing anything
+    :param script: python code, ends with a hard exit
+    :return: None
+    """
+    code = f"from helpers.journal import WriteJournal\nimport os\n{script}\nos._exit(9)\n"
+    process = subprocess.run([sys.executable, "-c", code], cwd=ROOT)
+    assert process.returncode == 9
+
+
+def test_journal_survives_crash(tmp_path):
+    path = str(tmp_path / "journal.db")
+    run_crashing(f"""
+journal = WriteJournal({path!r})
+for i in range(100):
+    journal.append("update", "01/01/2020", [[{{"id": i}}]])
+""")
+    journal = WriteJournal(path)
+    pending = journal.pending()
+    assert journal.count() == 100
+    assert [args[0][0]["id"] for _, _, _, args in pending] == list(range(100))
+    assert [seq for seq, _, _, _ in pending] == sorted(seq for seq, _, _, _ in pending)
+
+
+def test_journal_replay_stops_at_failure(tmp_path):
+    journal = WriteJournal(str(tmp_path / "journal.db"))
+    for day in ("01/01/2020", "02/01/2020", "03/01/2020"):
+        journal.append("create", day, [[]])
+    applied = []
+    down = [True]
+
+    def apply(op, day, args):
+        if day == "02/01/2020" and down[0]:
+            raise ConnectionError("mongo is down")
+        applied.append(day)
+
+    with pytest.raises(ConnectionError):
+        journal.replay(apply)
+    # the failed write and the ones after it are kept in order for the next replay
+    assert [day for _, _, day, _ in journal.pending()] == ["02/01/2020", "03/01/2020"]
+    down[0] = False
+    assert journal.replay(apply) == 2
+    assert applied == ["01/01/2020", "02/01/2020", "03/01/2020"]
+    assert journal.count() == 0
+
+
+def test_journal_replay_crash_after_apply(tmp_path):
+    path = str(tmp_path / "journal.db")
+    state = tmp_path / "state.json"
+    journal = WriteJournal(path)
+    journal.append("update", "01/01/2020", [[{"id": 1}]])
+    journal.append("update", "01/01/2020", [[{"id": 2}]])
+
+    # the process dies after the first write reached the store and before it was removed from the journal
+    run_crashing(f"""
+import json
+def apply(op, day, args):
+    with open({str(state)!r}, "w") as file:
+        json.dump({{day: args[0]}}, file)
+    os._exit(9)
+WriteJournal({path!r}).replay(apply)
+""")
+    assert journal.count() == 2
+
+    def apply(op, day, args):
+        # the update sets the records of the day, applying it again gives the same state
+        stored = json.loads(state.read_text())
+        stored[day] = args[0]
+        state.write_text(json.dumps(stored))
+
+    assert journal.replay(apply) == 2
+    assert json.loads(state.read_text()) == {"01/01/2020": [{"id": 2}]}
+    assert journal.count() == 0
+
+
+def test_waiting_without_query(tmp_path):
+    journal = WriteJournal(str(tmp_path / "journal.db"))
+    assert not journal.waiting
+    journal.append("create", "01/01/2020", [[]])
+    assert journal.waiting
+    journal.replay(lambda op, day, args: None)
+    assert not journal.waiting
+    # appended by another worker, seen once counted
+    WriteJournal(str(tmp_path / "journal.db")).append("delete_day", "01/01/2020", [])
+    assert not journal.waiting
+    assert journal.count() == 1 and journal.waiting
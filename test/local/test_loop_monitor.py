@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import time
+
+from helpers.loop_monitor import LoopMonitor, LoopRouteMiddleware
+
+
+def test_blocking_call_is_reported_with_route(caplog):
+    monitor = LoopMonitor(0.01, 0.05, True)
+
+    async def app(scope, receive, send):
+        # a synchronous call in an async handler
+        time.sleep(0.2)
+
+    async def run():
+        task = asyncio.ensure_future(monitor.run())
+        await asyncio.sleep(0.05)
+        scope = {"type": "http", "method": "GET", "path": "/api/v0.7/day"}
+        await asyncio.ensure_future(LoopRouteMiddleware(app, monitor)(scope, None, None))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(run())
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1 and stats["blocked"] == 1
+    assert 150 <= stats["max_ms"] < 400
+    report, = [record.getMessage() for record in caplog.records if "event loop blocked" in record.getMessage()]
+    assert "by GET /api/v0.7/day" in report and "time.sleep(0.2)" in report
+
+
+def test_no_stall_without_blocking():
+    monitor = LoopMonitor(0.01, 0.05, False)
+
+    async def run():
+        task = asyncio.ensure_future(monitor.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    stats = monitor.stats()
+    assert stats["stalls"] == 0 and stats["blocked"] == 0 and stats["lag_ms"] is not None
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from helpers.prefix_index import PrefixIndex
+
+NOW = datetime(2020, 6, 1)
+
+
+def test_prefix_bounds():
+    index = PrefixIndex()
+    for value in ("Review", "Retro", "Refactor", "Release", "Deploy", "re", "R"):
+        index.add(value, NOW)
+    assert sorted(index.suggest("re", 10)) == ["Refactor", "Release", "Retro", "Review", "re"]
+    assert sorted(index.suggest("REF", 10)) == ["Refactor"]
+    assert sorted(index.suggest("r", 10)) == ["R", "Refactor", "Release", "Retro", "Review", "re"]
+    assert index.suggest("x", 10) == []
+    assert len(index.suggest("", 10)) == 7
+    assert len(index.suggest("re", 2)) == 2
+
+
+def test_prefix_bounds_unicode():
+    index = PrefixIndex()
+    for value in ("Café", "Cafe", "Caf\U0010fffe", "Cag"):
+        index.add(value, NOW)
+    # the code points just below the upper bound still have the prefix
+    assert sorted(index.suggest("caf", 10)) == ["Cafe", "Café", "Caf\U0010fffe"]
+    assert index.suggest("café", 10) == ["Café"]
+
+
+def test_ordered_by_decayed_weight():
+    index = PrefixIndex(half_life_days=30.0)
+    for _ in range(4):
+        index.add("Review", NOW - timedelta(days=90))
+    index.add("Retro", NOW)
+    index.add("Refactor", NOW - timedelta(days=29))
+    index.add("Refactor", NOW - timedelta(days=29))
+    # 4 uses 3 half lives ago weigh 0.5, 1 use now weighs 1, 2 uses nearly one half life ago weigh over 1
+    assert index.suggest("re", 10) == ["Refactor", "Retro", "Review"]
+    # the last use counts, not the first
+    index.add("Review", NOW)
+    assert index.suggest("re", 1) == ["Review"]
+
+
+def test_remove():
+    index = PrefixIndex()
+    index.add("Review", NOW)
+    index.add("Review", NOW)
+    index.add("Retro", NOW - timedelta(days=1))
+    index.add("Retro", NOW - timedelta(days=1))
+    assert index.suggest("re", 10) == ["Review", "Retro"]
+    index.remove("Review")
+    assert index.suggest("re", 10) == ["Retro", "Review"]
+    index.remove("Review")
+    assert index.suggest("re", 10) == ["Retro"]
+    # one of the two uses of the string is left
+    index.remove("Retro")
+    assert "Review" not in index.entries and "Review" not in index.ranks
+    assert index.keys == [("retro", "Retro")]
+    # unknown strings and other types are ignored
+    index.remove("Review")
+    index.add(None, NOW)
+    index.add("", NOW)
+    assert index.keys == [("retro", "Retro")]
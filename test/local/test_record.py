@@ -0,0 +1,44 @@
+import pytest
+from pydantic import ValidationError
+from interface.record import Record
+
+
+def make_record(start, end, delta=None):
+    record = {"id": 1, "task": "Review", "start": start, "end": end, "platform": "web", "notes": "record"}
+    if delta is not None:
+        record["delta"] = delta
+    return record
+
+
+def test_delta_derived():
+    assert Record.check_delta("09:00:00", "10:30:00", None) == 1.5
+    # an end before the start is on the next day
+    assert Record.check_delta("22:00", "01:00", None) == 3.0
+    assert Record.check_delta("2020-01-01T09:00:00", "2020-01-02T09:00:00", None) == 24.0
+    assert Record(**make_record("09:00:00", "09:20:00")).delta == round(1 / 3, 6)
+
+
+def test_delta_within_tolerance_kept():
+    assert Record.check_delta("09:00:00", "10:00:00", 1.04) == 1.04
+    assert Record(**make_record("09:00:00", "10:00:00", 1)).delta == 1.0
+
+
+def test_delta_mismatch():
+    with pytest.raises(ValueError, match="delta does not match start and end"):
+        Record.check_delta("09:00:00", "10:00:00", 2.0)
+    # the error of the model is what the routes answer 422 with
+    with pytest.raises(ValidationError) as caught:
+        Record(**make_record("09:00:00", "10:00:00", 2.0))
+    assert caught.value.errors() == [{"loc": ("__root__",), "msg": "delta does not match start and end",
+                                      "type": "value_error"}]
+    assert Record.fast_validate(make_record("09:00:00", "10:00:00", 2.0)) is None
+
+
+def test_free_form_times():
+    # times that cannot be parsed keep the delta of the client, which is then required
+    assert Record.check_delta("morning", "noon", 2.5) == 2.5
+    assert Record(**make_record("morning", "noon", 2.5)).delta == 2.5
+    with pytest.raises(ValueError, match="delta is required"):
+        Record.check_delta("morning", "noon", None)
+    with pytest.raises(ValidationError):
+        Record(**make_record("morning", "noon"))
@@ -0,0 +1,54 @@
+from datetime import datetime
+from helpers.record_codec import RecordCodec, FORMAT_KEY
+
+DAY = "01/01/2020"
+
+
+def make_record(start, end):
+    return {"id": 1, "task": "Review", "start": start, "end": end, "delta": 1.0, "platform": "web", "notes": "codec"}
+
+
+def test_round_trip():
+    codec = RecordCodec(True)
+    record = make_record("09:00:00", "10:00:00")
+    stored = codec.encode(DAY, record)
+    assert stored["start"] == datetime(2020, 1, 1, 9) and stored["end"] == datetime(2020, 1, 1, 10)
+    assert FORMAT_KEY not in stored
+    assert RecordCodec.decode(stored) == record
+    # the record of the client is not changed
+    assert record["start"] == "09:00:00"
+
+
+def test_format_kept():
+    codec = RecordCodec(True)
+    record = make_record("09:00", "10:00:00.250000")
+    stored = codec.encode(DAY, record)
+    assert stored[FORMAT_KEY] == {"start": "%H:%M", "end": "%H:%M:%S.%f"}
+    assert stored["end"] == datetime(2020, 1, 1, 10, 0, 0, 250000)
+    assert RecordCodec.decode(stored) == record
+
+
+def test_end_on_next_day():
+    codec = RecordCodec(True)
+    record = make_record("23:00:00", "01:00:00")
+    stored = codec.encode(DAY, record)
+    assert stored["end"] == datetime(2020, 1, 2, 1)
+    assert RecordCodec.decode(stored) == record
+
+
+def test_strings_not_round_tripping_kept():
+    codec = RecordCodec(True)
+    # `9:00` parses but formats back as `09:00`, free-form and ISO strings are not times of day
+    record = make_record("9:00", "2020-01-01T10:00:00")
+    assert codec.encode(DAY, record) == record
+    record = make_record("morning", "10:00:00")
+    stored = codec.encode(DAY, record)
+    assert stored["start"] == "morning" and stored["end"] == datetime(2020, 1, 1, 10)
+    assert RecordCodec.decode(stored) == record
+
+
+def test_untyped_and_unknown_day():
+    record = make_record("09:00:00", "10:00:00")
+    assert RecordCodec(False).encode(DAY, record) is record
+    assert RecordCodec(True).encode("not a day", record) is record
+    assert RecordCodec.decode_records([record]) == [record]
@@ -0,0 +1,49 @@
+import gzip
+import json
+
+from helpers.response_cache import ResponseCache
+
+
+def encode(data) -> bytes:
+    return json.dumps({"data": data}).encode("UTF-8")
+
+
+def test_response_cache_generation():
+    cache = ResponseCache(2, 1024 * 1024)
+    key = ("/api/v/day", "")
+    cache.put(key, 1, encode([1]))
+    assert cache.get(key, 1).body == encode([1])
+    # a write changed the data, the response encoded before is not served anymore
+    assert cache.get(key, 2) is None
+    cache.put(key, 2, encode([2]))
+    assert cache.get(key, 2).body == encode([2])
+    assert len(cache.entries) == 1 and cache.size == len(encode([2]))
+
+
+def test_response_cache_eviction():
+    cache = ResponseCache(2, 1024 * 1024)
+    for day in ("a", "b", "c"):
+        cache.put(day, 1, encode(day))
+    assert cache.get("a", 1) is None
+    assert cache.get("b", 1) is not None
+    cache.put("d", 1, encode("d"))
+    # b was used last, c is evicted
+    assert set(cache.entries) == {"b", "d"}
+
+    small = ResponseCache(10, 64)
+    small.put("a", 1, encode("a" * 30))
+    small.put("b", 1, encode("b" * 100))
+    assert set(small.entries) == {"a"} and small.size == len(encode("a" * 30))
+
+
+def test_response_cache_gzip():
+    cache = ResponseCache(2, 1024 * 1024, gzip_min=100)
+    body = encode(["task"] * 100)
+    entry = cache.put("day", 1, body)
+    compressed = ResponseCache.respond(entry, True)
+    plain = ResponseCache.respond(entry, False)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == body
+    assert plain.body == body and "content-encoding" not in plain.headers
+    # small bodies are not worth compressing
+    assert "content-encoding" not in ResponseCache.respond(cache.put("small", 1, encode([])), True).headers
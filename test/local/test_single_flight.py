@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+
+from helpers.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def read(day):
+        calls.append(day)
+        await asyncio.sleep(0.01)
+        return {"day": day}
+
+    async def run():
+        first = await asyncio.gather(*[flights.run(("read", day), read, day) for day in ("a", "a", "a", "b")])
+        second = await flights.run(("read", "a"), read, "a")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == [{"day": "a"}] * 3 + [{"day": "b"}]
+    assert second == {"day": "a"}
+    assert calls == ["a", "b", "a"]
+    assert flights.calls == 3 and flights.shared == 2 and flights.flights == {}
+
+
+def test_exception_reaches_every_caller():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("down")
+
+    async def run():
+        return await asyncio.gather(*[flights.run("key", failing) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert flights.calls == 1 and flights.flights == {}
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def read():
+        await asyncio.sleep(0.05)
+        return "data"
+
+    async def run():
+        leader = asyncio.ensure_future(flights.run("key", read))
+        follower = asyncio.ensure_future(flights.run("key", read))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "data"
+    assert flights.calls == 1
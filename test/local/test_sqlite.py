@@ -0,0 +1,110 @@
+import sqlite3
+import pytest
+import db.SQLite
+import src.http_response as http_res
+from db.SQLite import SQLiteAPI
+
+
+def make_record(task_id, task, start):
+    return {"id": task_id, "task": task, "start": start, "end": "23:00:00", "delta": 1.0, "platform": "web",
+            "notes": "sqlite"}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return SQLiteAPI(str(tmp_path / "taskmaster.db"))
+
+
+def test_sqlite_day_crud(storage):
+    records = [make_record(1, "Review", "09:00:00"), make_record(2, "Retro", "10:00:00")]
+    assert storage.create_record_for_day("01/01/2020", records) == http_res.SUCCESS_CREATE_UPDATE
+    assert storage.create_record_for_day("01/01/2020", records) == http_res.FAILED_CREATE_UPDATE
+    assert storage.get_record_for_day("01/01/2020") == {"_id": "01/01/2020", "records": records}
+    assert storage.get_most_recent_record("01/01/2020") == records[-1]
+
+    assert storage.delete_task("01/01/2020", 2) == http_res.SUCCESS_DELETED_TASK
+    assert storage.delete_task("01/01/2020", 2) == http_res.FAILED_DELETED_TASK_NON
+    assert storage.get_all_records() == [{"_id": "01/01/2020", "records": records[:1]}]
+
+    assert storage.delete_record_for_day("01/01/2020") == http_res.SUCCESS_DELETED_DAY
+    assert storage.update_record_for_day("01/01/2020", records) == http_res.FAILED_CREATE_UPDATE
+    assert storage.get_record_for_day("01/01/2020") is None
+    assert storage.get_recent_tasks(10) == {"data": [], "next": None}
+
+
+def test_sqlite_records_for_days(storage):
+    records = [make_record(1, "Review", "09:00:00")]
+    storage.create_record_for_day("01/01/2020", records)
+    storage.create_record_for_day("03/01/2020", [])
+    found = storage.get_records_for_days(("03/01/2020", "02/01/2020", "01/01/2020"))
+    assert found == {"03/01/2020": [], "02/01/2020": None, "01/01/2020": records}
+    assert list(found) == ["03/01/2020", "02/01/2020", "01/01/2020"]
+
+
+def test_sqlite_feed_and_workers(storage, tmp_path):
+    for day in ("01/01/2020", "02/01/2020"):
+        storage.create_record_for_day(day, [make_record(1, "Review", "09:00:00"), make_record(2, "Retro", "10:00:00")])
+
+    page = storage.get_recent_tasks(3)
+    assert [(item["day"], item["record"]["task"]) for item in page["data"]] == [
+        ("02/01/2020", "Retro"), ("02/01/2020", "Review"), ("01/01/2020", "Retro")]
+    page = storage.get_recent_tasks(3, page["next"])
+    assert [(item["day"], item["record"]["task"]) for item in page["data"]] == [("01/01/2020", "Review")]
+    assert page["next"] is None
+    assert storage.get_recent_tasks(3, "invalid") == http_res.FAILED_CURSOR
+
+    # another worker on the same file follows the writes in its in-process indexes
+    other = SQLiteAPI(str(tmp_path / "taskmaster.db"))
+    assert other.suggest("task", "re", 5) == ["Retro", "Review"]
+    storage.update_record_for_day("02/01/2020", [make_record(1, "Refactor", "11:00:00")])
+    other.synced_at = 0.0
+    assert other.suggest("task", "ref", 5) == ["Refactor"]
+    assert other.search_tasks("refactor", 0, 5)["data"][0]["day"] == "02/01/2020"
+
+    # the revision of a write the client sends back is synced before the interval
+    storage.update_record_for_day("02/01/2020", [make_record(1, "Release", "11:00:00")])
+    other.sync_changes()
+    assert other.suggest("task", "rel", 5) == []
+    other.sync_changes(storage.written)
+    assert other.suggest("task", "rel", 5) == ["Release"]
+
+
+def test_sqlite_idempotency(storage, tmp_path):
+    assert storage.claim_idempotent("key", "fingerprint") is None
+    storage.save_idempotent("key", "fingerprint", 201, http_res.SUCCESS_CREATE_UPDATE)
+    # the first response of the key is kept
+    storage.save_idempotent("key", "other", 400, http_res.FAILED_CREATE_UPDATE)
+    stored = SQLiteAPI(str(tmp_path / "taskmaster.db")).claim_idempotent("key", "other")
+    assert stored == {"fingerprint": "fingerprint", "status": 201, "body": http_res.SUCCESS_CREATE_UPDATE}
+
+
+def test_sqlite_idempotency_claim(storage, tmp_path):
+    assert storage.claim_idempotent("key", "fingerprint") is None
+    # a retry while the write runs sees the claim
+    other = SQLiteAPI(str(tmp_path / "taskmaster.db"))
+    assert other.claim_idempotent("key", "fingerprint") == {"fingerprint": "fingerprint", "status": None,
+                                                            "body": None}
+    storage.release_idempotent("key")
+    assert other.claim_idempotent("key", "fingerprint") is None
+    other.save_idempotent("key", "fingerprint", 201, http_res.SUCCESS_CREATE_UPDATE)
+    # a saved response is not released
+    other.release_idempotent("key")
+    assert storage.claim_idempotent("key", "fingerprint")["status"] == 201
+
+
+def test_sqlite_locked_raises(storage, tmp_path, monkeypatch):
+    storage.create_record_for_day("01/01/2020", [])
+    monkeypatch.setattr(db.SQLite, "sqlite_busy_timeout", 0.0)
+    other = SQLiteAPI(str(tmp_path / "taskmaster.db"))
+    other.ensure_connected()
+    locked = storage.open()
+    locked.execute("BEGIN IMMEDIATE")
+    try:
+        # the server answers the lock of another worker as an unavailable storage, not as a failed write
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.update_record_for_day("01/01/2020", [make_record(1, "Review", "09:00:00")])
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.claim_idempotent("key", "fingerprint")
+    finally:
+        locked.execute("ROLLBACK")
+    assert other.update_record_for_day("01/01/2020", []) == http_res.SUCCESS_CREATE_UPDATE
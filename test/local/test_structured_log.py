@@ -0,0 +1,112 @@
+import asyncio
+import io
+import json
+import logging
+import threading
+import time
+
+from helpers.structured_log import DrainingListener, DroppingQueueHandler, JsonFormatter, SamplingFilter, \
+    RequestIdMiddleware, request_id, route
+
+
+class BlockedHandler(logging.Handler):
+    """
+    Sink that writes nothing until it is released
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.released.wait()
+        self.records.append(record)
+
+
+def make_logger(handler) -> logging.Logger:
+    logger = logging.getLogger(f"test.{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler]
+    return logger
+
+
+def test_json_lines_carry_request_id():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    handler = DroppingQueueHandler(100, target)
+    handler.addFilter(SamplingFilter({}))
+    logger = make_logger(handler)
+
+    async def app(scope, receive, send):
+        logger.error("failed %s", "call")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": "/api/v0.7/day", "headers": [(b"x-request-id", b"abc")]}
+    asyncio.run(RequestIdMiddleware(app)(scope, None, send))
+    handler.close()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "failed call" and entry["level"] == "ERROR"
+    assert entry["request_id"] == "abc" and entry["route"] == "/api/v0.7/day"
+    assert (b"x-request-id", b"abc") in sent[0]["headers"]
+    assert request_id.get() is None
+
+
+def test_full_queue_drops_instead_of_blocking():
+    target = BlockedHandler()
+    handler = DroppingQueueHandler(10, target)
+    logger = make_logger(handler)
+    for i in range(100):
+        logger.error("failure %d", i)
+    # one record may be taken by the background thread before it blocks
+    assert 89 <= handler.dropped <= 90
+    target.released.set()
+    handler.close()
+    assert [record.getMessage() for record in target.records] == [f"failure {i}" for i in range(len(target.records))]
+
+
+def test_listener_started_once(monkeypatch):
+    started = []
+    start = DrainingListener.start
+
+    def slow_start(listener):
+        started.append(listener)
+        time.sleep(0.05)
+        start(listener)
+
+    monkeypatch.setattr(DrainingListener, "start", slow_start)
+    target = BlockedHandler()
+    target.released.set()
+    handler = DroppingQueueHandler(100, target)
+    # the threads of a new process log their first records at once
+    threads = [threading.Thread(target=handler.enqueue, args=(logging.LogRecord("x", logging.INFO, "", 0, str(i), None,
+                                                                                None),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    handler.close()
+    assert len(started) == 1
+    assert sorted(record.getMessage() for record in target.records) == [str(i) for i in range(8)]
+
+
+def test_sampling_keeps_errors():
+    sampling = SamplingFilter({"/api/v0.7/day": 0.0, "/api/v0.7/day/latest": 1.0})
+    token = route.set("/api/v0.7/day/01_01_2020")
+    try:
+        info = logging.LogRecord("x", logging.INFO, "", 0, "info", None, None)
+        error = logging.LogRecord("x", logging.ERROR, "", 0, "error", None, None)
+        assert not sampling.filter(info)
+        assert sampling.filter(error)
+        route.set("/api/v0.7/day/latest")
+        assert sampling.filter(info)
+    finally:
+        route.reset(token)
@@ -1,8 +1,11 @@
+import json
 import time
 
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from icecream import ic
 from src.server import api
+from interface.body import BodyObject
 from decouple import config
 from project import VERSION
 import pytest
@@ -46,6 +49,23 @@ async def test_get_connection():
     }
 
 
+@pytest.mark.asyncio
+async def test_get_readiness():
+    """
+    Test the liveness and readiness end points
+    :return: True if alive and ready
+    """
+    async with AsyncClient(app=api, base_url=storage.base_url) as ac:
+        live = await ac.get(f"{storage.base_path}/health/live")
+        ready = await ac.get(f"{storage.base_path}/health/ready")
+
+    assert live.status_code == 200
+    assert live.json() == {"alive": True}
+    assert ready.status_code == 200
+    assert ready.json()["connected"] is True
+    assert ready.json()["breaker"] == "closed"
+
+
 @pytest.mark.asyncio
 async def test_get_api_key():
     """
@@ -183,6 +203,74 @@ async def test_get_task_most_recent():
     }
 
 
+@pytest.mark.asyncio
+async def test_get_recent_tasks():
+    """
+    Get the most recent tasks across the days, page by page
+    :return: None
+    """
+    headers = Headers({config("TEST_TOKEN_KEY"): storage.api_key})
+    async with AsyncClient(app=api, base_url=storage.base_url) as ac:
+        res = await ac.get(parse_path("feed"), params={"limit": 1}, headers=headers)
+
+    # debug
+    ic(res)
+    ic(res.json())
+    assert res.status_code == 200
+    data = res.json()
+    assert type(data["data"]) == list
+    assert len(data["data"]) <= 1
+
+    if data["next"] is not None:
+        async with AsyncClient(app=api, base_url=storage.base_url) as ac:
+            res = await ac.get(parse_path("feed"), params={"limit": 1, "cursor": data["next"]}, headers=headers)
+        assert res.status_code == 200
+        assert res.json()["data"] != data["data"]
+
+
+@pytest.mark.asyncio
+async def test_search_tasks():
+    """
+    Search the test tasks by the task name
+    :return: None
+    """
+    headers = Headers({config("TEST_TOKEN_KEY"): storage.api_key})
+    async with AsyncClient(app=api, base_url=storage.base_url) as ac:
+        res = await ac.get(parse_path("search"), params={"q": "Unit test2"}, headers=headers)
+
+    # debug
+    ic(res)
+    ic(res.json())
+    assert res.status_code == 200
+    data = res.json()
+    assert len(data["data"]) > 0
+
+    # best match is the task with both words
+    best = data["data"][0]
+    assert best["day"] == "01/01/2020"
+    assert best["record"]["task"] == "Unit test2"
+    assert "task" in best["highlights"]
+
+
+@pytest.mark.asyncio
+async def test_suggest_task():
+    """
+    Suggest the test task by the typed prefix
+    :return: None
+    """
+    headers = Headers({config("TEST_TOKEN_KEY"): storage.api_key})
+    async with AsyncClient(app=api, base_url=storage.base_url) as ac:
+        res = await ac.get(parse_path("suggest"), params={"prefix": "unit t"}, headers=headers)
+
+    # debug
+    ic(res)
+    ic(res.json())
+    assert res.status_code == 200
+    data = res.json()
+    assert "Unit test" in data["data"]
+    assert "Unit test2" in data["data"]
+
+
 @pytest.mark.asyncio
 async def test_create_new_day():
     """
@@ -221,6 +309,48 @@ async def test_create_new_day():
         assert message == "success"
 
 
+# api with the body declared as parameter, the errors of the routes are the same as of it
+model_api = FastAPI()
+
+
+@model_api.post("/day")
+async def model_create_record(body: BodyObject):
+    return {"message": "success"}
+
+
+@pytest.mark.asyncio
+async def test_body_errors():
+    """
+    Test the invalid bodies get the same 422 as the body declared as parameter
+    :return: None
+    """
+    record = {"id": 1, "task": "Unit test", "start": "00:00:00", "end": "12:00:00", "delta": 12.0,
+              "platform": "Unit test", "notes": "Unit testing"}
+    bodies = [
+        b"",
+        b"{",
+        b"[]",
+        b'{"records": []}',
+        b'{"id": "01/01/2020", "records": {}}',
+        # delta does not match start and end
+        json.dumps({"id": "01/01/2020", "records": [dict(record, delta=2.0)]}).encode(),
+        b'{"id": "01/01/2020", "records": [{"id": "x"}]}',
+    ]
+
+    headers = Headers({config("TEST_TOKEN_KEY"): storage.api_key, "Content-Type": "application/json"})
+
+    async with AsyncClient(app=api, base_url=storage.base_url) as ac, \
+            AsyncClient(app=model_api, base_url=storage.base_url) as model:
+        for body in bodies:
+            res = await ac.post(parse_path("day"), content=body, headers=headers)
+            expected = await model.post("/day", content=body, headers=headers)
+
+            # debug
+            ic(body, res.json())
+            assert res.status_code == expected.status_code == 422
+            assert res.json() == expected.json()
+
+
 @pytest.mark.asyncio
 async def test_update_day():
     """
@@ -335,6 +465,12 @@ async def test_suite_get():
     await test_get_task_day()
     time.sleep(2)
     await test_get_task_most_recent()
+    time.sleep(2)
+    await test_get_recent_tasks()
+    time.sleep(2)
+    await test_search_tasks()
+    time.sleep(2)
+    await test_suggest_task()
 
 
 @pytest.mark.asyncio
@@ -343,6 +479,7 @@ async def test_suite_post_put():
     Creation and update
     :return: None
     """
+    await test_body_errors()
     await test_create_new_day()
     time.sleep(2)
     await test_update_day()
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+
+from helpers.tracing import Tracer, TracingMiddleware, span, traced, current_span
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@traced("stage.inner")
+def inner():
+    return current_span.get()
+
+
+def run_request(tracer, headers=()):
+    async def app(scope, receive, send):
+        with span("stage.outer", step=1):
+            inner()
+        with pytest.raises(ValueError):
+            with span("stage.failing"):
+                raise ValueError("broken")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/v0.7/day", "headers": list(headers)}
+    asyncio.run(TracingMiddleware(app, tracer)(scope, None, send))
+    return dict(sent[0]["headers"])
+
+
+def test_spans_of_sampled_request():
+    exporter = ListExporter()
+    headers = run_request(Tracer(1.0, exporter))
+    names = [span.name for span in exporter.spans]
+    assert names == ["stage.inner", "stage.outer", "stage.failing", "GET /api/v0.7/day"]
+    root = exporter.spans[-1]
+    inner_span, outer, failing = exporter.spans[:3]
+    assert root.parent_id is None and root.attributes["status"] == 200
+    assert outer.parent_id == root.span_id and inner_span.parent_id == outer.span_id
+    assert failing.error == "ValueError: broken"
+    assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+    assert headers[b"traceparent"] == root.traceparent().encode()
+    assert current_span.get() is None
+
+
+def test_traceparent_of_caller_is_continued():
+    exporter = ListExporter()
+    parent = "00-" + "a" * 32 + "-" + "b" * 16
+    run_request(Tracer(0.01, exporter), [(b"traceparent", f"{parent}-01".encode())])
+    root = exporter.spans[-1]
+    assert root.trace_id == "a" * 32 and root.parent_id == "b" * 16
+
+    exporter.spans.clear()
+    run_request(Tracer(1.0, exporter), [(b"traceparent", f"{parent}-00".encode())])
+    assert exporter.spans == []
+
+
+def test_sampling_off_records_nothing():
+    exporter = ListExporter()
+    headers = run_request(Tracer(0.0, exporter), [(b"traceparent", ("00-" + "a" * 32 + "-" + "b" * 16 + "-01").encode())])
+    assert exporter.spans == [] and b"traceparent" not in headers
@@ -0,0 +1,59 @@
+import asyncio
+import json
+
+from helpers.traffic_recorder import TrafficRecorder, RecordMiddleware
+
+BODY = {"id": "01/01/2020", "records": [{"id": 1, "task": "secret", "start": "10:00:00", "end": "11:00:00",
+                                         "delta": 1.0, "platform": "web", "notes": ""}]}
+
+
+def read_lines(path) -> list:
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_sanitize_keeps_structure():
+    recorder = TrafficRecorder("unused", 1.0, ["task", "notes", "platform", "q"])
+    sanitized = recorder.sanitize(BODY)
+    assert sanitized["records"][0]["task"] == "xxxxxx"
+    assert sanitized["records"][0]["platform"] == "xxx"
+    assert sanitized["records"][0]["start"] == "10:00:00"
+    assert sanitized["id"] == "01/01/2020"
+    assert BODY["records"][0]["task"] == "secret"
+    assert recorder.sanitize_query("q=private&limit=5") == "q=xxxxxxx&limit=5"
+
+
+def test_skipped_paths_are_not_sampled():
+    recorder = TrafficRecorder("unused", 1.0, [], ("/api/health/", "/auth/"))
+    assert recorder.wants("/api/v0.7/day")
+    assert not recorder.wants("/api/health/ready")
+    assert not recorder.wants("/api/v0.7/auth/key")
+    assert not TrafficRecorder("unused", 0.0, []).wants("/api/v0.7/day")
+
+
+def test_middleware_records_request(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path, 1.0, ["task", "notes", "platform"])
+    received = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        received.append(message["body"])
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(BODY).encode(), "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v0.7/day", "query_string": b""}
+    asyncio.run(RecordMiddleware(app, recorder)(scope, receive, send))
+    recorder.close()
+
+    assert json.loads(received[0]) == BODY
+    entry, = read_lines(path)
+    assert entry["method"] == "POST" and entry["path"] == "/api/v0.7/day" and entry["status"] == 201
+    assert entry["body"]["records"][0]["task"] == "xxxxxx"
+    assert entry["duration_ms"] >= 0